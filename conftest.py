@@ -0,0 +1,2 @@
+# Intentionally empty. There is no packaging config, so this file is what puts the repository root on sys.path: pytest's default
+# prepend import mode inserts the directory of every conftest.py it loads, which lets the tests import fm_prototype as a package
@@ -0,0 +1,41 @@
+from importlib import import_module
+
+
+LAZY_EXPORTS: dict[str, tuple[str, ...]] = { # submodule -> public names. Nothing is imported until a name is first used, so importing the package costs nothing
+    "fft": ("FFTPlan", "get_fft_plan", "is_power_of_two"),
+    "convolution": ("OverlapSaveConvolver", "windowed_sinc_lowpass"),
+    "hilbert": ("analytic_fir_taps", "hilbert_fir_taps"),
+    "nco": ("NumericallyControlledOscillator",),
+    "resample": ("PolyphaseResampler",),
+    "channelizer": ("AnalysisFilterBank", "SynthesisFilterBank", "channelizer_prototype"),
+    "spectrum": ("WelchEstimator", "get_window"),
+    "numeric": ("NumericMode", "FLOAT64", "FLOAT32", "Q15", "get_numeric_mode", "quantize_q15", "fixed_point_fft"),
+    "generate_signal": ("SignalGenerator", "MultitoneGenerator", "ChirpGenerator", "NoiseGenerator", "FMGenerator", "AMGenerator", "SumGenerator", "ChannelStackGenerator", "SignalSource"),
+    "dsp_sync": ("DSPTimeSync",),
+    "fm_pipeline": ("Pipeline", "BufferClosedError", "AbstractBuffer", "FrameBuffer", "RingBuffer", "TimeDomainBuffer", "FanOutBuffer",
+                    "AbstractPipelineStep", "AbstractMergeStep", "SinkStep", "FusedStep", "TestPipelineStep", "GainStep", "DFTStep", "SlidingDFTStep", "IDFTStep",
+                    "FMModulatorStep", "FMDemodulatorStep", "IQCombineStep", "MixerStep", "FIRFilterStep", "HilbertStep", "RateChangeStep", "ResamplerStep",
+                    "DecimatorStep", "InterpolatorStep", "ChannelizerStep", "SynthesisStep", "SpectrumStep", "TestThreadOrchestrator", "ParallelThreadOrchestrator"),
+    "shared_memory_pipeline": ("ProcessPipelineOrchestrator", "SharedMemoryRingBuffer"),
+    "async_pipeline": ("AsyncPipeline", "run_pipelines", "blocking_source", "paced_source", "stream_source", "subprocess_source", "stream_sink"),
+    "metrics": ("PipelineMetrics",),
+    "pacing": ("FramePacer",),
+    "pcm_io": ("PCMFileSource", "WAVFileSource", "PCMFileSink", "WAVFileSink", "SubprocessPipeSource", "ffmpeg_source"),
+}
+
+EXPORTED_FROM: dict[str, str] = {name: module for module, names in LAZY_EXPORTS.items() for name in names}
+
+__all__ = sorted(EXPORTED_FROM)
+
+
+def __getattr__(name: str):
+    if name not in EXPORTED_FROM:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(import_module(f".{EXPORTED_FROM[name]}", __name__), name)
+    globals()[name] = value # later lookups are plain module attributes
+
+    return value
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__))
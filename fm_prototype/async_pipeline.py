@@ -0,0 +1,228 @@
+import asyncio
+import inspect
+from concurrent.futures import Executor
+from typing import AsyncIterator, Callable
+import numpy as np
+from .fm_pipeline import AbstractPipelineStep, AbstractMergeStep, SinkStep, RateChangeStep, FusedStep, BufferClosedError, DSPTimeSync, is_empty_frame
+from .numeric import NumericMode, FLOAT64, get_numeric_mode
+from .pcm_io import SAMPLE_FORMATS, LAYOUT_CHANNELS, check_format, deinterleave, interleave
+
+
+END_OF_STREAM: object = object() # queued after the last frame
+
+
+class AsyncFrameQueue: # bounded awaitable queue, takes the place of the lock pair buffers. A full queue suspends the producing coroutine instead of blocking a thread
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError("Queue capacity must be at least 1")
+
+        self.capacity: int = capacity
+        self.queue: asyncio.Queue = asyncio.Queue(capacity)
+        self.closed: bool = False
+        self.end_queued: bool = False
+
+    async def push(self, value: np.ndarray) -> None:
+        await self.queue.put(value)
+
+    async def pull(self) -> np.ndarray:
+        value = await self.queue.get()
+        if value is END_OF_STREAM:
+            raise BufferClosedError("Queue closed and drained")
+        if self.closed: # a close on a full queue waits for this free slot
+            self.__queue_end()
+
+        return value
+
+    async def close(self) -> None: # goes in behind the frames already queued, so the consumer drains them first. Never suspends, stages close in finally blocks while being cancelled
+        self.closed = True
+        self.__queue_end()
+
+    def __queue_end(self) -> None:
+        if not self.end_queued:
+            try:
+                self.queue.put_nowait(END_OF_STREAM)
+                self.end_queued = True
+            except asyncio.QueueFull:
+                pass
+
+    def occupancy(self) -> int:
+        return self.queue.qsize()
+
+
+class AsyncStage: # one step as a coroutine. Offloaded steps run their computation on the executor, the frames of one stage still go through in order
+    def __init__(self, step: AbstractPipelineStep, offload: bool):
+        self.step: AbstractPipelineStep = step
+        self.offload: bool = offload
+
+    async def run(self, inbound: AsyncFrameQueue, outbound: AsyncFrameQueue, executor: Executor) -> None:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        try:
+            while True:
+                value: np.ndarray = await inbound.pull()
+                if self.offload:
+                    result: np.ndarray = await loop.run_in_executor(executor, self.step.computation, value)
+                else:
+                    result: np.ndarray = self.step.computation(value)
+                if not is_empty_frame(result):
+                    await outbound.push(result)
+        except BufferClosedError:
+            pass
+        finally: # also on errors and cancellation, so the next stage never waits on a dead producer
+            await outbound.close()
+
+
+class AsyncPipeline: # event loop runtime for linear chains. Sources are async iterators of frames, sinks plain or async callables. One process can run many of these side by side
+    def __init__(self, source: AsyncIterator, sink: Callable, dsp_time_sync: DSPTimeSync, queue_capacity: int = 4, numeric_mode: NumericMode = FLOAT64, executor: Executor = None, fuse_steps: bool = False): # executor None uses the loop's default thread pool, numpy releases the gil in the heavy kernels. fuse_steps is opt-in like on Pipeline, the queues hold whole frames so fusing never changes the output here
+        self.source: AsyncIterator = source
+        self.sink: Callable = sink
+        self.time_sync: DSPTimeSync = dsp_time_sync
+        self.output_time_sync: DSPTimeSync = dsp_time_sync # clock of the last rate segment, the sink keeps it moving
+        self.queue_capacity: int = queue_capacity
+        self.numeric_mode: NumericMode = get_numeric_mode(numeric_mode)
+        self.executor: Executor = executor
+        self.fuse_steps: bool = fuse_steps
+
+        self.stages: list[AsyncStage] = []
+        self.queues: list[AsyncFrameQueue] = []
+        self.tasks: list[asyncio.Task] = []
+
+    def add_element(self, step: AbstractPipelineStep, offload: bool = False) -> None: # offload the cpu heavy steps (transforms, long filters), cheap elementwise ones are faster inline
+        if isinstance(step, (AbstractMergeStep, SinkStep)):
+            raise ValueError("AsyncPipeline runs linear chains, merges and extra sinks need the threaded Pipeline")
+
+        step.add_time_sync(self.output_time_sync)
+        step.set_numeric_mode(self.numeric_mode)
+        if isinstance(step, RateChangeStep): # every rate change closes a segment in a linear chain
+            step.output_time_sync = DSPTimeSync(self.output_time_sync.sps * step.interpolation / step.decimation)
+            step.advances_input_clock = True
+            self.output_time_sync = step.output_time_sync
+
+        self.stages.append(AsyncStage(step, offload))
+
+    def __fused_stages(self) -> list[AsyncStage]: # neighbouring elementwise steps with the same offload setting run as one stage
+        fused: list[AsyncStage] = []
+        run: list[AsyncStage] = []
+
+        def flush() -> None:
+            if len(run) > 1:
+                fused.append(AsyncStage(FusedStep([stage.step for stage in run]), run[0].offload))
+            else:
+                fused.extend(run)
+            run.clear()
+
+        for stage in self.stages:
+            if not stage.step.elementwise or (run and stage.offload != run[0].offload):
+                flush()
+            run.append(stage)
+            if not stage.step.elementwise:
+                flush()
+        flush()
+
+        return fused
+
+    async def __pump_source(self, outbound: AsyncFrameQueue) -> None:
+        try:
+            async for frame in self.source:
+                await outbound.push(self.numeric_mode.to_frame(frame))
+        finally:
+            await outbound.close()
+
+    async def __drain_sink(self, inbound: AsyncFrameQueue) -> None:
+        try:
+            while True:
+                value: np.ndarray = await inbound.pull()
+                result = self.sink(value)
+                if inspect.isawaitable(result):
+                    await result
+                self.output_time_sync.increment_time(np.shape(value)[-1])
+        except BufferClosedError:
+            pass
+
+    async def run(self) -> None: # returns once the source is exhausted and every frame reached the sink, or after stop. The first task to fail cancels the rest and its error is raised
+        stages: list[AsyncStage] = self.__fused_stages() if self.fuse_steps else self.stages
+        self.queues = [AsyncFrameQueue(self.queue_capacity) for x in range(len(stages) + 1)]
+
+        self.tasks = [asyncio.create_task(self.__pump_source(self.queues[0]))]
+        for stage, inbound, outbound in zip(stages, self.queues[:-1], self.queues[1:]):
+            self.tasks.append(asyncio.create_task(stage.run(inbound, outbound, self.executor)))
+        self.tasks.append(asyncio.create_task(self.__drain_sink(self.queues[-1])))
+
+        try:
+            done, _ = await asyncio.wait(self.tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally: # also when run itself is cancelled
+            self.stop()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        for task in self.tasks:
+            if task in done and not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+
+    def stop(self) -> None:
+        for task in self.tasks:
+            task.cancel()
+
+
+async def run_pipelines(pipelines: list[AsyncPipeline]) -> None: # many streams on one loop, each waiting on its own io
+    await asyncio.gather(*(pipeline.run() for pipeline in pipelines))
+
+
+async def blocking_source(source: Callable, executor: Executor = None, offload: bool = True) -> AsyncIterator: # adapts a threaded Pipeline source (PCMFileSource, SignalSource, ...), EOFError ends the stream. Offloaded so slow reads don't stall the loop
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    while True:
+        try:
+            frame = await loop.run_in_executor(executor, source) if offload else source()
+        except EOFError:
+            return
+        yield frame
+
+
+async def paced_source(source: AsyncIterator, sps: float) -> AsyncIterator: # hands frames out no faster than real time, sleeping on the loop instead of a thread
+    loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+    start: float = loop.time()
+    samples: int = 0
+
+    async for frame in source:
+        delay: float = start + samples / sps - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        yield frame
+        samples += np.shape(frame)[-1]
+
+
+async def stream_source(reader: asyncio.StreamReader, frame_size: int, sample_format: str = "s16le", layout: str = "mono", normalize: bool = True) -> AsyncIterator: # raw interleaved pcm from a socket or pipe, frames as PCMFileSource gives them. A short last frame is kept
+    check_format(sample_format, layout)
+    dtype: np.dtype = SAMPLE_FORMATS[sample_format]
+    sample_bytes: int = LAYOUT_CHANNELS[layout] * dtype.itemsize
+
+    while True:
+        try:
+            data: bytes = await reader.readexactly(frame_size * sample_bytes)
+        except asyncio.IncompleteReadError as error:
+            data = error.partial[:len(error.partial) - len(error.partial) % sample_bytes]
+            if data:
+                yield deinterleave(np.frombuffer(data, dtype=dtype), layout, normalize)
+            return
+
+        yield deinterleave(np.frombuffer(data, dtype=dtype), layout, normalize)
+
+
+async def subprocess_source(command: list[str], frame_size: int, sample_format: str = "s16le", layout: str = "mono", normalize: bool = True) -> AsyncIterator: # async SubprocessPipeSource, e.g. an ffmpeg decode. The child is terminated if the pipeline stops early
+    process: asyncio.subprocess.Process = await asyncio.create_subprocess_exec(*command, stdin=asyncio.subprocess.DEVNULL, stdout=asyncio.subprocess.PIPE)
+    try:
+        async for frame in stream_source(process.stdout, frame_size, sample_format, layout, normalize):
+            yield frame
+    finally:
+        if process.returncode is None:
+            process.terminate()
+        await process.wait()
+
+
+def stream_sink(writer: asyncio.StreamWriter, sample_format: str = "s16le", layout: str = "mono", normalize: bool = True) -> Callable: # async sink writing raw interleaved pcm to a socket or pipe, waits for the transport to drain so a slow reader pushes back
+    check_format(sample_format, layout)
+    dtype: np.dtype = SAMPLE_FORMATS[sample_format]
+
+    async def write(frame: np.ndarray) -> None:
+        writer.write(interleave(frame, layout, dtype, normalize).tobytes())
+        await writer.drain()
+
+    return write
@@ -0,0 +1,265 @@
+import argparse
+import json
+import platform
+import sys
+from datetime import datetime, timezone
+from math import pi, sin
+from time import perf_counter
+from typing import Callable
+import numpy as np
+from .fft import fft_iteration, get_fft_plan
+from .convolution import OverlapSaveConvolver, convolver, windowed_sinc_lowpass
+from .generate_signal import MultitoneGenerator, SignalSource
+from .fm_pipeline import DFTStep, DSPTimeSync, FIRFilterStep, FMModulatorStep, IDFTStep, ParallelThreadOrchestrator, Pipeline, TestThreadOrchestrator, TimeDomainBuffer
+
+
+DEFAULT_SIZES: list[int] = [256, 1024, 4096, 16384, 65536]
+DEFAULT_FRAME_SIZES: list[int] = [256, 1024, 4096]
+DEFAULT_KERNEL_LENGTHS: list[int] = [31, 255, 2047]
+PERCENTILES: list[int] = [50, 90, 99]
+
+SPS = 48000
+
+
+def time_call(function: Callable, max_repeats: int = 200, min_repeats: int = 5, time_budget: float = 0.5) -> np.ndarray: # per call latencies in seconds. One warmup call also sizes the repeat count so slow cases stay inside the budget
+    start: float = perf_counter()
+    function()
+    estimate: float = perf_counter() - start
+
+    repeats: int = int(np.clip(time_budget / max(estimate, 1e-9), min_repeats, max_repeats))
+    latencies: np.ndarray = np.empty(repeats)
+    for index in range(repeats):
+        start = perf_counter()
+        function()
+        latencies[index] = perf_counter() - start
+
+    return latencies
+
+def summarize(latencies: np.ndarray, items_per_call: int) -> dict: # latency percentiles in microseconds, throughput in items (samples) per second
+    summary: dict = {"repeats": len(latencies), "items_per_call": items_per_call, "mean_us": float(np.mean(latencies) * 1e6), "min_us": float(np.min(latencies) * 1e6)}
+    for percentile in PERCENTILES:
+        summary[f"p{percentile}_us"] = float(np.percentile(latencies, percentile) * 1e6)
+    summary["throughput"] = float(items_per_call / np.median(latencies))
+
+    return summary
+
+def run_case(results: list[dict], group: str, implementation: str, size: int, function: Callable, items_per_call: int = None, **timing) -> None:
+    results.append({"group": group, "implementation": implementation, "size": size} | summarize(time_call(function, **timing), items_per_call if items_per_call else size))
+
+def scipy_fft_module():
+    try:
+        import scipy.fft
+        return scipy.fft
+    except ImportError:
+        return None
+
+
+def benchmark_fft(sizes: list[int], slow_limit: int, **timing) -> list[dict]: # project transforms against numpy and scipy. The recursive pure python fft only runs up to slow_limit
+    results: list[dict] = []
+    scipy_fft = scipy_fft_module()
+    generator: np.random.Generator = np.random.default_rng(0)
+
+    for size in sizes:
+        values: np.ndarray = generator.standard_normal(size)
+        listed: list[float] = values.tolist()
+        plan = get_fft_plan(size)
+
+        if size <= slow_limit:
+            run_case(results, "fft", "fft_iteration", size, lambda: fft_iteration(listed, size, 1), **timing)
+        run_case(results, "fft", "FFTPlan.forward", size, lambda: plan.forward(values), **timing)
+        run_case(results, "fft", "FFTPlan.rfft", size, lambda: plan.rfft(values), **timing)
+        run_case(results, "fft", "numpy.fft.fft", size, lambda: np.fft.fft(values), **timing)
+        run_case(results, "fft", "numpy.fft.rfft", size, lambda: np.fft.rfft(values), **timing)
+        if scipy_fft:
+            run_case(results, "fft", "scipy.fft.fft", size, lambda: scipy_fft.fft(values), **timing)
+
+    return results
+
+def benchmark_dft_steps(sizes: list[int], **timing) -> list[dict]:
+    results: list[dict] = []
+    generator: np.random.Generator = np.random.default_rng(1)
+
+    for size in sizes:
+        dft: DFTStep = DFTStep(size)
+        dft.add_source(TimeDomainBuffer(size, SPS))
+        dft.entry_buffer.history.extend(generator.standard_normal(size))
+        window: np.ndarray = dft.entry_buffer.snapshot()
+
+        bins: np.ndarray = generator.standard_normal(size) + 1j * generator.standard_normal(size)
+        idft: IDFTStep = IDFTStep(size)
+
+        run_case(results, "dft_step", "DFTStep", size, lambda: dft.computation([0.0]), **timing)
+        run_case(results, "dft_step", "numpy.fft.fft", size, lambda: np.fft.fft(window), **timing)
+        run_case(results, "idft_step", "IDFTStep", size, lambda: idft.computation(bins), **timing)
+        run_case(results, "idft_step", "numpy.fft.ifft", size, lambda: np.fft.ifft(bins) * size, **timing)
+
+    return results
+
+def benchmark_convolution(sizes: list[int], kernel_lengths: list[int], slow_limit: int, **timing) -> list[dict]: # size is the frame length pushed through a streaming filter
+    results: list[dict] = []
+    generator: np.random.Generator = np.random.default_rng(2)
+
+    try:
+        from scipy.signal import oaconvolve
+    except ImportError:
+        oaconvolve = None
+
+    for size in sizes:
+        if size <= slow_limit: # the original convolver samples two callables and convolves in pure python, O(size^2)
+            run_case(results, "convolution", "convolver", size, lambda: convolver(lambda x: sin(2 * pi * x), lambda x: 1 / (1 + x), size, 0.001), **timing)
+
+        values: np.ndarray = generator.standard_normal(size)
+        for kernel_length in kernel_lengths:
+            kernel: np.ndarray = windowed_sinc_lowpass(kernel_length, 0.2, 1.0)
+            streaming: OverlapSaveConvolver = OverlapSaveConvolver(kernel)
+            label: str = f"taps={kernel_length}"
+
+            run_case(results, "convolution", f"OverlapSaveConvolver {label}", size, lambda: streaming.process(values), **timing)
+            if size >= kernel_length: # both paths pinned, for the crossover. Shorter frames always go direct
+                direct: OverlapSaveConvolver = OverlapSaveConvolver(kernel, direct_threshold=kernel_length)
+                overlap_save: OverlapSaveConvolver = OverlapSaveConvolver(kernel, direct_threshold=0)
+                run_case(results, "convolution", f"direct {label}", size, lambda: direct.process(values), **timing)
+                run_case(results, "convolution", f"overlap save {label}", size, lambda: overlap_save.process(values), **timing)
+            run_case(results, "convolution", f"numpy.convolve {label}", size, lambda: np.convolve(values, kernel), **timing)
+            if oaconvolve:
+                run_case(results, "convolution", f"scipy.signal.oaconvolve {label}", size, lambda: oaconvolve(values, kernel), **timing)
+
+    return results
+
+def convolution_crossover(results: list[dict], kernel_lengths: list[int]) -> list[dict]: # per kernel length, the smallest frame length where overlap save beat direct convolution and the one the convolver's cost estimate picks. The constants in convolution.py are fitted to this
+    p50: dict[tuple, float] = {(result["implementation"], result["size"]): result["p50_us"] for result in results if result["group"] == "convolution"}
+    crossovers: list[dict] = []
+
+    for kernel_length in kernel_lengths:
+        label: str = f"taps={kernel_length}"
+        sizes: list[int] = sorted(size for implementation, size in p50 if implementation == f"direct {label}")
+        estimator: OverlapSaveConvolver = OverlapSaveConvolver(np.ones(kernel_length))
+
+        measured: list[int] = [size for size in sizes if p50[(f"overlap save {label}", size)] < p50[(f"direct {label}", size)]]
+        estimated: list[int] = [size for size in sizes if not estimator.prefers_direct(size)]
+        crossovers.append({"kernel_length": kernel_length, "measured": measured[0] if measured else None, "estimated": estimated[0] if estimated else None})
+
+    return crossovers
+
+def benchmark_fm_modulator(sizes: list[int], **timing) -> list[dict]: # table lookup nco against computing the carrier and phase integral with np.cos directly
+    results: list[dict] = []
+    center_frequency, frequency_deviation = 10000.0, 2500.0
+
+    for size in sizes:
+        modulating: np.ndarray = MultitoneGenerator(SPS, [440]).generate(0, size)
+        step: FMModulatorStep = FMModulatorStep(SPS, center_frequency, frequency_deviation)
+        carrier_phase: np.ndarray = 2 * pi * center_frequency * np.arange(size) / SPS
+        deviation_scale: float = 2 * pi * (frequency_deviation / center_frequency) / SPS
+
+        run_case(results, "fm_modulator", "FMModulatorStep", size, lambda: step.computation(modulating), **timing)
+        run_case(results, "fm_modulator", "numpy.cos reference", size, lambda: np.cos(carrier_phase + deviation_scale * np.cumsum(modulating)), **timing)
+
+    return results
+
+
+def build_benchmark_pipeline(source: Callable, sink: Callable, frame_size: int, max_threads: int) -> Pipeline: # lowpass then modulate, a small but representative transmit chain
+    pipeline: Pipeline = Pipeline(source, sink, DSPTimeSync(SPS), 10, max_threads, frame_size=frame_size, ring_capacity=8)
+    pipeline.add_element(FIRFilterStep(windowed_sinc_lowpass(127, 15000, SPS)))
+    pipeline.add_element(FMModulatorStep(SPS, 10000.0, 2500.0))
+
+    return pipeline
+
+def benchmark_pipeline(frame_sizes: list[int], total_samples: int, repeats: int = 3) -> list[dict]: # end to end samples per second. Latency percentiles are the gaps between frames arriving at the sink
+    results: list[dict] = []
+    orchestrators: dict[str, Callable] = {"TestThreadOrchestrator": lambda: TestThreadOrchestrator(), "ParallelThreadOrchestrator": lambda: ParallelThreadOrchestrator()}
+
+    for frame_size in frame_sizes:
+        num_frames: int = max(total_samples // frame_size, 1)
+
+        for name, create_orchestrator in orchestrators.items():
+            durations: list[float] = []
+            arrivals: list[float] = []
+
+            for repeat in range(repeats):
+                arrivals.clear()
+                pipeline: Pipeline = build_benchmark_pipeline(SignalSource(MultitoneGenerator(SPS, [440, 3000]), frame_size, num_frames * frame_size), lambda frame: arrivals.append(perf_counter()), frame_size, 2)
+
+                start: float = perf_counter()
+                pipeline.run(create_orchestrator())
+                pipeline.wait()
+                durations.append(perf_counter() - start)
+                pipeline.end()
+
+            gaps: np.ndarray = np.diff(arrivals) if len(arrivals) > 1 else np.array([durations[-1]])
+            summary: dict = summarize(gaps, frame_size)
+            summary["throughput"] = float(num_frames * frame_size / np.median(durations))
+            results.append({"group": "pipeline", "implementation": name, "size": frame_size, "frames": num_frames} | summary)
+
+    return results
+
+
+def run_benchmarks(sizes: list[int] = None, frame_sizes: list[int] = None, kernel_lengths: list[int] = None, slow_limit: int = 1024, pipeline_samples: int = 1 << 20, **timing) -> dict:
+    sizes = DEFAULT_SIZES if sizes is None else sizes
+    frame_sizes = DEFAULT_FRAME_SIZES if frame_sizes is None else frame_sizes
+    kernel_lengths = DEFAULT_KERNEL_LENGTHS if kernel_lengths is None else kernel_lengths
+
+    results: list[dict] = []
+    results += benchmark_fft(sizes, slow_limit, **timing)
+    results += benchmark_dft_steps(sizes, **timing)
+    results += benchmark_convolution(sizes, kernel_lengths, slow_limit, **timing)
+    results += benchmark_fm_modulator(sizes, **timing)
+    results += benchmark_pipeline(frame_sizes, pipeline_samples)
+
+    scipy_fft = scipy_fft_module()
+    environment: dict = {"timestamp": datetime.now(timezone.utc).isoformat(), "python": sys.version.split()[0], "numpy": np.__version__, "scipy": scipy_fft and sys.modules["scipy"].__version__, "platform": platform.platform(), "processor": platform.processor()}
+
+    return {"environment": environment, "results": results, "convolution_crossover": convolution_crossover(results, kernel_lengths)}
+
+def result_key(result: dict) -> tuple:
+    return (result["group"], result["implementation"], result["size"])
+
+def compare_results(baseline: dict, current: dict) -> list[dict]: # throughput ratio per case present in both runs, above 1 means current is faster
+    baseline_results: dict[tuple, dict] = {result_key(result): result for result in baseline["results"]}
+    comparisons: list[dict] = []
+
+    for result in current["results"]:
+        previous: dict = baseline_results.get(result_key(result))
+        if previous:
+            comparisons.append({"group": result["group"], "implementation": result["implementation"], "size": result["size"], "speedup": result["throughput"] / previous["throughput"]})
+
+    return comparisons
+
+def print_results(report: dict) -> None:
+    print(f"{'group':<14}{'implementation':<40}{'size':>8}{'p50 us':>12}{'p99 us':>12}{'samples/s':>14}")
+    for result in report["results"]:
+        print(f"{result['group']:<14}{result['implementation']:<40}{result['size']:>8}{result['p50_us']:>12.1f}{result['p99_us']:>12.1f}{result['throughput']:>14.3g}")
+
+    print()
+    print(f"{'taps':>8}{'measured crossover':>22}{'estimated crossover':>22}") # frame length from which overlap save is faster, - when it never was
+    for crossover in report["convolution_crossover"]:
+        print(f"{crossover['kernel_length']:>8}{crossover['measured'] or '-':>22}{crossover['estimated'] or '-':>22}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the transforms, filters, modulator and pipeline throughput")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--frame-sizes", type=int, nargs="+", default=DEFAULT_FRAME_SIZES)
+    parser.add_argument("--kernel-lengths", type=int, nargs="+", default=DEFAULT_KERNEL_LENGTHS)
+    parser.add_argument("--slow-limit", type=int, default=1024, help="largest size for the pure python reference implementations")
+    parser.add_argument("--pipeline-samples", type=int, default=1 << 20)
+    parser.add_argument("--max-repeats", type=int, default=200)
+    parser.add_argument("--time-budget", type=float, default=0.5, help="seconds spent timing each case")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="earlier JSON results to compare throughput against")
+    arguments = parser.parse_args()
+
+    report: dict = run_benchmarks(arguments.sizes, arguments.frame_sizes, arguments.kernel_lengths, arguments.slow_limit, arguments.pipeline_samples, max_repeats=arguments.max_repeats, time_budget=arguments.time_budget)
+    print_results(report)
+
+    if arguments.baseline:
+        with open(arguments.baseline) as file:
+            comparisons: list[dict] = compare_results(json.load(file), report)
+        report["comparison"] = comparisons
+
+        print()
+        for comparison in comparisons:
+            print(f"{comparison['group']:<14}{comparison['implementation']:<40}{comparison['size']:>8}{comparison['speedup']:>10.2f}x")
+
+    if arguments.output:
+        with open(arguments.output, "w") as file:
+            json.dump(report, file, indent=2)
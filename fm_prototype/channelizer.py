@@ -0,0 +1,106 @@
+import numpy as np
+from .convolution import windowed_sinc_lowpass
+from .fft import FFTPlan, get_fft_plan, is_power_of_two
+
+
+def channelizer_prototype(num_channels: int, taps_per_channel: int) -> np.ndarray: # lowpass with its cutoff at the channel edge, so neighbouring channels cross at -6 dB. Not perfect reconstruction, a wideband signal sent through both banks dips between channel centres
+    return windowed_sinc_lowpass(num_channels * taps_per_channel, 0.5 / num_channels, 1.0)
+
+
+class PolyphaseFilterBank: # shared setup of the analysis and synthesis banks. Channel k is centred on k * sps / num_channels, one output vector every decimation input samples
+    def __init__(self, num_channels: int, decimation: int = None, taps: np.ndarray = None, taps_per_channel: int = 8):
+        if not is_power_of_two(num_channels):
+            raise ValueError("The number of channels must be a power of two, the bank runs on the fft plan")
+
+        self.num_channels: int = num_channels
+        self.decimation: int = num_channels if decimation is None else decimation # num_channels is critically sampled, num_channels / 2 is 2x oversampled
+        if self.decimation < 1 or num_channels % self.decimation:
+            raise ValueError("Decimation must divide the number of channels")
+
+        taps = channelizer_prototype(num_channels, taps_per_channel) if taps is None else np.asarray(taps)
+        self.taps_per_channel: int = -(-len(taps) // num_channels)
+        self.taps: np.ndarray = np.zeros(self.taps_per_channel * num_channels, dtype=taps.dtype) # padded to whole channels so the folding reshape works
+        self.taps[:len(taps)] = taps
+        self.filter_length: int = len(self.taps)
+
+        self.plan: FFTPlan = get_fft_plan(num_channels)
+        # e^(-2j pi k s / N) for every shift s, output m of channel k needs shift (m * decimation) mod N
+        self.rotations: np.ndarray = np.exp(-2j * np.pi * np.outer(np.arange(num_channels), np.arange(num_channels)) / num_channels)
+        self.vector_index: int = 0 # output vectors produced (analysis) or consumed (synthesis) so far
+
+    def shifts(self, count: int) -> np.ndarray:
+        return (self.vector_index + np.arange(count)) * self.decimation % self.num_channels
+
+
+class AnalysisFilterBank(PolyphaseFilterBank): # one wideband stream in, (num_channels, samples) baseband channels out. Every output vector is one window, a fold and one fft
+    def __init__(self, num_channels: int, decimation: int = None, taps: np.ndarray = None, taps_per_channel: int = 8):
+        super().__init__(num_channels, decimation, taps, taps_per_channel)
+        self.reversed_taps: np.ndarray = self.taps[::-1].copy() # windows are chronological, the filter runs newest sample first
+        self.history: np.ndarray = np.zeros(self.filter_length - 1, dtype=complex)
+        self.offset: int = 0 # position of the next output relative to the start of the next frame
+
+    def reset(self) -> None:
+        self.history[:] = 0
+        self.offset = 0
+        self.vector_index = 0
+
+    def process(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values)
+        if values.ndim != 1:
+            raise ValueError("The analysis bank splits a single stream")
+
+        extended: np.ndarray = np.concatenate((self.history, values))
+        positions: np.ndarray = np.arange(self.offset, len(values), self.decimation)
+        if not len(positions): # frame ends before the next output vector
+            self.offset -= len(values)
+            self.history = extended[len(extended) - (self.filter_length - 1):]
+            return np.zeros((self.num_channels, 0), dtype=complex)
+
+
+        # y_k[m] = sum_l h[l] x[mD - l] e^(-2j pi k (mD - l) / N), folded into N polyphase sums and one inverse fft
+        windows: np.ndarray = np.lib.stride_tricks.sliding_window_view(extended, self.filter_length)[positions]
+        folded: np.ndarray = (windows * self.reversed_taps).reshape(len(positions), self.taps_per_channel, self.num_channels).sum(axis=1)[:, ::-1] # folded[r] sums the terms with l = r mod N
+
+        channels: np.ndarray = self.plan.inverse(folded, scale=False) * self.rotations[self.shifts(len(positions))]
+
+        self.vector_index += len(positions)
+        self.offset = int(positions[-1]) + self.decimation - len(values)
+        self.history = extended[len(extended) - (self.filter_length - 1):]
+
+        return channels.T
+
+
+class SynthesisFilterBank(PolyphaseFilterBank): # inverse of the analysis bank, (num_channels, samples) channels in, decimation wideband samples out per input vector
+    def __init__(self, num_channels: int, decimation: int = None, taps: np.ndarray = None, taps_per_channel: int = 8):
+        super().__init__(num_channels, decimation, taps, taps_per_channel)
+        self.interpolation_taps: np.ndarray = self.taps * self.decimation # makes up for the zeros between input vectors
+        self.blocks_per_filter: int = self.filter_length // self.decimation
+        self.tail: np.ndarray = np.zeros((self.blocks_per_filter - 1, self.decimation), dtype=complex) # overlap add of vectors that are not finished yet
+
+    def reset(self) -> None:
+        self.tail[:] = 0
+        self.vector_index = 0
+
+    def process(self, values: np.ndarray) -> np.ndarray:
+        values = np.asarray(values)
+        if values.ndim != 2 or values.shape[0] != self.num_channels:
+            raise ValueError(f"The synthesis bank takes ({self.num_channels}, samples) frames")
+
+        count: int = values.shape[1]
+        if not count:
+            return np.zeros(0, dtype=complex)
+
+        # vector m adds g[l] * sum_k y_k[m] e^(2j pi k (mD + l) / N) to output sample mD + l
+        rotated: np.ndarray = values.T * np.conj(self.rotations[self.shifts(count)])
+        periods: np.ndarray = self.plan.inverse(rotated, scale=False)
+        contributions: np.ndarray = (np.tile(periods, self.taps_per_channel) * self.interpolation_taps).reshape(count, self.blocks_per_filter, self.decimation)
+
+        accumulator: np.ndarray = np.zeros((count + self.blocks_per_filter - 1, self.decimation), dtype=complex)
+        accumulator[:self.blocks_per_filter - 1] = self.tail
+        for block in range(self.blocks_per_filter): # a handful of shifted adds, each across every vector at once
+            accumulator[block:block + count] += contributions[:, block]
+
+        self.vector_index += count
+        self.tail = accumulator[count:].copy()
+
+        return accumulator[:count].reshape(-1)
@@ -1,7 +1,8 @@
-from math import pi, sin, cos, atan2
-from generate_signal import generate_signal_sin
-import matplotlib.pyplot as plt
+from math import pi, sin, cos, atan2, log2
+from .generate_signal import generate_signal_sin
 from numpy import convolve
+import numpy as np
+from .fft import FFTPlan, get_fft_plan
 
 
 def convolver(convolved, convolving, x_axis_len, time_step):
@@ -25,17 +26,121 @@ def hilbert_kernel(time):
         return 0
     return 1 / (pi * time)
 
+def windowed_sinc_lowpass(num_taps: int, cutoff_frequency: float, samples_per_second: float) -> np.ndarray: # hamming windowed, unity gain at dc
+    normalized_cutoff: float = cutoff_frequency / samples_per_second
+    offsets: np.ndarray = np.arange(num_taps) - (num_taps - 1) / 2
 
-time_axis, mag_axis = generate_signal_sin(500, 0.1, 1)
-hilbert = convolver(lambda x: sin(2 * pi * x), hilbert_kernel, 500, 0.1)
-hilbert_2 = convolve(mag_axis, [hilbert_kernel(index * 0.1) for index in range(500)])
+    taps: np.ndarray = 2 * normalized_cutoff * np.sinc(2 * normalized_cutoff * offsets) * np.hamming(num_taps)
 
-phase = [0 for x in range(len(time_axis))]
+    return taps / np.sum(taps)
 
-for index, (real_value, imaginary_value) in enumerate(zip(mag_axis, hilbert)):
-    phase[index] = atan2(imaginary_value, real_value)
 
-plt.plot(time_axis, mag_axis)
-plt.plot(time_axis, hilbert)
-plt.plot(time_axis, hilbert_2[499:])
-plt.show()
\ No newline at end of file
+# path costs in units of one np.convolve multiply accumulate, fitted to benchmark_convolution_crossover in benchmark.py. The fft plan is pure numpy, so overlap save only pays off for kernels of a couple of thousand taps
+FFT_COST_PER_POINT: float = 65.0 # per point per radix 2 stage of a block's forward and inverse transform
+OVERLAP_SAVE_FIXED_COST: float = 1e6 # python overhead of one overlap save call, whatever its size
+ROW_LOOP_MIN_WORK: int = 4096 # multiply accumulates per channel above which np.convolve row by row beats one strided matmul
+
+
+class OverlapSaveConvolver: # streaming fir. The last len(kernel) - 1 inputs are kept between calls so consecutive frames filter as one signal. Filters along the last axis, (channels, samples) frames keep a history per channel
+    def __init__(self, kernel: np.ndarray, direct_threshold: int = None, fft_size: int = None, dtype: np.dtype = None): # dtype is the real working precision, e.g. float32. Defaults to the kernel's own. direct_threshold None picks the cheaper path per frame, a kernel length pins kernels up to it to direct convolution and longer ones to overlap save
+        self.kernel: np.ndarray = np.asarray(kernel)
+        precision: np.dtype = np.dtype(dtype) if dtype else self.kernel.real.dtype
+        complex_dtype: np.dtype = np.result_type(precision, np.complex64)
+        self.kernel = self.kernel.astype(complex_dtype if np.iscomplexobj(self.kernel) else precision, copy=False)
+        self.kernel_length: int = len(self.kernel)
+        if self.kernel_length < 1:
+            raise ValueError("Kernel must have at least one tap")
+
+        self.history: np.ndarray = np.zeros(self.kernel_length - 1, dtype=self.kernel.dtype)
+        self.direct_threshold: int = direct_threshold
+        self.direct: bool = direct_threshold is not None and self.kernel_length <= direct_threshold
+
+        self.plan: FFTPlan = None
+        if not self.direct:
+            self.fft_size: int = fft_size if fft_size else 1 << (4 * self.kernel_length - 1).bit_length()
+            if self.fft_size < self.kernel_length:
+                raise ValueError("FFT size must be at least the kernel length")
+
+            self.plan = get_fft_plan(self.fft_size, complex_dtype)
+            self.step_size: int = self.fft_size - (self.kernel_length - 1) # new outputs per fft block
+
+            padded_kernel: np.ndarray = np.zeros(self.fft_size, dtype=self.kernel.dtype)
+            padded_kernel[:self.kernel_length] = self.kernel
+
+            self.kernel_spectrum: np.ndarray = self.plan.forward(padded_kernel)
+            self.real_kernel_spectrum: np.ndarray = None if np.iscomplexobj(self.kernel) else self.plan.rfft(padded_kernel)
+
+    def reset(self) -> None:
+        self.history[:] = 0
+
+    def prefers_direct(self, num_outputs: int, num_rows: int = 1) -> bool: # compares the estimated cost of both paths for one frame
+        if self.direct or num_outputs < self.kernel_length: # a whole fft block for a handful of samples is mostly wasted work
+            return True
+        if self.direct_threshold is not None:
+            return False
+
+        num_blocks: int = -(-num_outputs // self.step_size)
+        overlap_save_cost: float = OVERLAP_SAVE_FIXED_COST + num_rows * num_blocks * self.fft_size * log2(self.fft_size) * FFT_COST_PER_POINT
+
+        return num_rows * num_outputs * self.kernel_length <= overlap_save_cost
+
+    def process(self, values: np.ndarray) -> np.ndarray: # one output per input
+        values = np.asarray(values)
+        num_outputs: int = values.shape[-1]
+        if num_outputs == 0: # np.convolve would swap its operands and return junk, the history stays as it is
+            return np.zeros(values.shape, dtype=np.result_type(values, self.kernel))
+
+        if self.history.shape[:-1] != values.shape[:-1]: # a new channel layout starts from silence
+            self.history = np.zeros(values.shape[:-1] + (self.kernel_length - 1,), dtype=self.kernel.dtype)
+
+        extended: np.ndarray = np.concatenate((self.history, values), axis=-1)
+
+        if self.prefers_direct(num_outputs, values.size // num_outputs):
+            output: np.ndarray = convolve(extended, self.kernel, mode="valid") if extended.ndim == 1 else self.__direct(extended, num_outputs)
+        else:
+            output: np.ndarray = self.__overlap_save(extended, num_outputs)
+
+        self.history = extended[..., extended.shape[-1] - (self.kernel_length - 1):]
+
+        return output
+
+    def __direct(self, extended: np.ndarray, num_outputs: int) -> np.ndarray: # np.convolve is 1d only. Long rows go through it one by one, many short ones as every window against the reversed kernel in one product
+        if num_outputs * self.kernel_length >= ROW_LOOP_MIN_WORK:
+            rows: np.ndarray = extended.reshape(-1, extended.shape[-1])
+            return np.stack([convolve(row, self.kernel, mode="valid") for row in rows]).reshape(extended.shape[:-1] + (num_outputs,))
+
+        return np.lib.stride_tricks.sliding_window_view(extended, self.kernel_length, axis=-1) @ self.kernel[::-1]
+
+    def __overlap_save(self, extended: np.ndarray, num_outputs: int) -> np.ndarray:
+        num_blocks: int = -(-num_outputs // self.step_size)
+        padded: np.ndarray = np.zeros(extended.shape[:-1] + ((num_blocks - 1) * self.step_size + self.fft_size,), dtype=extended.dtype)
+        padded[..., :extended.shape[-1]] = extended
+
+        # every block overlaps the previous one by kernel_length - 1 samples, all blocks (of every channel) go through the plan in one batch
+        blocks: np.ndarray = np.lib.stride_tricks.sliding_window_view(padded, self.fft_size, axis=-1)[..., ::self.step_size, :]
+
+        if self.real_kernel_spectrum is not None and not np.iscomplexobj(extended):
+            filtered: np.ndarray = self.plan.irfft(self.plan.rfft(blocks) * self.real_kernel_spectrum)
+        else:
+            filtered: np.ndarray = self.plan.inverse(self.plan.forward(blocks) * self.kernel_spectrum)
+
+        # the first kernel_length - 1 outputs of each block are wrapped around and thrown away
+        return filtered[..., self.kernel_length - 1:].reshape(extended.shape[:-1] + (-1,))[..., :num_outputs]
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    time_axis, mag_axis = generate_signal_sin(500, 0.1, 1)
+    hilbert = convolver(lambda x: sin(2 * pi * x), hilbert_kernel, 500, 0.1)
+    hilbert_2 = convolve(mag_axis, [hilbert_kernel(index * 0.1) for index in range(500)])
+
+    phase = [0 for x in range(len(time_axis))]
+
+    for index, (real_value, imaginary_value) in enumerate(zip(mag_axis, hilbert)):
+        phase[index] = atan2(imaginary_value, real_value)
+
+    plt.plot(time_axis, mag_axis)
+    plt.plot(time_axis, hilbert)
+    plt.plot(time_axis, hilbert_2[499:])
+    plt.show()
@@ -1,68 +1,58 @@
 from math import sin, pi, e, sqrt
 from numpy import complex64, real, imag
-import matplotlib.pyplot as plt
 from time import time
 
 SAMPLES_PER_SECOND = 34500
 
 
-signal: list = []
-
-
-timey = 0.0
-
-time_axis = []
-amplitude_axis = []
-
-
 def get_max_k(sps: int):
     return sps / 2
 
-x = 0
-# generate the input discrete time signal
-while x < 4096:
-    time_axis.append(timey)
-    amplitude_axis.append(sin(2 * pi * timey * 1000 + pi) + 3 * sin(2 * pi * timey * 5000) + sin(2 * pi * timey * 17000) + sin(2 * pi * timey * 7000 + pi))
-    timey += (1 / SAMPLES_PER_SECOND)
-    x+=1
+def test_signal(num_samples: int, sps: int) -> tuple[list[float], list[float]]: # the four tone signal the transforms were first tried on
+    time_axis = [x / sps for x in range(num_samples)]
+    amplitude_axis = [sin(2 * pi * timey * 1000 + pi) + 3 * sin(2 * pi * timey * 5000) + sin(2 * pi * timey * 17000) + sin(2 * pi * timey * 7000 + pi) for timey in time_axis]
+
+    return time_axis, amplitude_axis
+
+def naive_dft(amplitude_axis: list[float]) -> list[complex]: # O(N^2) straight from the definition
+    frequency_bins = []
+    N = len(amplitude_axis)
 
+    for k in range(N):
+        frequency_contribution = 0
+        for n in range(N):
+            amplitude_value = amplitude_axis[n]
+            frequency_contribution += amplitude_value * (e ** (-2j * pi * k * n / N))
+        frequency_bins.append(frequency_contribution)
 
-# dft
+    return frequency_bins
 
-frequency_bins = []
-N = len(time_axis)
+def naive_idft(frequency_bins: list[complex]) -> list[float]:
+    reassembled = []
+    N = len(frequency_bins)
 
-time_start = time()
+    for k in range(N):
+        time_domain_value = 0
+        for n in range(N):
+            amplitude_value = frequency_bins[n]
+            time_domain_value += amplitude_value * (e ** (2j * pi * k * n / N))
+        reassembled.append(time_domain_value)
 
-for k in range(len(time_axis)):
-    frequency_contribution = 0
-    for n in range(N):
-        amplitude_value = amplitude_axis[n]
-        frequency_contribution += amplitude_value * (e ** (-2j * pi * k * n / N))
-    frequency_bins.append(frequency_contribution) 
+    return [real(value) / N for value in reassembled] # amplitude is only the real component. Imaginary component is phase
 
-#print(time.time() - start)
-frequencies_real = [abs(frequency) for frequency in frequency_bins]
-print(time() - time_start)
 
-frequencies = [k * (SAMPLES_PER_SECOND / N) for k in range(N)]
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
 
-# plt.plot(frequencies, frequencies_real)
-# plt.show()
+    time_axis, amplitude_axis = test_signal(4096, SAMPLES_PER_SECOND)
+    N = len(time_axis)
 
-#idft
-# reassembled = []
-# start = time.time()
-# for k in range(len(time_axis)):
-#     time_domain_value = 0
-#     for n in range(N):
-#         amplitude_value = frequency_bins[n]
-#         time_domain_value += amplitude_value * (e ** (2j * pi * k * n / N))
-#     reassembled.append(time_domain_value) 
+    time_start = time()
+    frequency_bins = naive_dft(amplitude_axis)
+    print(time() - time_start)
 
-# reassembled = [real(value) / N for value in reassembled] # amplitude is only the real component. Imaginary component is phase
-# print(time.time() - start)
+    frequencies_real = [abs(frequency) for frequency in frequency_bins]
+    frequencies = [k * (SAMPLES_PER_SECOND / N) for k in range(N)]
 
-# plt.plot(time_axis, reassembled)
-# plt.plot(time_axis, amplitude_axis)
-# plt.show()
+    plt.plot(frequencies, frequencies_real)
+    plt.show()
@@ -1,23 +1,25 @@
-from math import pi
-
-
-def range_wraparound(value: float, max_value: float, min_value: float) -> float:
-    while value > max_value:
-        value -= max_value
-    while value < min_value:
-        value += max_value
-    
-    return value
-
-
-class DSPTimeSync:
-    def __init__(self, sps: int):
+class DSPTimeSync: # integer sample counter. Seconds are derived from the count, so the clock neither wraps nor accumulates rounding error
+    def __init__(self, sps: int, start_time: float = 0.0):
         self.sps: int = sps
-        self.time: float = 0.0
         self.time_step: float = 1.0 / self.sps
+        self.start_sample: int = self.seconds_to_samples(start_time)
+        self.sample: int = self.start_sample
     
+    def increment_time(self, samples: int = 1) -> None:
+        self.sample += samples
+
+    @property
+    def time(self) -> float: # seconds
+        return self.samples_to_seconds(self.sample)
+
     def get_time(self) -> float:
-        time_value: float = self.time
-        self.time = range_wraparound(time_value + self.time_step, 0, 2 * pi)
+        return self.time
+
+    def elapsed_samples(self) -> int: # since the clock started
+        return self.sample - self.start_sample
+
+    def samples_to_seconds(self, samples: int) -> float:
+        return samples / self.sps
 
-        return time_value
\ No newline at end of file
+    def seconds_to_samples(self, seconds: float) -> int:
+        return int(round(seconds * self.sps))
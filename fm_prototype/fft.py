@@ -1,40 +1,18 @@
 from math import sin, pi, e, sqrt
 from numpy import complex64, real, imag, conj
-import matplotlib.pyplot as plt
+import numpy as np
 from time import time
 from threading import Thread
+from .index_algorithm import bit_reversal_permutation
 
 
 
 SAMPLES_PER_SECOND = 34000
 
 
-signal: list = []
-
-
-timey = 0.0
-
-time_axis = []
-amplitude_axis = []
-filter_response_axis = []
-
-
 def get_max_k(sps: int):
     return sps / 2
 
-x = 0
-# generate the input discrete time signal
-while x < 2048 * 16:
-    time_axis.append(timey)
-    amplitude_axis.append(sin(2 * pi * timey * 2500 + pi) + 3 * sin(2 * pi * timey * 5000) + sin(2 * pi * timey * 17000) + sin(2 * pi * timey * 7000 + pi) + sin(2 * pi * timey * 4300 + pi))
-    timey += (1 / SAMPLES_PER_SECOND)
-    filter_response_axis.append(1/(pi * timey))
-    x+= 1
-
-twiddles = [e ** (-2j * (pi / len(time_axis)) * index) for index in range(len(time_axis))]
-time_indicies = [x for x in range(len(time_axis))]
-
-
 def get_even_index_values(buffer: list[float]) -> list[float]:
     return buffer[::2]
 
@@ -50,7 +28,7 @@ def fft_iteration(buffer: list[float], length: int, stride: int) -> list[float]:
 
         even_fft = fft_iteration(even_values, length // 2, stride * 2)
         odd_fft = fft_iteration(odd_values, length // 2, stride * 2)
-    
+
     reassembled = [0 for x in range(length)]
 
     for index in range(length // 2):
@@ -64,6 +42,10 @@ def fft_iteration(buffer: list[float], length: int, stride: int) -> list[float]:
 
 def ifft_full(buffer: list[float]): # sort of understand. You gotta follow the idft formula and apply to fft where exponent sign is flipped. Conjugate of all inputs will reverse sign of complex components
     length = len(buffer)
+
+    if is_power_of_two(length):
+        return real(get_fft_plan(length).inverse(buffer))
+
     rearranged = [conj(x) for x in buffer] # conjugate all inputs
 
     result = fft_iteration(rearranged, len(rearranged), 1)
@@ -73,22 +55,158 @@ def ifft_full(buffer: list[float]): # sort of understand. You gotta follow the i
     return result_de_conj
 
 
-time_start = time()
+def is_power_of_two(size: int) -> bool:
+    return size > 0 and size & (size - 1) == 0
+
+
+class FFTPlan: # everything that only depends on the size is computed once, the transforms are then iterative in place butterflies over numpy arrays
+    def __init__(self, size: int, dtype: np.dtype = np.complex128): # complex64 plans halve the memory traffic at single precision
+        if not is_power_of_two(size):
+            raise ValueError("FFT size must be a power of two")
+
+        self.size: int = size
+        self.dtype: np.dtype = np.dtype(dtype)
+        if self.dtype.kind != "c":
+            raise ValueError("FFT plans work in a complex dtype")
+        self.real_dtype: np.dtype = np.empty(0, dtype=self.dtype).real.dtype
+        self.layers: int = size.bit_length() - 1
+        self.bit_reversal: np.ndarray = bit_reversal_permutation(self.layers)
+
+        twiddles: np.ndarray = np.exp(-2j * pi * np.arange(size // 2) / size).astype(self.dtype) # computed in double precision, then rounded once
+        self.stage_twiddles: list[np.ndarray] = []
+        self.inverse_stage_twiddles: list[np.ndarray] = []
+
+        half_length: int = 1
+        while half_length < size: # stage combining blocks of 2 * half_length uses every (size / (2 * half_length))th twiddle
+            stage: np.ndarray = twiddles[::size // (2 * half_length)].copy()
+            self.stage_twiddles.append(stage)
+            self.inverse_stage_twiddles.append(conj(stage))
+            half_length *= 2
+
+        # real input transforms pack even and odd samples into one half size complex transform, these untangle the result
+        self.real_twiddles: np.ndarray = np.exp(-2j * pi * np.arange(size // 2 + 1) / size).astype(self.dtype)
+
+    def __butterflies(self, buffer: np.ndarray, stage_twiddles: list[np.ndarray]) -> None: # buffer must already be in bit reversed order
+        for stage in stage_twiddles:
+            half_length: int = len(stage)
+            blocks: np.ndarray = buffer.reshape(buffer.shape[:-1] + (-1, 2 * half_length))
+            even: np.ndarray = blocks[..., :half_length]
+            odd: np.ndarray = blocks[..., half_length:]
+
+            product: np.ndarray = odd * stage
+            np.subtract(even, product, out=odd)
+            even += product
+
+    def __check_length(self, values: np.ndarray) -> None:
+        if values.shape[-1] != self.size:
+            raise ValueError(f"Expected {self.size} samples, got {values.shape[-1]}")
+
+    def forward(self, values: np.ndarray, out: np.ndarray = None) -> np.ndarray: # transforms along the last axis
+        values = np.asarray(values)
+        self.__check_length(values)
+
+        out = np.empty(values.shape, dtype=self.dtype) if out is None else out
+        out[...] = values[..., self.bit_reversal]
+        self.__butterflies(out, self.stage_twiddles)
+
+        return out
+
+    def inverse(self, values: np.ndarray, out: np.ndarray = None, scale: bool = True) -> np.ndarray:
+        values = np.asarray(values)
+        self.__check_length(values)
+
+        out = np.empty(values.shape, dtype=self.dtype) if out is None else out
+        out[...] = values[..., self.bit_reversal]
+        self.__butterflies(out, self.inverse_stage_twiddles)
+
+        if scale:
+            out /= self.size
+
+        return out
+
+    def rfft(self, values: np.ndarray) -> np.ndarray: # size real samples in, size / 2 + 1 bins out
+        values = np.asarray(values, dtype=self.real_dtype)
+        self.__check_length(values)
+        if self.size < 2:
+            raise ValueError("Real FFT needs at least 2 samples")
+
+        half_size: int = self.size // 2
+        packed: np.ndarray = get_fft_plan(half_size, self.dtype).forward(values[..., 0::2] + 1j * values[..., 1::2])
+
+        indices: np.ndarray = np.arange(half_size + 1)
+        packed_bins: np.ndarray = packed[..., indices % half_size]
+        mirrored_bins: np.ndarray = conj(packed[..., (half_size - indices) % half_size])
+
+        even_bins: np.ndarray = (packed_bins + mirrored_bins) / 2
+        odd_bins: np.ndarray = (packed_bins - mirrored_bins) / 2j
+
+        return even_bins + self.real_twiddles * odd_bins
+
+    def irfft(self, bins: np.ndarray) -> np.ndarray: # size / 2 + 1 bins in, size real samples out
+        bins = np.asarray(bins)
+        half_size: int = self.size // 2
+        if bins.shape[-1] != half_size + 1:
+            raise ValueError(f"Expected {half_size + 1} bins, got {bins.shape[-1]}")
+
+        indices: np.ndarray = np.arange(half_size)
+        mirrored_bins: np.ndarray = conj(bins[..., half_size - indices])
+        even_bins: np.ndarray = (bins[..., indices] + mirrored_bins) / 2
+        odd_bins: np.ndarray = (bins[..., indices] - mirrored_bins) / 2 * conj(self.real_twiddles[:half_size])
+
+        packed: np.ndarray = get_fft_plan(half_size, self.dtype).inverse(even_bins + 1j * odd_bins)
+
+        values: np.ndarray = np.empty(bins.shape[:-1] + (self.size,), dtype=self.real_dtype)
+        values[..., 0::2] = packed.real
+        values[..., 1::2] = packed.imag
+
+        return values
+
+
+fft_plans: dict[tuple, FFTPlan] = {}
+
+def get_fft_plan(size: int, dtype: np.dtype = np.complex128) -> FFTPlan:
+    key: tuple = (size, np.dtype(dtype))
+    if key not in fft_plans:
+        fft_plans[key] = FFTPlan(size, dtype)
+
+    return fft_plans[key]
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    from .generate_signal import MultitoneGenerator, sample_times
+
+    # generate the input discrete time signal, sines are cosines shifted back a quarter turn
+    time_axis = sample_times(0, 2048 * 16, SAMPLES_PER_SECOND).tolist()
+    amplitude_axis = MultitoneGenerator(SAMPLES_PER_SECOND, [2500, 5000, 17000, 7000, 4300], [1, 3, 1, 1, 1], [pi / 2, -pi / 2, -pi / 2, pi / 2, pi / 2]).generate(0, len(time_axis)).tolist()
+
+    twiddles = [e ** (-2j * (pi / len(time_axis)) * index) for index in range(len(time_axis))]
+    time_indicies = [x for x in range(len(time_axis))]
+
+
+    time_start = time()
+
+    bins = fft_iteration(amplitude_axis, len(amplitude_axis), 1)
+
+    magnitudes = [abs(mag) for mag in bins]
+
+    print(time() - time_start)
 
-bins = fft_iteration(amplitude_axis, len(amplitude_axis), 1)
+    time_start = time()
 
-magnitudes = [abs(mag) for mag in bins]
+    plan_bins = get_fft_plan(len(amplitude_axis)).forward(amplitude_axis)
 
-print(time() - time_start)
+    print(time() - time_start)
 
-frequencies_axis = [k * (SAMPLES_PER_SECOND / len(time_axis)) for k in range(len(time_axis))]
+    frequencies_axis = [k * (SAMPLES_PER_SECOND / len(time_axis)) for k in range(len(time_axis))]
 
-# plt.plot(frequencies_axis, magnitudes)
-# plt.show()
+    # plt.plot(frequencies_axis, magnitudes)
+    # plt.show()
 
 
-ifft = ifft_full(bins)
+    ifft = ifft_full(bins)
 
-# plt.plot(time_axis, [real(x) for x in ifft])#ifft_full(bins))
-# plt.plot(time_axis, amplitude_axis)
-# plt.show()
\ No newline at end of file
+    # plt.plot(time_axis, [real(x) for x in ifft])#ifft_full(bins))
+    # plt.plot(time_axis, amplitude_axis)
+    # plt.show()
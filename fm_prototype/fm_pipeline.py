@@ -1,38 +1,41 @@
-from threading import Thread, Lock
+from threading import Thread, Lock, Event
+from multiprocessing import Process, Queue
+from copy import copy
 from abc import ABC, abstractmethod
 from typing import Callable
-from time import sleep
+from time import sleep, monotonic
 from math import pi, sin, cos, e
+import numpy as np
+from .fft import FFTPlan, get_fft_plan, is_power_of_two
+from .convolution import OverlapSaveConvolver
+from .hilbert import analytic_fir_taps
+from .nco import NumericallyControlledOscillator
+from .resample import PolyphaseResampler
+from .channelizer import AnalysisFilterBank, SynthesisFilterBank
+from .spectrum import WelchEstimator
+from .metrics import PipelineMetrics, StageMetrics, frame_length
+from .pacing import FramePacer
+from .numeric import NumericMode, FLOAT64, fixed_point_fft, get_numeric_mode
+from .dsp_sync import DSPTimeSync
 
 
-def range_wraparound(value: float, min_value: float, max_value: float) -> float:
-    range = max_value - min_value
-
-    while value > max_value:
-        value -= range
-    while value < min_value:
-        value += range
-    
-    return value
+class AbstractLock(ABC):
+    pass # will need this later for platform independence when converted to c++
 
 
-class DSPTimeSync:
-    def __init__(self, sps: int, start_time: float = 0.0):
-        self.sps: int = sps
-        self.time: float = start_time
-        self.time_step: float = 1.0 / self.sps
-    
-    def increment_time(self) -> None:
-        self.time = range_wraparound(self.time + self.time_step, 0, 2 * pi)
+class BufferClosedError(Exception):
+    pass
 
-    def get_time(self) -> float:
-        time_value: float = self.time
 
-        return time_value
+def release_lock(lock: Lock) -> None: # a close may already have released it
+    try:
+        lock.release()
+    except RuntimeError:
+        pass
 
 
-class AbstractLock(ABC):
-    pass # will need this later for platform independence when converted to c++
+def is_empty_frame(value) -> bool: # rate changing steps return zero length frames until enough input has come in for an output. Those are never pushed on
+    return isinstance(value, np.ndarray) and value.shape[-1:] == (0,)
 
 
 class AbstractBuffer(ABC):
@@ -46,6 +49,10 @@ class AbstractBuffer(ABC):
         self.samples_per_second: int = samples_per_second
         self.buffer: list[float] = [0.0 for x in range(buffer_length)]
 
+        self.closed: bool = False
+        self.drained: bool = False # the last frame pushed before the close has been pulled
+        self.pushes: int = 0
+
     @abstractmethod
     def pull_operation(self) -> list[float]:
         pass
@@ -55,32 +62,93 @@ class AbstractBuffer(ABC):
         pass
 
     def pull(self) -> list[float]:
-        self.push_lock.release()
+        if self.drained:
+            raise BufferClosedError("Buffer closed and drained")
+        release_lock(self.push_lock)
         
+        pushes: int = self.pushes
         value: list[float] = self.pull_operation()
         
-        self.pull_lock.acquire()
+        if not self.closed:
+            self.pull_lock.acquire()
+        if self.closed and self.pushes == pushes: # woken by the close rather than a push, what was read is the last frame
+            self.drained = True
         
         return value
     
     def push(self, value: list[float]) -> None:
+        if self.closed:
+            raise BufferClosedError("Cannot push to a closed buffer")
         self.push_lock.acquire()
+        if self.closed:
+            raise BufferClosedError("Cannot push to a closed buffer")
         
         self.push_operation(value)
+        self.pushes += 1
         
-        self.pull_lock.release()
+        release_lock(self.pull_lock)
 
-    def grab_all(self, value: list[float]) -> list[float]:
+    def grab_all(self) -> list[float]:
         return self.buffer
+    
+    def close(self) -> None: # wakes whichever side is blocked, both then see the buffer is closed
+        self.closed = True
+        release_lock(self.pull_lock)
+        release_lock(self.push_lock)
+
+    def non_blocking(self) -> bool: # whether try_push / try_pull style access is available
+        return False
+
+class CircularHistory: # every sample is written twice into a double length array, so the newest first window is always one contiguous slice
+    def __init__(self, length: int, dtype: type = float):
+        if length < 1:
+            raise ValueError("History length must be at least 1")
+        
+        self.length: int = length
+        self.storage: np.ndarray = np.zeros(2 * length, dtype=dtype)
+        self.position: int = 0 # index of the newest sample
 
-class TimeDomainBuffer(AbstractBuffer):
-    def __init__(self, buffer_length: int, samples_per_second: int):
-        super().__init__(buffer_length, samples_per_second)
+    def append(self, value: float) -> float: # returns the sample that falls off the end of the window
+        oldest: float = self.storage[self.position + self.length - 1]
+
+        self.position = (self.position - 1) % self.length
+        self.storage[self.position] = value
+        self.storage[self.position + self.length] = value
+
+        return oldest
+    
+    def extend(self, values: np.ndarray) -> None: # values in chronological order, same result as appending them one by one
+        values = np.asarray(values)[-self.length:]
+        self.promote(values)
+        indices: np.ndarray = (self.position - 1 - np.arange(len(values))) % self.length
+
+        self.storage[indices] = values
+        self.storage[indices + self.length] = values
+        self.position = (self.position - len(values)) % self.length
+
+    def promote(self, value) -> None: # widens the storage to hold value, e.g. complex samples into a real history, instead of casting the imaginary part away
+        dtype: np.dtype = np.result_type(self.storage, value)
+        if dtype != self.storage.dtype:
+            self.storage = self.storage.astype(dtype)
+
+    def view(self) -> np.ndarray: # zero copy, newest sample first. Only valid until the next append
+        return self.storage[self.position:self.position + self.length]
+    
+    def snapshot(self) -> np.ndarray:
+        return self.view().copy()
+    
+    def oldest(self) -> float:
+        return self.storage[self.position + self.length - 1]
+
+
+class TimeDomainBuffer(AbstractBuffer): # the history starts out in the pipeline's real dtype and turns complex when a complex producer (hilbert, iq combine, mixer) pushes into it
+    def __init__(self, buffer_length: int, samples_per_second: int, dtype: np.dtype = float):
+        super().__init__(0, samples_per_second)
+        self.history: CircularHistory = CircularHistory(buffer_length, dtype)
         self.source_value: float = 0.0
 
     def pull_operation(self) -> list[float]:
-        value: float = self.buffer[-1]
-        self.buffer = [self.source_value] + self.buffer[0:-1]
+        value: float = self.history.append(self.source_value)
         
         return [value]
     
@@ -88,6 +156,14 @@ class TimeDomainBuffer(AbstractBuffer):
         if len(value) != 1:
             raise ValueError("Time domain values must be scalar (1 element list)")
         self.source_value = value[0]
+        if np.iscomplexobj(self.source_value) and not np.iscomplexobj(self.history.storage):
+            self.history.promote(self.source_value)
+
+    def grab_all(self) -> np.ndarray: # newest sample first, zero copy view of the history
+        return self.history.view()
+    
+    def snapshot(self) -> np.ndarray:
+        return self.history.snapshot()
 
 
 class FrequencyDomainBuffer(AbstractBuffer):
@@ -106,11 +182,230 @@ class FrequencyDomainBuffer(AbstractBuffer):
     def get_real(self) -> list[float]:
         return [abs(frequency) for frequency in self.buffer]
 
+
+class FrameBuffer(AbstractBuffer): # block mode, one numpy frame moves per push/pull handshake instead of one sample
+    def __init__(self, frame_size: int, samples_per_second: int, dtype: np.dtype = float):
+        super().__init__(0, samples_per_second)
+        self.frame_size: int = frame_size
+        self.buffer: np.ndarray = np.zeros(frame_size, dtype=dtype)
+
+    def pull(self) -> np.ndarray: # waits for the push before reading, unlike the sample handshake. Handing out the initial frame would add a stale frame per hop
+        if self.drained:
+            raise BufferClosedError("Buffer closed and drained")
+
+        pushes: int = self.pushes
+        release_lock(self.push_lock)
+
+        if not self.closed:
+            self.pull_lock.acquire()
+        if self.pushes == pushes: # woken by the close, nothing new was pushed
+            self.drained = True
+            raise BufferClosedError("Buffer closed and drained")
+
+        return self.pull_operation()
+
+    def pull_operation(self) -> np.ndarray:
+        return self.buffer
+    
+    def push_operation(self, value: np.ndarray) -> None: # frame length is not enforced, steps like the dft may emit a different length than they take in
+        self.buffer = np.asarray(value)
+
+
+class RingBuffer(AbstractBuffer): # single producer single consumer. Producer only moves the tail, consumer only moves the head, so the data path needs no lock
+    def __init__(self, capacity: int, frame_size: int, samples_per_second: int, high_watermark: int = None, low_watermark: int = None, channels: int = 1): # a producer that fills the ring to high_watermark stays blocked until the consumer drains it to low_watermark. The defaults block only while the ring is full
+        super().__init__(0, samples_per_second)
+        if capacity < 1:
+            raise ValueError("Ring buffer capacity must be at least 1")
+        
+        high_watermark = capacity if high_watermark is None else high_watermark
+        low_watermark = high_watermark - 1 if low_watermark is None else low_watermark
+        if not 0 <= low_watermark < high_watermark <= capacity:
+            raise ValueError("Watermarks must satisfy 0 <= low < high <= capacity")
+
+        self.capacity: int = capacity
+        self.frame_size: int = frame_size # expected samples per frame, sizes the shared memory slots when the steps move into processes
+        self.channels: int = channels # frame_size counts the samples of every channel
+        self.high_watermark: int = high_watermark
+        self.low_watermark: int = low_watermark
+        self.throttled: bool = False # producer side only, between reaching the high watermark and draining to the low one
+
+        # frames are handed over by reference, not copied into preallocated storage. Stages change frame shape and dtype, and a pulled frame outlives its slot
+        self.slots: list = [None for x in range(capacity)]
+        self.head: int = 0 # total frames pulled
+        self.tail: int = 0 # total frames pushed
+        self.closed: bool = False
+
+        # events are only touched when one side actually has to block
+        self.readable: Event = Event()
+        self.writable: Event = Event()
+        self.consumer_waiting: bool = False
+        self.producer_waiting: bool = False
+        self.watchers: list[Event] = [] # worker threads servicing several buffers at once wait on these instead
+
+    def add_watcher(self, watcher: Event) -> None: # set on every push, pull and close
+        self.watchers.append(watcher)
+
+    def non_blocking(self) -> bool:
+        return True
+
+    def occupancy(self) -> int:
+        return self.tail - self.head
+    
+    def is_empty(self) -> bool:
+        return self.tail == self.head
+    
+    def is_full(self) -> bool: # producer side, applies the watermark hysteresis
+        occupancy: int = self.tail - self.head
+        if occupancy >= self.high_watermark:
+            self.throttled = True
+        elif occupancy <= self.low_watermark:
+            self.throttled = False
+
+        return self.throttled
+    
+    def above_high_watermark(self) -> bool:
+        return self.occupancy() >= self.high_watermark
+    
+    def below_low_watermark(self) -> bool:
+        return self.occupancy() <= self.low_watermark
+
+    def pull_operation(self):
+        index: int = self.head % self.capacity
+        value = self.slots[index]
+        self.slots[index] = None
+        self.head += 1
+
+        return value
+    
+    def push_operation(self, value) -> None:
+        self.slots[self.tail % self.capacity] = value
+        self.tail += 1
+
+    def try_push(self, value) -> bool:
+        if self.closed:
+            raise BufferClosedError("Cannot push to a closed ring buffer")
+        if self.is_full():
+            return False
+        
+        self.push_operation(value)
+        if self.consumer_waiting:
+            self.readable.set()
+        for watcher in self.watchers:
+            watcher.set()
+
+        return True
+    
+    def try_pull(self): # None when there is nothing to pull yet
+        if self.is_empty():
+            if self.closed:
+                raise BufferClosedError("Ring buffer closed and drained")
+            return None
+        
+        value = self.pull_operation()
+        if self.producer_waiting and self.below_low_watermark(): # a throttled producer would only go back to sleep before this
+            self.writable.set()
+        for watcher in self.watchers:
+            watcher.set()
+
+        return value
+    
+    def push_blocking(self, value, timeout: float = None) -> bool:
+        deadline: float = None if timeout is None else monotonic() + timeout
+
+        while not self.try_push(value):
+            self.producer_waiting = True
+            self.writable.clear()
+
+            if self.is_full() and not self.closed: # re-check after clearing so a pull in between is not missed
+                remaining: float = None if deadline is None else deadline - monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.producer_waiting = False
+                    return False
+                self.writable.wait(remaining)
+            
+            self.producer_waiting = False
+
+        return True
+    
+    def pull_blocking(self, timeout: float = None):
+        deadline: float = None if timeout is None else monotonic() + timeout
+
+        while True:
+            value = self.try_pull()
+            if value is not None:
+                return value
+            
+            self.consumer_waiting = True
+            self.readable.clear()
+
+            if self.is_empty() and not self.closed:
+                remaining: float = None if deadline is None else deadline - monotonic()
+                if remaining is not None and remaining <= 0:
+                    self.consumer_waiting = False
+                    return None
+                self.readable.wait(remaining)
+
+            self.consumer_waiting = False
+
+    def pull(self):
+        return self.pull_blocking()
+    
+    def push(self, value) -> None:
+        self.push_blocking(value)
+
+    def close(self) -> None: # wakes both sides, remaining frames can still be drained
+        self.closed = True
+        self.readable.set()
+        self.writable.set()
+        for watcher in self.watchers:
+            watcher.set()
+
+
+class FanOutBuffer(AbstractBuffer): # producer side of a branch point. Every branch gets the same frame, made read only, instead of its own copy
+    def __init__(self, branches: list[AbstractBuffer]):
+        super().__init__(0, branches[0].samples_per_second)
+        self.branches: list[AbstractBuffer] = branches
+
+    def pull_operation(self):
+        raise TypeError("Fan out buffers are push only, pull from one of the branches")
+    
+    def push_operation(self, value) -> None:
+        if isinstance(value, np.ndarray):
+            value.flags.writeable = False
+
+        for branch in self.branches:
+            branch.push(value)
+
+    def pull(self):
+        return self.pull_operation()
+    
+    def push(self, value) -> None:
+        self.push_operation(value)
+
+    def is_full(self) -> bool:
+        return any(branch.is_full() for branch in self.branches)
+    
+    def add_watcher(self, watcher: Event) -> None:
+        for branch in self.branches:
+            branch.add_watcher(watcher)
+
+    def close(self) -> None:
+        for branch in self.branches:
+            branch.close()
+
+    def non_blocking(self) -> bool:
+        return all(branch.non_blocking() for branch in self.branches)
+
+
 class AbstractPipelineStep(ABC): # at the rewrite, the type system with template classes will enforce the use of time or frequency domain buffers
+    elementwise: bool = False # one frame in, one frame of the same length and rate out, samples only depend on their own input sample and state carried in order. Runs of these are fused into one stage
+
     def __init__(self):
         self.entry_buffer: AbstractBuffer = None
         self.exit_buffer: AbstractBuffer = None
         self.dsp_time_sync: DSPTimeSync = None
+        self.numeric_mode: NumericMode = FLOAT64
+        self.output_scale: float = 1.0 # fixed point steps may scale their output down to stay in range, float64 equivalent is output / output_scale
         
     def add_source(self, source: AbstractBuffer) -> None:
         if not self.entry_buffer:
@@ -120,54 +415,262 @@ class AbstractPipelineStep(ABC): # at the rewrite, the type system with template
         
     def add_time_sync(self, time_sync: DSPTimeSync) -> None:
         self.dsp_time_sync = time_sync
+
+    def set_numeric_mode(self, numeric_mode: NumericMode) -> None: # steps with precomputed tables or state override this to rebuild them in the mode's precision
+        self.numeric_mode = numeric_mode
         
+    def set_degraded(self, degraded: bool) -> None: # degrade overrun policy, steps with a cheaper lower quality path switch to it while the pipeline runs late
+        pass
+
     def set_sink(self, sink: AbstractBuffer) -> None:
         self.exit_buffer = sink
 
+    def get_entry_buffers(self) -> list[AbstractBuffer]:
+        return [self.entry_buffer]
+
     @abstractmethod
     def computation(self, value: list[float]) -> list[float]:
         pass
 
+    def output_bound(self, samples: int, channels: int) -> tuple[int, int]: # largest (samples per channel, channels) output for an input frame of that shape. Sizes the shared memory slots when steps run in other processes
+        return samples, channels
+
+    def finish(self) -> None: # input closed and drained, pass the end of the stream on downstream
+        if self.exit_buffer:
+            self.exit_buffer.close()
+
     def call(self):
-        value: list[float] = self.entry_buffer.pull()
+        try:
+            value: list[float] = self.entry_buffer.pull()
+        except BufferClosedError:
+            self.finish()
+            raise
+
         computed_value: list[float] = self.computation(value)
-        self.exit_buffer.push(computed_value)
+        if self.exit_buffer and not is_empty_frame(computed_value):
+            self.exit_buffer.push(computed_value)
+
+    def try_call(self) -> bool: # non blocking version of call for ring buffers, False when there was nothing to do
+        if self.exit_buffer and self.exit_buffer.is_full():
+            return False
+        
+        try:
+            value = self.entry_buffer.try_pull()
+        except BufferClosedError:
+            self.finish()
+            raise
+
+        if value is None:
+            return False
+        
+        computed_value = self.computation(value)
+        if self.exit_buffer and not is_empty_frame(computed_value):
+            self.exit_buffer.push(computed_value) # only producer and there was space, so this never blocks
+        return True
+
+
+class AbstractMergeStep(AbstractPipelineStep): # several inputs, computation gets a list with one frame from each source in the order they were added
+    def __init__(self):
+        super().__init__()
+        self.entry_buffers: list[AbstractBuffer] = []
+
+    def add_source(self, source: AbstractBuffer) -> None:
+        if not self.entry_buffer:
+            self.entry_buffer = source
+        self.entry_buffers.append(source)
+
+    def get_entry_buffers(self) -> list[AbstractBuffer]:
+        return self.entry_buffers
+
+    @abstractmethod
+    def computation(self, values: list) -> np.ndarray:
+        pass
+
+    def call(self):
+        try:
+            values: list = [buffer.pull() for buffer in self.entry_buffers]
+        except BufferClosedError:
+            self.finish()
+            raise
+
+        computed_value: np.ndarray = self.computation(values)
+        if not is_empty_frame(computed_value):
+            self.exit_buffer.push(computed_value)
+
+    def try_call(self) -> bool:
+        if self.exit_buffer.is_full():
+            return False
+        
+        for buffer in self.entry_buffers:
+            if buffer.is_empty():
+                if buffer.closed: # one input ran dry, nothing more can be merged
+                    self.finish()
+                    raise BufferClosedError("Merge input closed and drained")
+                return False
+        
+        values: list = [buffer.try_pull() for buffer in self.entry_buffers]
+        computed_value: np.ndarray = self.computation(values)
+        if not is_empty_frame(computed_value):
+            self.exit_buffer.push(computed_value)
+        return True
+
+
+class SinkStep(AbstractPipelineStep): # end of an extra branch, hands frames to a callable instead of a buffer
+    def __init__(self, sink: Callable, unwrap_samples: bool = False):
+        super().__init__()
+        self.sink: Callable = sink
+        self.unwrap_samples: bool = unwrap_samples # sample by sample pipelines pass the scalar like the main sink does
+
+    def set_sink(self, sink: AbstractBuffer) -> None:
+        pass
+
+    def computation(self, value: np.ndarray) -> None:
+        self.sink(value[0] if self.unwrap_samples else value)
+
+
+class FusedStep(AbstractPipelineStep): # a run of elementwise steps applied back to back on one frame, no buffers or thread handoffs between them. The pipeline builds these at run
+    def __init__(self, steps: list[AbstractPipelineStep]):
+        super().__init__()
+        self.steps: list[AbstractPipelineStep] = steps
+        self.entry_buffer = steps[0].entry_buffer
+        self.exit_buffer = steps[-1].exit_buffer
+        self.dsp_time_sync = steps[0].dsp_time_sync
+        self.numeric_mode = steps[-1].numeric_mode
+        self.output_scale = float(np.prod([step.output_scale for step in steps]))
+
+        for step in steps: # the members only keep their computations, the intermediate buffers are gone
+            step.entry_buffer = None
+            step.exit_buffer = None
+
+    def set_numeric_mode(self, numeric_mode: NumericMode) -> None:
+        super().set_numeric_mode(numeric_mode)
+        for step in self.steps:
+            step.set_numeric_mode(numeric_mode)
+        self.output_scale = float(np.prod([step.output_scale for step in self.steps]))
+
+    def set_degraded(self, degraded: bool) -> None:
+        for step in self.steps:
+            step.set_degraded(degraded)
+
+    def output_bound(self, samples: int, channels: int) -> tuple[int, int]:
+        for step in self.steps:
+            samples, channels = step.output_bound(samples, channels)
+
+        return samples, channels
+
+    def computation(self, value: np.ndarray) -> np.ndarray:
+        for step in self.steps:
+            value = step.computation(value)
+
+        return value
+
+
+def transform_tables(num_bins: int, numeric_mode: NumericMode, sign: int) -> tuple: # fft plan for power of two sizes, otherwise the full exponential matrix. Fixed point only has the radix 2 path
+    if not is_power_of_two(num_bins):
+        if numeric_mode.fixed_point:
+            raise ValueError("Fixed point transforms need a power of two size")
+        return None, np.exp(sign * 2j * pi * np.outer(np.arange(num_bins), np.arange(num_bins)) / num_bins).astype(numeric_mode.complex_dtype) # fallback for sizes the fft plan can't do
+
+    return get_fft_plan(num_bins, numeric_mode.complex_dtype), None
 
 
 class DFTStep(AbstractPipelineStep): # violates usual rule because it is the border between time and frequency domain
     def __init__(self, num_bins: int):
+        super().__init__()
         self.num_bins: int = num_bins
-        self.preallocated_exponentials: list[float] = [e ** (-2j * pi * k / num_bins) for k in range(num_bins)]
-
-    def computation(self, value: list[float]) -> list[float]: # not using the value like usual will shift phase. Matters? not know. hopefully not! since it shifts all phase...
-        amplitudes = self.entry_buffer.grab_all()
-        frequency_bins: list[float] = []
-        for k in self.preallocated_exponentials:
-            frequency_contribution = 0
-            for n in range(self.num_bins):
-                amplitude_value = amplitudes[n]
-                frequency_contribution += amplitude_value * (k ** n)
-            frequency_bins.append(frequency_contribution)
-
-        return frequency_bins
+        self.set_numeric_mode(FLOAT64)
+
+    def set_numeric_mode(self, numeric_mode: NumericMode) -> None:
+        super().set_numeric_mode(numeric_mode)
+        self.plan, self.preallocated_exponentials = transform_tables(self.num_bins, numeric_mode, -1)
+        self.output_scale = 1 / self.num_bins if numeric_mode.fixed_point else 1.0
+
+    def output_bound(self, samples: int, channels: int) -> tuple[int, int]:
+        return self.num_bins, channels
+
+    def computation(self, value: list[float]) -> np.ndarray: # not using the value like usual will shift phase. Matters? not know. hopefully not! since it shifts all phase...
+        if isinstance(self.entry_buffer, TimeDomainBuffer): # sample by sample, transform the history window
+            amplitudes: np.ndarray = np.asarray(self.entry_buffer.grab_all())[:self.num_bins]
+        else: # block mode, transform the frame itself, every channel of a (channels, samples) frame
+            amplitudes: np.ndarray = np.asarray(value)[..., :self.num_bins]
+
+        if self.numeric_mode.fixed_point:
+            return self.numeric_mode.to_frame(fixed_point_fft(self.plan, self.numeric_mode.from_frame(amplitudes)))
+        if self.plan:
+            return self.plan.forward(amplitudes)
+        
+        return amplitudes @ self.preallocated_exponentials # the matrix is symmetric, so this transforms along the last axis
+    
+
+class SlidingDFTStep(AbstractPipelineStep): # updates the bins in O(N) per new sample instead of redoing the whole window. Bins are over the window in chronological order
+    def __init__(self, num_bins: int, bins: list[int] = None, reanchor_interval: int = None):
+        super().__init__()
+        self.num_bins: int = num_bins
+        self.bins: np.ndarray = np.arange(num_bins) if bins is None else np.asarray(bins, dtype=int)
+        
+        if np.any((self.bins < 0) | (self.bins >= num_bins)):
+            raise ValueError("Selected bins must lie in [0, num_bins)")
+
+        self.reanchor_interval: int = num_bins if reanchor_interval is None else reanchor_interval # recurrence accumulates rounding error, so recompute from the window every so often
+        if self.reanchor_interval < 1:
+            raise ValueError("Re-anchor interval must be at least 1 sample")
+
+        self.plan, exponentials = transform_tables(num_bins, FLOAT64, -1)
+        self.selected_exponentials: np.ndarray = None if exponentials is None else exponentials[:, self.bins]
+        self.history: CircularHistory = CircularHistory(num_bins, dtype=complex)
+        self.frequency_bins: np.ndarray = np.zeros(len(self.bins), dtype=complex)
+        self.samples_since_anchor: int = 0
+
+    def output_bound(self, samples: int, channels: int) -> tuple[int, int]:
+        return len(self.bins), channels
+
+    def reanchor(self) -> None: # cached fft plan for power of two windows, otherwise only the selected columns of the dft matrix
+        window: np.ndarray = self.history.view()[::-1]
+        self.frequency_bins = self.plan.forward(window)[self.bins] if self.plan else window @ self.selected_exponentials
+        self.samples_since_anchor = 0
+
+    def computation(self, value: np.ndarray) -> np.ndarray: # emits the spectrum of the window ending at the last sample of value
+        samples: np.ndarray = np.asarray(value)
+        count: int = len(samples)
+        if count == 0:
+            return self.frequency_bins.copy()
+        if count >= self.num_bins or self.samples_since_anchor + count >= self.reanchor_interval: # the whole window is new or due for a re-anchor anyway
+            self.history.extend(samples)
+            self.reanchor()
+            return self.frequency_bins.copy()
+
+        oldest: np.ndarray = self.history.view()[::-1][:count].copy() # the samples leaving the window, oldest first
+        self.history.extend(samples)
+
+        # X_k(n) = (X_k(n - 1) + x(n) - x(n - N)) * e^(2j * pi * k / N), unrolled over the frame: each difference is rotated once per sample that follows it
+        rotations: np.ndarray = np.exp(2j * pi * np.outer(np.arange(count, 0, -1), self.bins) / self.num_bins)
+        self.frequency_bins = self.frequency_bins * rotations[0] + (samples - oldest) @ rotations
+        self.samples_since_anchor += count
+
+        return self.frequency_bins.copy()
     
 
 class IDFTStep(AbstractPipelineStep): # there must be a way to optimize these to work better with previous calculated values
     def __init__(self, num_bins: int):
+        super().__init__()
         self.num_bins: int = num_bins
-        self.preallocated_exponentials: list[float] = [e ** (2j * pi * k / num_bins) for k in range(num_bins)]
+        self.set_numeric_mode(FLOAT64)
 
-    def computation(self, value: list[float]) -> list[float]:
-        time_domain: list[float] = []
-
-        for k in self.preallocated_exponentials:
-            time_domain_value = 0
-            for n in range(self.num_bins):
-                amplitude_value = value[n]
-                time_domain_value += amplitude_value * (k ** n)
-            time_domain.append(time_domain_value)
-            
-        return time_domain
+    def set_numeric_mode(self, numeric_mode: NumericMode) -> None:
+        super().set_numeric_mode(numeric_mode)
+        self.plan, self.preallocated_exponentials = transform_tables(self.num_bins, numeric_mode, 1)
+        self.output_scale = 1 / self.num_bins if numeric_mode.fixed_point else 1.0
+
+    def output_bound(self, samples: int, channels: int) -> tuple[int, int]:
+        return self.num_bins, channels
+
+    def computation(self, value: np.ndarray) -> np.ndarray: # unscaled, same as summing the bins directly. Fixed point scales by 1 / num_bins like the forward transform
+        if self.numeric_mode.fixed_point:
+            return self.numeric_mode.to_frame(fixed_point_fft(self.plan, self.numeric_mode.from_frame(value), inverse=True))
+        if self.plan:
+            return self.plan.inverse(value, scale=False)
+        
+        return np.asarray(value) @ self.preallocated_exponentials
         
 class AbstractThreadUnit(ABC): # must be abstracted in prototype to simulate when library will be platform independent
     num_threads: int = 0
@@ -175,15 +678,28 @@ class AbstractThreadUnit(ABC): # must be abstracted in prototype to simulate whe
     def __init__(self, function: list[Callable]):
         self.functions: list[Callable] = function
         self.runflag = False
+        self.error: Exception = None # what stopped the unit, raised again from the orchestrator's wait and end
+        self.on_error: Callable = None # set by the orchestrator, stops the rest of the pipeline
         
         AbstractThreadUnit.num_threads += 1
         
         self.thread_number: int = AbstractThreadUnit.num_threads
 
     def run_function_pool(self):
-        while self.runflag:
-            for action in self.functions:
-                action()
+        try:
+            while self.runflag:
+                for action in self.functions:
+                    action()
+        except BufferClosedError:
+            self.runflag = False
+        except Exception as error:
+            self.fail(error)
+
+    def fail(self, error: Exception) -> None: # a step, the source or the sink raised. Without the close downstream units would wait forever on this one
+        self.error = error
+        self.runflag = False
+        if self.on_error:
+            self.on_error(error)
         
     @abstractmethod
     def run(self):
@@ -194,10 +710,11 @@ class AbstractThreadUnit(ABC): # must be abstracted in prototype to simulate whe
         pass
 
 class AbstractThreadOrchestrator(ABC):
-    def associate(self, source: Callable, sink: Callable, function_pool: list[AbstractPipelineStep]):
+    def associate(self, source: Callable, sink: Callable, function_pool: list[AbstractPipelineStep], max_threads: int = 1):
         self.source: Callable = source
         self.sink: Callable = sink
         self.function_pool: list[AbstractPipelineStep] = function_pool
+        self.max_threads: int = max_threads
         self.threading_pool: list[AbstractThreadUnit] = []
 
     @abstractmethod
@@ -207,94 +724,586 @@ class AbstractThreadOrchestrator(ABC):
     def run(self) -> None:
         self.threading_pool = self.orchestrate_threads(self.source, self.sink, self.function_pool)
         for thread in self.threading_pool:
+            thread.on_error = self.abort
             thread.runflag = True
             thread.run()
+
+    def abort(self, error: Exception) -> None: # closes every buffer, the remaining units run into BufferClosedError and stop
+        for step in self.function_pool:
+            for buffer in step.get_entry_buffers():
+                buffer.close()
+            if step.exit_buffer:
+                step.exit_buffer.close()
+
+    def raise_error(self) -> None: # the first unit error, in pipeline order
+        for thread in self.threading_pool:
+            if thread.error:
+                raise thread.error
+
+    def wait(self) -> None: # returns once every unit has stopped on its own, e.g. a finite source drained through to the sink. Raises the error of a failed unit
+        for thread in self.threading_pool:
+            thread.join()
+        self.raise_error()
         
     def end(self) -> None:
         for thread in self.threading_pool:
             thread.runflag = False
             thread.join()
+        self.raise_error()
 
 
 class Pipeline:
-    def __init__(self, source: Callable, sink: Callable, dsp_time_sync: DSPTimeSync, buffer_length: int, max_threads: int):
+    SOURCE: None = None # as an add_element input, takes frames straight from the pipeline source
+
+    def __init__(self, source: Callable, sink: Callable, dsp_time_sync: DSPTimeSync, buffer_length: int, max_threads: int, frame_size: int = 0, ring_capacity: int = 0, numeric_mode: NumericMode = FLOAT64, channels: int = 1, fuse_steps: bool = False): # frame_size 0 keeps the sample by sample mode, ring_capacity 0 keeps the lock pair buffers. numeric_mode is a NumericMode or its name. More than one channel makes frames (channels, frame_size). fuse_steps merges runs of elementwise steps into one stage at run. In sample mode that drops the delay line between fused steps, so output comes out one buffer delay sooner per fused pair. Block mode output is the same either way
         self.source: Callable = source
         self.sink: Callable = sink
 
-        self.source_buffer: SharedBuffer = SharedBuffer(buffer_length)
-        self.sink_buffer: SharedBuffer = SharedBuffer(buffer_length)
+        if buffer_length < 1:
+            raise ValueError("Buffer length must be at least 1")
+        if frame_size < 0:
+            raise ValueError("Frame size must be positive, or 0 for sample by sample mode")
+        if ring_capacity < 0:
+            raise ValueError("Ring capacity must be positive, or 0 for lock pair buffers")
+        if channels < 1:
+            raise ValueError("A pipeline needs at least one channel")
+        if channels > 1 and not frame_size:
+            raise ValueError("Multi channel pipelines need block mode, set a frame_size")
+
+        self.buffer_length: int = buffer_length
+        self.frame_size: int = frame_size
+        self.ring_capacity: int = ring_capacity
+        self.channels: int = channels
+        self.fuse_steps: bool = fuse_steps
+        self.numeric_mode: NumericMode = get_numeric_mode(numeric_mode) # source frames are converted into it, steps are set to it as they are added
+        self.time_sync: DSPTimeSync = dsp_time_sync
+        self.buffers: list[AbstractBuffer] = []
+
+        self.source_buffer: AbstractBuffer = self.__create_buffer()
+        self.sink_buffer: AbstractBuffer = self.__create_buffer()
 
         self.selected_step: AbstractPipelineStep = None
         
         self.num_steps: int = 2
         self.max_threads: int = max_threads
-        
-        if buffer_length < 1:
-            raise ValueError("Buffer length must be at least 1")
 
-        self.buffer_length: int = buffer_length
         self.function_pool: list[AbstractPipelineStep] = []
+        self.consumers: dict = {} # producer step (or SOURCE) -> the buffers its output feeds
+        self.output_time_syncs: dict = {Pipeline.SOURCE: dsp_time_sync} # producer step (or SOURCE) -> clock of the rate its output runs at
+        self.advanced_time_syncs: list[DSPTimeSync] = [] # clocks a resampler already keeps moving
+        self.sink_time_sync: DSPTimeSync = dsp_time_sync
+        self.sink_advances_time: bool = True
         self.thread_orchestrator: AbstractThreadOrchestrator = None
-        self.time_sync: DSPTimeSync = dsp_time_sync
-        
-    def add_element(self, step: AbstractPipelineStep):
-        if not self.selected_step:
-            step.add_source(self.source_buffer)
+        self.metrics: PipelineMetrics = None
+        self.pacer: FramePacer = None
+        self.source_object = source # the source itself, self.source may get wrapped. Skip ahead seeks it when it can
+
+    def __create_buffer(self, samples_per_second: float = None) -> AbstractBuffer:
+        samples_per_second = self.time_sync.sps if samples_per_second is None else samples_per_second
+
+        if self.ring_capacity:
+            buffer: AbstractBuffer = RingBuffer(self.ring_capacity, max(self.frame_size, 1) * self.channels, samples_per_second, channels=self.channels) # frame size counts the samples of every channel
+        elif self.frame_size:
+            buffer: AbstractBuffer = FrameBuffer(self.frame_size, samples_per_second, self.numeric_mode.real_dtype)
+            if self.channels > 1:
+                buffer.buffer = np.zeros((self.channels, self.frame_size), dtype=self.numeric_mode.real_dtype)
         else:
-            shared_buffer: SharedBuffer = SharedBuffer(self.buffer_length)
+            buffer: AbstractBuffer = TimeDomainBuffer(self.buffer_length, samples_per_second, self.numeric_mode.real_dtype)
+        
+        self.buffers.append(buffer)
+        return buffer
+        
+    def add_element(self, step: AbstractPipelineStep, inputs: list[AbstractPipelineStep] = None): # inputs defaults to the last added step, so plain add_element calls build a linear chain
+        if inputs is None:
+            inputs = [self.selected_step]
+        if not inputs:
+            raise ValueError("A step needs at least one input")
+        if isinstance(step, RateChangeStep) and not self.frame_size:
+            raise ValueError("Rate changing steps need block mode, their output length changes from frame to frame")
+        if isinstance(step, SlidingDFTStep) and not self.frame_size:
+            raise ValueError("Sliding DFT steps need block mode, every output is a frame of bins")
+        if isinstance(step, DFTStep) and not self.frame_size and step.num_bins > self.buffer_length:
+            raise ValueError("Sample mode DFT steps transform the buffer history, num_bins can't exceed the buffer_length")
+
+        for producer in inputs:
+            if producer is not Pipeline.SOURCE and producer not in self.function_pool:
+                raise ValueError("Step inputs must already be part of this pipeline")
+            
+        input_time_sync: DSPTimeSync = self.output_time_syncs[inputs[0]]
+        if any(self.output_time_syncs[producer] is not input_time_sync for producer in inputs):
+            raise ValueError("All inputs of a step must run at the same sample rate")
+
+        for producer in inputs:
+            if producer is Pipeline.SOURCE and Pipeline.SOURCE not in self.consumers:
+                shared_buffer: AbstractBuffer = self.source_buffer
+            else:
+                shared_buffer: AbstractBuffer = self.__create_buffer(input_time_sync.sps)
             
-            self.selected_step.set_sink(shared_buffer)
             step.add_source(shared_buffer)
+            self.consumers.setdefault(producer, []).append(shared_buffer)
+            self.__connect_outputs(producer)
         
-        step.add_time_sync(self.time_sync)
-        step.set_sink(self.sink_buffer)
+        step.add_time_sync(input_time_sync)
+        step.set_numeric_mode(self.numeric_mode)
+        self.output_time_syncs[step] = input_time_sync
+        if isinstance(step, RateChangeStep): # starts a new rate segment with its own clock
+            step.output_time_sync = DSPTimeSync(input_time_sync.sps * step.interpolation / step.decimation)
+            self.output_time_syncs[step] = step.output_time_sync
+
+            if not any(time_sync is input_time_sync for time_sync in self.advanced_time_syncs):
+                step.advances_input_clock = True
+                self.advanced_time_syncs.append(input_time_sync)
+
+        step.set_sink(self.sink_buffer) # until another step consumes its output
 
         self.function_pool.append(step)
         self.selected_step = step
         self.num_steps += 1
 
+    def add_sink(self, step: AbstractPipelineStep, sink: Callable) -> None: # extra output tapped off any step, the main sink stays on the last leaf
+        selected_step: AbstractPipelineStep = self.selected_step
+        self.add_element(SinkStep(sink, not self.frame_size), [step])
+        self.selected_step = selected_step
+
+    def __connect_outputs(self, producer: AbstractPipelineStep) -> None:
+        branches: list[AbstractBuffer] = self.consumers[producer]
+        output: AbstractBuffer = branches[0] if len(branches) == 1 else FanOutBuffer(branches)
+
+        if producer is Pipeline.SOURCE:
+            self.source_buffer = output
+        else:
+            producer.set_sink(output)
+
+    def __fuse_elementwise_steps(self, pinned_steps: list[AbstractPipelineStep]) -> None: # each run of elementwise steps joined by a single plain buffer becomes one FusedStep. Pinned steps (e.g. ones the orchestrator runs in their own process) stay as they are
+        def fusible(step: AbstractPipelineStep) -> bool:
+            return step.elementwise and not any(step is pinned for pinned in pinned_steps)
+
+        consumer_of: dict = {id(step.entry_buffer): step for step in self.function_pool if len(step.get_entry_buffers()) == 1}
+        fused_pool: list[AbstractPipelineStep] = []
+        fused_members: set = set()
+
+        for step in self.function_pool:
+            if id(step) in fused_members:
+                continue
+
+            run: list[AbstractPipelineStep] = [step]
+            while fusible(run[-1]) and len(self.consumers.get(run[-1], [])) == 1:
+                following: AbstractPipelineStep = consumer_of.get(id(self.consumers[run[-1]][0]))
+                if following is None or not fusible(following):
+                    break
+                run.append(following)
+
+            if len(run) == 1:
+                fused_pool.append(step)
+                continue
+
+            for member in run[:-1]:
+                self.buffers.remove(self.consumers.pop(member)[0])
+            fused: FusedStep = FusedStep(run)
+            if run[-1] in self.consumers:
+                self.consumers[fused] = self.consumers.pop(run[-1])
+            self.output_time_syncs[fused] = self.output_time_syncs[run[-1]]
+
+            fused_members.update(id(member) for member in run)
+            fused_pool.append(fused)
+
+        self.function_pool[:] = fused_pool
+
+    def __check_topology(self) -> None:
+        leaves: list[AbstractPipelineStep] = [step for step in self.function_pool if step not in self.consumers and not isinstance(step, SinkStep)]
+        if len(leaves) > 1:
+            raise ValueError("Only one step can feed the main sink, attach the other branches with add_sink")
+        
+        self.sink_time_sync = self.output_time_syncs[leaves[0]] if leaves else self.time_sync
+        self.sink_advances_time = not any(time_sync is self.sink_time_sync for time_sync in self.advanced_time_syncs)
+
+    def __skip_source(self, num_samples: int) -> None: # skip ahead overruns, seekable sources jump, the rest are read and thrown away
+        if hasattr(self.source_object, "seek") and hasattr(self.source_object, "position"):
+            try:
+                self.source_object.seek(self.source_object.position + num_samples)
+                self.pacer.record_skip(num_samples)
+                return
+            except ValueError: # past the end, let the reads below run into the EOFError
+                pass
+
+        skipped: int = 0
+        while skipped < num_samples:
+            skipped += frame_length(self.source())
+        self.pacer.record_skip(skipped)
+
     def __fill_source_buffer(self):
-        push_value: float = self.source()
+        try:
+            if self.pacer:
+                skip: int = self.pacer.take_skip()
+                if skip:
+                    self.__skip_source(skip)
+            source_value = self.source()
+        except EOFError: # finite sources (files, pipes) end the stream by closing the source buffer, the close is passed along step by step
+            self.source_buffer.close()
+            raise BufferClosedError("Pipeline source exhausted")
+
+        if self.frame_size:
+            push_value: np.ndarray = self.numeric_mode.to_frame(source_value)
+            if self.channels > 1 and (push_value.ndim != 2 or push_value.shape[0] != self.channels):
+                raise ValueError(f"Source frames must be shaped ({self.channels}, samples), got {push_value.shape}")
+        else:
+            push_value: np.ndarray = self.numeric_mode.to_frame([source_value])
+
+        if self.pacer:
+            self.pacer.release_source_frame(frame_length(push_value))
+            
         self.source_buffer.push(push_value)
 
     def __pull_sink_buffer(self):
-        pull_value: float = self.sink_buffer.pull()
-        self.sink(pull_value)
+        pull_value = self.sink_buffer.pull()
+
+        if self.pacer and not self.pacer.admit(frame_length(pull_value)):
+            if self.metrics:
+                self.metrics.stages["sink"].dropped_frames += 1
+        elif self.frame_size:
+            self.sink(pull_value)
+        else:
+            self.sink(pull_value[0])
 
-        self.time_sync.increment_time()
+        if self.sink_advances_time:
+            self.sink_time_sync.increment_time(np.shape(pull_value)[-1])
         
+    def enable_metrics(self, snapshot_interval: float = None, snapshot_callback: Callable = None) -> PipelineMetrics: # call before run. Snapshots go to the callback every snapshot_interval seconds, or collect in metrics.snapshots without one
+        self.metrics = PipelineMetrics(snapshot_interval, snapshot_callback)
+
+        return self.metrics
+
+    def enable_pacing(self, latency: float, overrun_policy: str = "drop", pace_source: bool = True, recovery_frames: int = 16) -> FramePacer: # call before run. Frames reach the sink latency seconds after their input would have arrived live, late ones are handled by the overrun policy
+        self.pacer = FramePacer(latency, overrun_policy, pace_source, recovery_frames)
+        self.pacer.degrade_callback = self.__set_degraded
+
+        return self.pacer
+
+    def __set_degraded(self, degraded: bool) -> None:
+        for step in self.function_pool:
+            step.set_degraded(degraded)
+
+    def get_metrics(self) -> dict: # live snapshot of every stage and buffer, None when metrics are off
+        return self.metrics.snapshot() if self.metrics else None
+
+    def __instrument(self) -> None:
+        source_stage: StageMetrics = self.metrics.add_stage("source", self.time_sync.sps)
+        self.source = self.metrics.timed_source(source_stage, self.source)
+        self.metrics.watch_output(source_stage, self.source_buffer, BufferClosedError)
+
+        for index, step in enumerate(self.function_pool):
+            name: str = f"{index}:{'+'.join(type(member).__name__ for member in step.steps) if isinstance(step, FusedStep) else type(step).__name__}"
+            stage: StageMetrics = self.metrics.add_stage(name, step.dsp_time_sync.sps)
+            step.computation = self.metrics.timed_callable(stage, step.computation, isinstance(step, AbstractMergeStep))
+
+            for input_index, buffer in enumerate(step.get_entry_buffers()):
+                self.metrics.watch_input(stage, buffer, f"{name} input {input_index}")
+            if step.exit_buffer:
+                self.metrics.watch_output(stage, step.exit_buffer, BufferClosedError)
+            self.metrics.watch_polling(stage, step, BufferClosedError)
+
+        sink_stage: StageMetrics = self.metrics.add_stage("sink", self.sink_time_sync.sps)
+        self.sink = self.metrics.timed_callable(sink_stage, self.sink)
+        self.metrics.watch_input(sink_stage, self.sink_buffer, "sink input")
+        self.metrics.pacer = self.pacer
+
     def run(self, thread_orchestrator: AbstractThreadOrchestrator) -> None:
+        if self.fuse_steps:
+            self.__fuse_elementwise_steps(getattr(thread_orchestrator, "process_steps", []))
+        self.__check_topology()
+        if self.metrics:
+            self.__instrument()
+            self.metrics.start()
+        if self.pacer:
+            self.pacer.start(DSPTimeSync(self.time_sync.sps), DSPTimeSync(self.sink_time_sync.sps))
+        
         self.thread_orchestrator = thread_orchestrator
-        self.thread_orchestrator.associate(self.__fill_source_buffer, self.__pull_sink_buffer, self.function_pool)
+        self.thread_orchestrator.associate(self.__fill_source_buffer, self.__pull_sink_buffer, self.function_pool, self.max_threads)
 
         self.thread_orchestrator.run()
         
+    def wait(self) -> None: # for finite sources, returns once the end of the stream reached the sink. An exception in a step, the source or the sink stops the pipeline and is raised here
+        self.thread_orchestrator.wait()
+
     def end(self) -> None:
-        self.thread_orchestrator.end()
+        for buffer in self.buffers:
+            buffer.close()
+        try:
+            self.thread_orchestrator.end()
+        finally:
+            if self.metrics:
+                self.metrics.stop()
             
 
 # barebones implementations
 class TestPipelineStep(AbstractPipelineStep):
-    def computation(self, value: float) -> float:
-        return value * 2
+    elementwise: bool = True
+
+    def computation(self, value: np.ndarray) -> np.ndarray:
+        if self.numeric_mode.fixed_point: # saturate instead of wrapping around int16
+            return self.numeric_mode.to_frame(np.multiply(self.numeric_mode.from_frame(value), 2))
+
+        return np.multiply(value, 2)
     
 
-class FMModulatorStep(AbstractPipelineStep):
-    def __init__(self, sps: int, center_frequency: float, frequency_deviation: float):
+class GainStep(AbstractPipelineStep): # constant scale factor, may be per channel for (channels, samples) frames
+    elementwise: bool = True
+
+    def __init__(self, gain: float):
+        super().__init__()
+        self.gain: np.ndarray = np.asarray(gain)
+        self.scale: np.ndarray = self.gain[..., None] if self.gain.ndim else self.gain # per channel gain broadcast along time
+
+    def computation(self, value: np.ndarray) -> np.ndarray:
+        if self.numeric_mode.fixed_point: # saturate instead of wrapping around int16
+            return self.numeric_mode.to_frame(self.numeric_mode.from_frame(value) * self.scale)
+
+        return np.multiply(value, self.scale)
+
+
+class FMModulatorStep(AbstractPipelineStep): # (channels, samples) frames modulate every channel at once, each with its own phase accumulator. center_frequency and frequency_deviation may be per channel
+    elementwise: bool = True
+
+    def __init__(self, sps: int, center_frequency: float, frequency_deviation: float, table_bits: int = 12, interpolate: bool = True):
         super().__init__()
         self.sps: int = sps
         self.center_frequency: float = center_frequency
-        self.modulation_index: float = frequency_deviation / center_frequency
+        self.modulation_index: float = np.asarray(frequency_deviation) / np.asarray(center_frequency)
+        self.modulation_scale: np.ndarray = self.modulation_index[..., None] # per channel index broadcast along time
+
+        self.table_bits: int = table_bits
+        self.interpolate: bool = interpolate
+        self.oscillator: NumericallyControlledOscillator = NumericallyControlledOscillator(sps, center_frequency, table_bits, interpolate) # carrier and phase integral both live in the integer phase accumulator
+
+    def set_numeric_mode(self, numeric_mode: NumericMode) -> None: # the table is rebuilt in the mode's precision, fixed point rounds the output to q15
+        super().set_numeric_mode(numeric_mode)
+        table_dtype: np.dtype = np.float64 if numeric_mode.fixed_point else numeric_mode.real_dtype
+        self.oscillator = NumericallyControlledOscillator(self.sps, self.center_frequency, self.table_bits, self.interpolate, dtype=table_dtype)
+        if numeric_mode.fixed_point:
+            self.oscillator.set_table(numeric_mode.quantize(self.oscillator.sine_table)) # slopes follow the quantized table, not the float one
+
+    def set_degraded(self, degraded: bool) -> None: # nearest table entry instead of interpolating between two
+        self.oscillator.interpolate = self.interpolate and not degraded
+
+    def computation(self, value: np.ndarray) -> np.ndarray: # value corresponds to a frame (or 1 element list) of the modulating signal
+        modulating: np.ndarray = self.numeric_mode.from_frame(value)
+        channels: int = modulating.shape[0] if modulating.ndim == 2 else None
+        if channels != self.oscillator.channels:
+            self.oscillator.set_channels(channels)
+
+        carrier: np.ndarray = self.oscillator.cosine(modulating.shape[-1], self.modulation_scale * modulating)
+
+        return self.numeric_mode.to_frame(carrier) if self.numeric_mode.fixed_point else carrier
+
+
+class FMDemodulatorStep(AbstractPipelineStep): # polar discriminator, the phase step between neighbouring complex samples is the instantaneous frequency
+    elementwise: bool = True
+
+    def __init__(self, sps: int, center_frequency: float, frequency_deviation: float, input_frequency: float = None): # input_frequency is where the carrier sits in the complex input, 0 for baseband. Defaults to center_frequency for analytic passband input
+        super().__init__()
+        self.sps: int = sps
+        self.center_frequency: float = center_frequency
+        self.modulation_index: float = frequency_deviation / center_frequency # same convention as FMModulatorStep so the two invert each other
+        self.input_frequency: float = center_frequency if input_frequency is None else input_frequency
+
+        self.previous_sample: complex = 0j # carried across frames so the first sample of a frame still has a neighbour, one per channel for (channels, samples) frames
+        self.working_dtype: np.dtype = np.dtype(complex)
+
+    def set_numeric_mode(self, numeric_mode: NumericMode) -> None: # float modes discriminate in their own precision, fixed point in float64 with the output rounded to q15
+        super().set_numeric_mode(numeric_mode)
+        self.working_dtype: np.dtype = np.dtype(complex) if numeric_mode.fixed_point else numeric_mode.complex_dtype
+        self.previous_sample = np.asarray(self.previous_sample).astype(self.working_dtype)
+
+    def computation(self, value: np.ndarray) -> np.ndarray: # value is a frame of complex samples
+        samples: np.ndarray = self.numeric_mode.from_frame(value) if self.numeric_mode.fixed_point else np.asarray(value, dtype=self.working_dtype)
+        if samples.shape[-1] == 0: # nothing to discriminate, the previous sample carries over to the next frame
+            demodulated: np.ndarray = np.zeros(samples.shape)
+        else:
+            previous: np.ndarray = np.empty_like(samples)
+            previous[..., 0] = self.previous_sample
+            previous[..., 1:] = samples[..., :-1]
+            self.previous_sample = samples[..., -1].copy()
+
+            phase_steps: np.ndarray = np.angle(samples * np.conj(previous))
+            instantaneous_frequency: np.ndarray = phase_steps * (self.sps / (2 * pi))
+
+            demodulated: np.ndarray = (instantaneous_frequency - self.input_frequency) / self.modulation_index
+
+        if self.numeric_mode.fixed_point:
+            return self.numeric_mode.to_frame(demodulated)
+
+        return demodulated.astype(self.numeric_mode.real_dtype, copy=False)
+
+
+class IQCombineStep(AbstractMergeStep): # first input is I, second is Q
+    def computation(self, values: list) -> np.ndarray:
+        if len(values) != 2:
+            raise ValueError("IQ combine takes exactly two inputs")
+        
+        return np.asarray(values[0]) + 1j * np.asarray(values[1])
+    
+
+class MixerStep(AbstractMergeStep): # sample by sample product of every input
+    def computation(self, values: list) -> np.ndarray:
+        mixed: np.ndarray = np.asarray(values[0])
+        for value in values[1:]:
+            mixed = mixed * np.asarray(value)
+
+        return mixed
+
+
+class FIRFilterStep(AbstractPipelineStep): # direct or overlap save fft convolution, whichever is cheaper for the frame. Filter state carries across frames
+    def __init__(self, taps: np.ndarray, direct_threshold: int = None):
+        super().__init__()
+        self.taps: np.ndarray = np.asarray(taps)
+        self.direct_threshold: int = direct_threshold
+        self.convolver: OverlapSaveConvolver = OverlapSaveConvolver(taps, direct_threshold)
+        self.full_convolver: OverlapSaveConvolver = self.convolver
 
-        self.phase_component: float = 0.0
+    def set_numeric_mode(self, numeric_mode: NumericMode) -> None: # fixed point convolves q15 taps directly with a wide accumulator and rounds once at the end, like a dsp mac loop
+        super().set_numeric_mode(numeric_mode)
+        self.convolver = self.full_convolver = self.__build_convolver(self.taps)
 
-    def computation(self, value: float) -> float: # value corresponds to sample of the modulating signal
-        time: float = self.dsp_time_sync.get_time()
-        self.phase_component += 2 * pi * self.modulation_index * (value * (1 / self.sps))
-        self.phase_component = range_wraparound(self.phase_component, 0, 2 * pi)
-        frequency_component: float = self.center_frequency * 2 * pi * time
+    def __build_convolver(self, taps: np.ndarray) -> OverlapSaveConvolver:
+        if self.numeric_mode.fixed_point:
+            return OverlapSaveConvolver(self.numeric_mode.quantize(taps), direct_threshold=len(taps))
 
-        return cos(frequency_component + self.phase_component)
+        return OverlapSaveConvolver(taps, self.direct_threshold, dtype=self.numeric_mode.real_dtype)
+
+    def set_degraded(self, degraded: bool) -> None: # the middle half of the kernel at the same dc gain, wider transition band and a quarter kernel less delay. Filter state restarts on the switch
+        if not degraded:
+            self.convolver = self.full_convolver
+            return
+
+        quarter: int = len(self.taps) // 4
+        short_taps: np.ndarray = self.taps[quarter:len(self.taps) - quarter]
+        self.convolver = self.__build_convolver(short_taps * np.sum(self.taps) / np.sum(short_taps) if np.sum(short_taps) else short_taps)
+
+    def computation(self, value: np.ndarray) -> np.ndarray:
+        if self.numeric_mode.fixed_point:
+            return self.numeric_mode.to_frame(self.convolver.process(self.numeric_mode.from_frame(value)))
+
+        return self.convolver.process(value)
+
+
+class RateChangeStep(AbstractPipelineStep): # output runs at interpolation / decimation times the input rate. Block mode only, output frame length varies
+    def __init__(self, interpolation: int, decimation: int):
+        super().__init__()
+        self.interpolation: int = interpolation
+        self.decimation: int = decimation
+
+        self.output_time_sync: DSPTimeSync = None # clock of the segment after this step, set by the pipeline
+        self.advances_input_clock: bool = False # the step closing a rate segment keeps its clock moving, the sink only moves the last one
+
+    def output_bound(self, samples: int, channels: int) -> tuple[int, int]: # the carried phase can add one output to the average length
+        return samples * self.interpolation // self.decimation + 1, channels
+
+    def advance_input_clock(self, value: np.ndarray) -> None:
+        if self.advances_input_clock:
+            self.dsp_time_sync.increment_time(np.shape(value)[-1])
+
+
+class ResamplerStep(RateChangeStep): # rational rate change by interpolation / decimation through a polyphase fir
+    def __init__(self, interpolation: int, decimation: int, taps: np.ndarray = None, taps_per_phase: int = 16):
+        self.resampler: PolyphaseResampler = PolyphaseResampler(interpolation, decimation, taps, taps_per_phase)
+        super().__init__(self.resampler.interpolation, self.resampler.decimation)
+
+    def set_numeric_mode(self, numeric_mode: NumericMode) -> None: # float modes filter in their own precision, fixed point filters q15 values in float64 and rounds the output
+        super().set_numeric_mode(numeric_mode)
+        dtype: np.dtype = np.float64 if numeric_mode.fixed_point else numeric_mode.real_dtype
+        self.resampler = PolyphaseResampler(self.interpolation, self.decimation, self.resampler.taps, dtype=dtype)
+
+    def computation(self, value: np.ndarray) -> np.ndarray:
+        self.advance_input_clock(value)
+        if self.numeric_mode.fixed_point:
+            return self.numeric_mode.to_frame(self.resampler.process(self.numeric_mode.from_frame(value)))
+
+        return self.numeric_mode.to_frame(self.resampler.process(value))
+    
+
+class DecimatorStep(ResamplerStep):
+    def __init__(self, factor: int, taps: np.ndarray = None, taps_per_phase: int = 16):
+        super().__init__(1, factor, taps, taps_per_phase)
+
+
+class InterpolatorStep(ResamplerStep):
+    def __init__(self, factor: int, taps: np.ndarray = None, taps_per_phase: int = 16):
+        super().__init__(factor, 1, taps, taps_per_phase)
+
+
+class ChannelizerStep(RateChangeStep): # polyphase filter bank, one wideband complex stream in, (num_channels, samples) frames out with channel k centred on k * sps / num_channels
+    def __init__(self, num_channels: int, decimation: int = None, taps: np.ndarray = None, taps_per_channel: int = 8):
+        self.bank: AnalysisFilterBank = AnalysisFilterBank(num_channels, decimation, taps, taps_per_channel)
+        super().__init__(1, self.bank.decimation) # decimation num_channels is critically sampled, num_channels / 2 is 2x oversampled
+
+    def output_bound(self, samples: int, channels: int) -> tuple[int, int]:
+        return samples // self.decimation + 1, self.bank.num_channels
+
+    def computation(self, value: np.ndarray) -> np.ndarray:
+        self.advance_input_clock(value)
+        if self.numeric_mode.fixed_point:
+            return self.numeric_mode.to_frame(self.bank.process(self.numeric_mode.from_frame(value)))
+
+        return self.bank.process(value).astype(self.numeric_mode.complex_dtype, copy=False)
+
+
+class SynthesisStep(RateChangeStep): # transmit side of the channelizer, (num_channels, samples) baseband channels in, one wideband stream out. Through both banks a signal lags by the prototype length
+    def __init__(self, num_channels: int, interpolation: int = None, taps: np.ndarray = None, taps_per_channel: int = 8):
+        self.bank: SynthesisFilterBank = SynthesisFilterBank(num_channels, interpolation, taps, taps_per_channel)
+        super().__init__(self.bank.decimation, 1)
+
+    def output_bound(self, samples: int, channels: int) -> tuple[int, int]:
+        return samples * self.interpolation, 1
+
+    def computation(self, value: np.ndarray) -> np.ndarray:
+        self.advance_input_clock(value)
+        if self.numeric_mode.fixed_point:
+            return self.numeric_mode.to_frame(self.bank.process(self.numeric_mode.from_frame(value)))
+
+        return self.bank.process(value).astype(self.numeric_mode.complex_dtype, copy=False)
+
+
+class SpectrumStep(RateChangeStep): # welch power spectrum for monitoring. Windowed segments overlap, their power is averaged over average_count segments and only then emitted, so the output clock counts spectra
+    def __init__(self, fft_size: int, window: str = "hann", overlap: float = 0.5, average_count: int = 8, averaging: str = "linear", density: bool = False):
+        self.estimator: WelchEstimator = WelchEstimator(fft_size, window, overlap, average_count, averaging, density=density)
+        super().__init__(1, self.estimator.hop * average_count)
+        self.density: bool = density
+
+    def add_time_sync(self, time_sync: DSPTimeSync) -> None: # density scaling needs the input rate
+        super().add_time_sync(time_sync)
+        if self.density:
+            self.estimator.scale = 1 / (time_sync.sps * np.sum(self.estimator.window ** 2))
+
+    def output_bound(self, samples: int, channels: int) -> tuple[int, int]: # (fft_size, spectra) counted as one channel's values
+        return self.estimator.fft_size * (samples // self.decimation + 1), channels
+
+    def computation(self, value: np.ndarray) -> np.ndarray: # (fft_size, spectra) frames, (channels, fft_size, spectra) for multi channel input. Power stays floating point in every numeric mode
+        self.advance_input_clock(value)
+        estimates: np.ndarray = self.estimator.process(self.numeric_mode.from_frame(value))
+
+        return estimates.astype(np.float32) if self.numeric_mode.real_dtype == np.float32 else estimates
+
+
+class HilbertStep(AbstractPipelineStep): # real in, analytic signal out. The output lags the input by num_taps // 2 samples
+    def __init__(self, num_taps: int = 127, direct_threshold: int = None):
+        super().__init__()
+        self.delay: int = num_taps // 2
+        self.taps: np.ndarray = analytic_fir_taps(num_taps)
+        self.direct_threshold: int = direct_threshold
+        self.convolver: OverlapSaveConvolver = OverlapSaveConvolver(self.taps, direct_threshold)
+
+    def set_numeric_mode(self, numeric_mode: NumericMode) -> None: # same scheme as FIRFilterStep, fixed point convolves q15 taps directly and rounds once at the end
+        super().set_numeric_mode(numeric_mode)
+        if numeric_mode.fixed_point:
+            self.convolver = OverlapSaveConvolver(numeric_mode.quantize(self.taps), direct_threshold=len(self.taps))
+        else:
+            self.convolver = OverlapSaveConvolver(self.taps, self.direct_threshold, dtype=numeric_mode.real_dtype)
+
+    def computation(self, value: np.ndarray) -> np.ndarray:
+        if self.numeric_mode.fixed_point:
+            return self.numeric_mode.to_frame(self.convolver.process(self.numeric_mode.from_frame(value)))
+
+        return self.convolver.process(value).astype(self.numeric_mode.complex_dtype, copy=False)
 
 
 class TestThreadUnit(AbstractThreadUnit):
@@ -318,6 +1327,160 @@ class TestThreadOrchestrator(AbstractThreadOrchestrator):
         threading_pool.append(TestThreadUnit([sink]))
 
         return threading_pool
+
+
+class WorkerThreadUnit(AbstractThreadUnit): # services a group of steps on one thread, sleeps until one of their buffers changes when none of them can make progress
+    def __init__(self, steps: list[AbstractPipelineStep], idle_timeout: float):
+        super().__init__([step.try_call for step in steps])
+        self.idle_timeout: float = idle_timeout
+        self.wakeup: Event = Event()
+
+        for step in steps:
+            for buffer in step.get_entry_buffers():
+                buffer.add_watcher(self.wakeup)
+            if step.exit_buffer:
+                step.exit_buffer.add_watcher(self.wakeup)
+
+        self.thread: Thread = Thread(target=self.run_function_pool)
+
+    def run_function_pool(self):
+        active_functions: list[Callable] = list(self.functions)
+
+        try:
+            while self.runflag and active_functions:
+                self.wakeup.clear() # cleared before polling so a push in between still wakes us
+                progress: bool = False
+                
+                for action in list(active_functions):
+                    try:
+                        progress = action() or progress
+                    except BufferClosedError: # that step's input is finished, keep draining the others
+                        active_functions.remove(action)
+                        progress = True
+
+                if not progress:
+                    self.wakeup.wait(self.idle_timeout)
+        except Exception as error:
+            self.fail(error)
+
+        self.runflag = False
+
+    def run(self):
+        self.thread.start()
+
+    def join(self):
+        self.thread.join()
+
+
+def detached_copy(step: AbstractPipelineStep) -> AbstractPipelineStep: # buffers hold thread primitives that can't cross a process boundary
+    detached_step: AbstractPipelineStep = copy(step)
+    detached_step.entry_buffer = None
+    detached_step.exit_buffer = None
+    for wrapped in ("computation", "try_call"): # metrics wrappers only count in this process
+        detached_step.__dict__.pop(wrapped, None)
+
+    return detached_step
+
+
+def run_step_process(step: AbstractPipelineStep, inbound: Queue, outbound: Queue) -> None: # module level so it can be pickled for spawned processes. An exception goes back in place of the end marker
+    try:
+        value = inbound.get()
+        while value is not None:
+            computed_value = step.computation(value)
+            if not is_empty_frame(computed_value):
+                outbound.put(computed_value)
+            value = inbound.get()
+    except Exception as error:
+        outbound.put(error)
+        return
+
+    outbound.put(None)
+
+
+class ProcessStepUnit(AbstractThreadUnit): # runs one step's computation in its own process, two local threads move frames between the pipeline buffers and the process
+    def __init__(self, step: AbstractPipelineStep, idle_timeout: float):
+        super().__init__([])
+        self.step: AbstractPipelineStep = step
+        self.idle_timeout: float = idle_timeout
+        self.inbound: Queue = Queue()
+        self.outbound: Queue = Queue()
+
+        self.process: Process = Process(target=run_step_process, args=(detached_copy(step), self.inbound, self.outbound), daemon=True)
+        self.feeder: Thread = Thread(target=self.feed)
+        self.collector: Thread = Thread(target=self.collect)
+
+    def feed(self) -> None:
+        try:
+            while self.runflag:
+                value = self.step.entry_buffer.pull_blocking(self.idle_timeout)
+                if value is not None:
+                    self.inbound.put(value)
+        except BufferClosedError:
+            pass
+
+        self.inbound.put(None)
+
+    def collect(self) -> None:
+        value = self.outbound.get()
+        while value is not None and not isinstance(value, Exception):
+            try:
+                self.step.exit_buffer.push(value)
+            except BufferClosedError:
+                pass
+            value = self.outbound.get()
+
+        self.step.finish()
+        if isinstance(value, Exception):
+            self.fail(value)
+
+    def run(self):
+        self.process.start()
+        self.feeder.start()
+        self.collector.start()
+
+    def join(self):
+        self.feeder.join()
+        self.collector.join()
+        self.process.join()
+
+
+class ParallelThreadOrchestrator(AbstractThreadOrchestrator): # steps are split into at most max_threads worker threads, chosen steps can be moved into their own processes. max_threads only bounds the worker groups: the source and sink threads come on top, and so does each process step with its feeder and collector threads and its process
+    def __init__(self, process_steps: list[AbstractPipelineStep] = None, idle_timeout: float = 0.05):
+        self.process_steps: list[AbstractPipelineStep] = process_steps if process_steps else []
+        self.idle_timeout: float = idle_timeout
+
+    def group_steps(self, steps: list[AbstractPipelineStep]) -> list[list[AbstractPipelineStep]]: # neighbouring steps stay together so a frame mostly moves within one worker
+        num_groups: int = max(1, min(self.max_threads, len(steps)))
+        group_size, remainder = divmod(len(steps), num_groups)
+
+        groups: list[list[AbstractPipelineStep]] = []
+        start: int = 0
+        for group_index in range(num_groups):
+            end: int = start + group_size + (1 if group_index < remainder else 0)
+            groups.append(steps[start:end])
+            start = end
+
+        return [group for group in groups if group]
+
+    def orchestrate_threads(self, source: Callable, sink: Callable, function_pool: list[AbstractPipelineStep]) -> list[AbstractThreadUnit]:
+        for step in function_pool:
+            if not all(buffer.non_blocking() for buffer in step.get_entry_buffers()) or (step.exit_buffer and not step.exit_buffer.non_blocking()):
+                raise ValueError("ParallelThreadOrchestrator needs ring buffers, create the Pipeline with a ring_capacity")
+        for step in self.process_steps:
+            if len(step.get_entry_buffers()) != 1 or not step.exit_buffer:
+                raise ValueError("Only single input steps with an output can run in a separate process")
+            
+        threaded_steps: list[AbstractPipelineStep] = [step for step in function_pool if step not in self.process_steps]
+
+        # source and sink are usually blocking io, they keep their own threads
+        threading_pool: list[AbstractThreadUnit] = [TestThreadUnit([source])]
+        for group in self.group_steps(threaded_steps):
+            threading_pool.append(WorkerThreadUnit(group, self.idle_timeout))
+        for step in self.process_steps:
+            threading_pool.append(ProcessStepUnit(step, self.idle_timeout))
+        threading_pool.append(TestThreadUnit([sink]))
+
+        return threading_pool
     
 count = 1
 
@@ -1,8 +1,172 @@
+from abc import ABC, abstractmethod
 from math import pi, sin
+import numpy as np
 
 
 def generate_signal_sin(samples, timestep, frequency):
     time_vector = [x * timestep for x in range(samples)]
     magnitude_vector = [sin(2 * pi * frequency * time) for time in time_vector]
 
-    return time_vector, magnitude_vector
\ No newline at end of file
+    return time_vector, magnitude_vector
+
+
+def sample_indices(start: int, count: int) -> np.ndarray:
+    return np.arange(start, start + count, dtype=np.int64)
+
+def sample_times(start: int, count: int, sps: float) -> np.ndarray: # computed from the absolute index, so there is no accumulated step error however far in
+    return sample_indices(start, count) / sps
+
+def tone_phase(frequency: float, indices: np.ndarray, sps: float) -> np.ndarray: # 2 pi f n / sps, with whole cycles dropped before they cost precision
+    return 2 * pi * (np.mod(frequency * indices, sps) / sps)
+
+
+class SignalGenerator(ABC): # a signal as a pure function of the absolute sample index. Any frame can be generated in any order and always comes out the same
+    def __init__(self, sps: float):
+        self.sps: float = sps
+
+    @abstractmethod
+    def generate(self, start: int, count: int) -> np.ndarray:
+        pass
+
+
+class MultitoneGenerator(SignalGenerator): # sum of cosines. iq output uses complex exponentials, so negative frequencies sit below dc
+    def __init__(self, sps: float, frequencies: list[float], amplitudes: list[float] = None, phases: list[float] = None, iq: bool = False):
+        super().__init__(sps)
+        self.frequencies: np.ndarray = np.atleast_1d(np.asarray(frequencies, dtype=float))
+        self.amplitudes: np.ndarray = np.ones(len(self.frequencies)) if amplitudes is None else np.broadcast_to(np.asarray(amplitudes, dtype=float), self.frequencies.shape)
+        self.phases: np.ndarray = np.zeros(len(self.frequencies)) if phases is None else np.broadcast_to(np.asarray(phases, dtype=float), self.frequencies.shape)
+        self.iq: bool = iq
+
+    def generate(self, start: int, count: int) -> np.ndarray:
+        indices: np.ndarray = sample_indices(start, count)
+        output: np.ndarray = np.zeros(count, dtype=complex if self.iq else float)
+
+        for frequency, amplitude, phase in zip(self.frequencies, self.amplitudes, self.phases): # one pass per tone keeps memory at one frame
+            angle: np.ndarray = tone_phase(frequency, indices, self.sps) + phase
+            output += amplitude * (np.exp(1j * angle) if self.iq else np.cos(angle))
+
+        return output
+
+
+class ChirpGenerator(SignalGenerator): # linear sweep from start to end frequency over duration seconds, restarting every duration when repeat is set
+    def __init__(self, sps: float, start_frequency: float, end_frequency: float, duration: float, amplitude: float = 1.0, repeat: bool = True, iq: bool = False):
+        super().__init__(sps)
+        self.start_frequency: float = start_frequency
+        self.end_frequency: float = end_frequency
+        self.sweep_samples: int = max(int(round(duration * sps)), 1)
+        self.sweep_rate: float = (end_frequency - start_frequency) / (self.sweep_samples / sps) # hz per second
+        self.amplitude: float = amplitude
+        self.repeat: bool = repeat
+        self.iq: bool = iq
+
+    def generate(self, start: int, count: int) -> np.ndarray:
+        indices: np.ndarray = sample_indices(start, count)
+        positions: np.ndarray = indices % self.sweep_samples if self.repeat else np.minimum(indices, self.sweep_samples)
+        times: np.ndarray = positions / self.sps
+
+        angle: np.ndarray = 2 * pi * (self.start_frequency * times + 0.5 * self.sweep_rate * times * times)
+        if not self.repeat: # past the end it holds the end frequency
+            overrun: np.ndarray = (indices - positions) / self.sps
+            angle += 2 * pi * self.end_frequency * overrun
+
+        return self.amplitude * (np.exp(1j * angle) if self.iq else np.cos(angle))
+
+
+class NoiseGenerator(SignalGenerator): # gaussian noise seeded per block of block_size samples, so seeking only regenerates the blocks a frame touches
+    def __init__(self, sps: float, amplitude: float = 1.0, seed: int = 0, block_size: int = 1 << 16, iq: bool = False):
+        super().__init__(sps)
+        self.amplitude: float = amplitude
+        self.seed: int = seed
+        self.block_size: int = block_size
+        self.iq: bool = iq
+
+    def __block(self, block_index: int) -> np.ndarray:
+        generator: np.random.Generator = np.random.default_rng(np.random.SeedSequence([self.seed, block_index]))
+        if self.iq: # unit total power, split between i and q
+            return (generator.standard_normal(self.block_size) + 1j * generator.standard_normal(self.block_size)) / np.sqrt(2)
+
+        return generator.standard_normal(self.block_size)
+
+    def generate(self, start: int, count: int) -> np.ndarray:
+        first_block: int = start // self.block_size
+        last_block: int = (start + count - 1) // self.block_size if count else first_block - 1
+
+        blocks: list[np.ndarray] = [self.__block(block_index) for block_index in range(first_block, last_block + 1)]
+        offset: int = start - first_block * self.block_size
+        joined: np.ndarray = np.concatenate(blocks) if blocks else np.zeros(0, dtype=complex if self.iq else float)
+
+        return self.amplitude * joined[offset:offset + count]
+
+
+class FMGenerator(SignalGenerator): # carrier frequency modulated by a tone. The phase integral of a tone is closed form, so frames stay seekable. Carrier 0 with iq gives complex baseband
+    def __init__(self, sps: float, carrier_frequency: float, frequency_deviation: float, modulation_frequency: float, amplitude: float = 1.0, iq: bool = False):
+        super().__init__(sps)
+        self.carrier_frequency: float = carrier_frequency
+        self.modulation_frequency: float = modulation_frequency
+        self.modulation_index: float = frequency_deviation / modulation_frequency # beta, peak phase deviation in radians
+        self.amplitude: float = amplitude
+        self.iq: bool = iq
+
+    def generate(self, start: int, count: int) -> np.ndarray:
+        indices: np.ndarray = sample_indices(start, count)
+        angle: np.ndarray = tone_phase(self.carrier_frequency, indices, self.sps) + self.modulation_index * np.sin(tone_phase(self.modulation_frequency, indices, self.sps))
+
+        return self.amplitude * (np.exp(1j * angle) if self.iq else np.cos(angle))
+
+
+class AMGenerator(SignalGenerator): # (1 + depth * cos(modulation)) on a carrier
+    def __init__(self, sps: float, carrier_frequency: float, modulation_frequency: float, modulation_depth: float = 0.5, amplitude: float = 1.0, iq: bool = False):
+        super().__init__(sps)
+        self.carrier_frequency: float = carrier_frequency
+        self.modulation_frequency: float = modulation_frequency
+        self.modulation_depth: float = modulation_depth
+        self.amplitude: float = amplitude
+        self.iq: bool = iq
+
+    def generate(self, start: int, count: int) -> np.ndarray:
+        indices: np.ndarray = sample_indices(start, count)
+        envelope: np.ndarray = self.amplitude * (1 + self.modulation_depth * np.cos(tone_phase(self.modulation_frequency, indices, self.sps)))
+        angle: np.ndarray = tone_phase(self.carrier_frequency, indices, self.sps)
+
+        return envelope * (np.exp(1j * angle) if self.iq else np.cos(angle))
+
+
+class SumGenerator(SignalGenerator): # e.g. a tone plus noise
+    def __init__(self, generators: list[SignalGenerator]):
+        super().__init__(generators[0].sps)
+        self.generators: list[SignalGenerator] = generators
+
+    def generate(self, start: int, count: int) -> np.ndarray:
+        return sum(generator.generate(start, count) for generator in self.generators)
+
+
+class ChannelStackGenerator(SignalGenerator): # one generator per channel, frames come out (channels, samples)
+    def __init__(self, generators: list[SignalGenerator]):
+        super().__init__(generators[0].sps)
+        self.generators: list[SignalGenerator] = generators
+
+    def generate(self, start: int, count: int) -> np.ndarray:
+        return np.stack([generator.generate(start, count) for generator in self.generators])
+
+
+class SignalSource: # Pipeline source over a generator. frame_size 0 hands out single samples for sample by sample pipelines, num_samples makes it finite
+    def __init__(self, generator: SignalGenerator, frame_size: int, num_samples: int = None, start: int = 0):
+        self.generator: SignalGenerator = generator
+        self.frame_size: int = frame_size
+        self.end: int = None if num_samples is None else start + num_samples
+        self.position: int = start
+
+    def seek(self, position: int) -> None:
+        self.position = position
+
+    def __call__(self):
+        count: int = max(self.frame_size, 1)
+        if self.end is not None:
+            if self.position >= self.end:
+                raise EOFError("Signal source finished")
+            count = min(count, self.end - self.position)
+
+        frame: np.ndarray = self.generator.generate(self.position, count)
+        self.position += count
+
+        return frame if self.frame_size else frame[0].item()
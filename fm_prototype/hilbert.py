@@ -1,11 +1,10 @@
 from math import pi, sin, atan2, cos
-import matplotlib.pyplot as plt
-from fft import fft_iteration, ifft_full, time_axis, amplitude_axis
+import numpy as np
+from .fft import get_fft_plan, ifft_full
 
 
 
 SAMPLES_PER_SECOND = 34500
-amplitude_axis = [sin(2 * pi * time) + 4 * sin(4 * pi * time) + sin(6 * pi * time) + sin(0.5 * time * pi + time) + sin(20 * time * pi + time) for time in time_axis]
 
 
 def hilbert_frequency_domain(buffer: list[float]):
@@ -27,6 +26,24 @@ def hilbert_time_domain(buffer: list[float], samples_p_second: int):
 
     return transformed
 
+def hilbert_fir_taps(num_taps: int) -> np.ndarray: # windowed 2 / (pi * n) on odd n. Odd length so the group delay is a whole number of samples
+    if num_taps < 3 or num_taps % 2 == 0:
+        raise ValueError("Hilbert FIR needs an odd number of taps, at least 3")
+
+    offsets: np.ndarray = np.arange(num_taps) - num_taps // 2
+    odd_offsets: np.ndarray = offsets % 2 != 0
+
+    taps: np.ndarray = np.zeros(num_taps)
+    taps[odd_offsets] = 2 / (pi * offsets[odd_offsets])
+
+    return taps * np.blackman(num_taps)
+
+def analytic_fir_taps(num_taps: int) -> np.ndarray: # a real signal convolved with these gives x[n - num_taps // 2] + j * hilbert(x)[n], the analytic signal in one pass
+    taps: np.ndarray = 1j * hilbert_fir_taps(num_taps)
+    taps[num_taps // 2] += 1
+
+    return taps
+
 def argument_function(real_buffer: list[float], imaginary_buffer: list[float]):
     return [atan2(i_c, r_c) for r_c, i_c in zip(real_buffer, imaginary_buffer)]
 
@@ -34,18 +51,24 @@ def get_max_k(sps: int):
     return sps / 2
 
 
-frequency_buffer = fft_iteration(amplitude_axis, len(amplitude_axis), 1)
-frequency_hilbert = hilbert_frequency_domain(frequency_buffer)
-hilbert_time = ifft_full(frequency_hilbert)
-instantaneous_phase = argument_function(amplitude_axis, hilbert_time)
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+
+    time_axis = [index / 34000 for index in range(2048 * 16)]
+    amplitude_axis = [sin(2 * pi * time) + 4 * sin(4 * pi * time) + sin(6 * pi * time) + sin(0.5 * time * pi + time) + sin(20 * time * pi + time) for time in time_axis]
+
+    frequency_buffer = get_fft_plan(len(amplitude_axis)).forward(amplitude_axis)
+    frequency_hilbert = hilbert_frequency_domain(frequency_buffer)
+    hilbert_time = ifft_full(frequency_hilbert)
+    instantaneous_phase = argument_function(amplitude_axis, hilbert_time)
 
-carrier_frequency = 1000
-modulation_index = 20 / 1000
-fm_modulated = [cos(2 * pi * carrier_frequency * time + 2 * pi * modulation_index * phase) for time, phase in zip(time_axis, instantaneous_phase)]
+    carrier_frequency = 1000
+    modulation_index = 20 / 1000
+    fm_modulated = [cos(2 * pi * carrier_frequency * time + 2 * pi * modulation_index * phase) for time, phase in zip(time_axis, instantaneous_phase)]
 
 
-#plt.plot(time_axis, amplitude_axis)
-plt.plot(time_axis, fm_modulated)
-plt.show()
+    #plt.plot(time_axis, amplitude_axis)
+    plt.plot(time_axis, fm_modulated)
+    plt.show()
 
 
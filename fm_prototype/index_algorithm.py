@@ -1,3 +1,6 @@
+import numpy as np
+
+
 def find_index(layer, adjacency):
     if adjacency % 2 == 0:
         index = 0
@@ -17,6 +20,15 @@ def find_index(layer, adjacency):
 
     return index
 
+def bit_reversal_permutation(layers: int) -> np.ndarray: # find_index for every adjacency of a 2 ** layers fft at once
+    adjacency: np.ndarray = np.arange(1 << layers)
+    index: np.ndarray = np.zeros(1 << layers, dtype=int)
+
+    for layer in range(layers):
+        index = (index << 1) | ((adjacency >> layer) & 1)
+
+    return index
+
 if __name__ == "__main__":
     print(find_index(3, 6))
     
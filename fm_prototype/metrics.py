@@ -0,0 +1,219 @@
+from threading import Thread, Event
+from time import perf_counter, time
+from typing import Callable
+import numpy as np
+
+
+HISTOGRAM_BUCKETS = 32 # bucket b holds durations in [2^(b-1), 2^b) microseconds, the last one everything longer
+
+
+class LatencyHistogram: # power of two buckets, recording is one bit_length and two adds so it can sit on the hot path
+    def __init__(self):
+        self.counts: list[int] = [0] * HISTOGRAM_BUCKETS
+        self.count: int = 0
+        self.total: float = 0.0
+        self.maximum: float = 0.0
+
+    def record(self, seconds: float) -> None:
+        self.counts[min(int(seconds * 1e6).bit_length(), HISTOGRAM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.maximum:
+            self.maximum = seconds
+
+    def percentile(self, percentile: float) -> float: # upper edge of the bucket the percentile falls in, in seconds
+        if not self.count:
+            return 0.0
+
+        cumulative: np.ndarray = np.cumsum(self.counts)
+        bucket: int = int(np.searchsorted(cumulative, percentile / 100 * self.count))
+
+        return min((1 << bucket) * 1e-6, self.maximum)
+
+    def snapshot(self) -> dict:
+        return {"count": self.count, "mean_us": self.total / self.count * 1e6 if self.count else 0.0, "max_us": self.maximum * 1e6,
+                "p50_us": self.percentile(50) * 1e6, "p90_us": self.percentile(90) * 1e6, "p99_us": self.percentile(99) * 1e6, "buckets": list(self.counts)}
+
+
+class StageMetrics: # counters for one step (or the pipeline source / sink). Only the thread running the stage writes to them
+    def __init__(self, name: str, samples_per_second: float):
+        self.name: str = name
+        self.samples_per_second: float = samples_per_second
+        self.compute: LatencyHistogram = LatencyHistogram()
+        self.samples: int = 0
+        self.blocked_input: float = 0.0 # seconds waiting for a frame to pull
+        self.blocked_output: float = 0.0 # seconds waiting for room to push
+        self.late_frames: int = 0 # frames that took longer to compute than they last in real time
+        self.dropped_frames: int = 0 # computed frames that never made it downstream
+
+    def record_frame(self, seconds: float, num_samples: int) -> None:
+        self.compute.record(seconds)
+        self.samples += num_samples
+        if seconds * self.samples_per_second > num_samples:
+            self.late_frames += 1
+
+    def snapshot(self) -> dict:
+        busy: float = self.compute.total
+        return {"samples": self.samples, "compute": self.compute.snapshot(), "blocked_input_s": self.blocked_input, "blocked_output_s": self.blocked_output,
+                "real_time_load": busy * self.samples_per_second / self.samples if self.samples else 0.0, "late_frames": self.late_frames, "dropped_frames": self.dropped_frames}
+
+
+class BufferMetrics: # occupancy is sampled from outside rather than on every push, so buffers pay nothing for it
+    def __init__(self, name: str, buffer):
+        self.name: str = name
+        self.buffer = buffer
+        self.current: int = 0
+        self.maximum: int = 0
+        self.total: int = 0
+        self.num_samples: int = 0
+
+    def sample(self) -> None:
+        self.current = self.buffer.occupancy()
+        self.maximum = max(self.maximum, self.current)
+        self.total += self.current
+        self.num_samples += 1
+
+    def snapshot(self) -> dict:
+        return {"occupancy": self.current, "max_occupancy": self.maximum, "mean_occupancy": self.total / self.num_samples if self.num_samples else 0.0, "capacity": getattr(self.buffer, "capacity", None)}
+
+
+def frame_length(value) -> int: # samples per channel, time is the last axis
+    return np.shape(value)[-1] if np.ndim(value) else 1
+
+
+class PipelineMetrics: # opt in. Instrumenting swaps timed wrappers onto step and buffer instances, so an uninstrumented pipeline runs the plain methods with no checks at all
+    def __init__(self, snapshot_interval: float = None, snapshot_callback: Callable = None):
+        self.stages: dict[str, StageMetrics] = {}
+        self.buffers: dict[str, BufferMetrics] = {}
+        self.snapshot_interval: float = snapshot_interval
+        self.snapshot_callback: Callable = snapshot_callback
+        self.snapshots: list[dict] = [] # kept when there is no callback
+        self.pacer = None # the pipeline's FramePacer when pacing is on, its slack statistics join the snapshots
+        self.start_time: float = time()
+
+        self.stop_event: Event = Event()
+        self.reporter: Thread = None
+
+    def add_stage(self, name: str, samples_per_second: float) -> StageMetrics:
+        stage: StageMetrics = StageMetrics(name, samples_per_second)
+        self.stages[name] = stage
+
+        return stage
+
+    def timed_callable(self, stage: StageMetrics, function: Callable, multiple_inputs: bool = False) -> Callable: # for computations and the pipeline sink, times the call and counts the frame
+        def timed(value):
+            start: float = perf_counter()
+            result = function(value)
+            stage.record_frame(perf_counter() - start, frame_length(value[0] if multiple_inputs else value))
+            return result
+
+        return timed
+
+    def timed_source(self, stage: StageMetrics, source: Callable) -> Callable:
+        def timed():
+            start: float = perf_counter()
+            value = source()
+            stage.record_frame(perf_counter() - start, frame_length(value))
+            return value
+
+        return timed
+
+    def watch_input(self, stage: StageMetrics, buffer, name: str) -> None: # blocking pulls are charged to the consuming stage
+        pull: Callable = buffer.pull
+
+        def timed_pull():
+            start: float = perf_counter()
+            try:
+                return pull()
+            finally:
+                stage.blocked_input += perf_counter() - start
+
+        buffer.pull = timed_pull
+        if hasattr(buffer, "occupancy"):
+            self.buffers[name] = BufferMetrics(name, buffer)
+
+    def watch_output(self, stage: StageMetrics, buffer, closed_error: type) -> None: # blocking pushes are charged to the producing stage, a push into a closed buffer drops the frame
+        push: Callable = buffer.push
+
+        def timed_push(value):
+            start: float = perf_counter()
+            try:
+                push(value)
+            except closed_error:
+                stage.dropped_frames += 1
+                raise
+            finally:
+                stage.blocked_output += perf_counter() - start
+
+        buffer.push = timed_push
+
+    def watch_polling(self, stage: StageMetrics, step, closed_error: type) -> None: # worker threads poll try_call and sleep until a buffer changes. A stage is blocked from its first miss until it next makes progress, on its output when the exit buffer was full
+        try_call: Callable = step.try_call
+        miss_start: float = None
+        output_full: bool = False
+
+        def charge() -> None:
+            nonlocal miss_start
+            if miss_start is not None:
+                if output_full:
+                    stage.blocked_output += perf_counter() - miss_start
+                else:
+                    stage.blocked_input += perf_counter() - miss_start
+                miss_start = None
+
+        def timed_try_call() -> bool:
+            nonlocal miss_start, output_full
+            try:
+                progress: bool = try_call()
+            except closed_error: # input finished, the wait for it still counts
+                charge()
+                raise
+
+            if progress:
+                charge()
+            elif miss_start is None:
+                miss_start = perf_counter()
+                output_full = step.exit_buffer is not None and step.exit_buffer.is_full()
+            return progress
+
+        step.try_call = timed_try_call
+
+    def sample_buffers(self) -> None:
+        for buffer in self.buffers.values():
+            buffer.sample()
+
+    def snapshot(self) -> dict:
+        self.sample_buffers()
+
+        snapshot: dict = {"timestamp": time(), "elapsed_s": time() - self.start_time, "stages": {name: stage.snapshot() for name, stage in self.stages.items()}, "buffers": {name: buffer.snapshot() for name, buffer in self.buffers.items()}}
+        if self.pacer:
+            snapshot["pacing"] = self.pacer.snapshot()
+
+        return snapshot
+
+    def bottleneck(self) -> str: # the stage with the highest real time load
+        if not self.stages:
+            return None
+
+        return max(self.stages.values(), key=lambda stage: stage.compute.total * stage.samples_per_second / max(stage.samples, 1)).name
+
+    def __report(self) -> None:
+        while not self.stop_event.wait(self.snapshot_interval):
+            snapshot: dict = self.snapshot()
+            if self.snapshot_callback:
+                self.snapshot_callback(snapshot)
+            else:
+                self.snapshots.append(snapshot)
+
+    def start(self) -> None:
+        self.start_time = time()
+        if self.snapshot_interval:
+            self.stop_event.clear()
+            self.reporter = Thread(target=self.__report, daemon=True)
+            self.reporter.start()
+
+    def stop(self) -> None:
+        if self.reporter:
+            self.stop_event.set()
+            self.reporter.join()
+            self.reporter = None
@@ -0,0 +1,109 @@
+from math import pi
+import numpy as np
+
+
+PHASE_BITS = 32
+PHASE_MODULO = 1 << PHASE_BITS
+QUARTER_TURN = PHASE_MODULO // 4
+
+
+def frequency_to_increment(frequency: float, sps: int) -> int: # phase word step per sample, negative frequencies wrap like they would in a uint32 register. Per channel arrays give arrays
+    if np.ndim(frequency):
+        return np.rint(np.asarray(frequency, dtype=float) / sps * PHASE_MODULO).astype(np.int64) % PHASE_MODULO
+
+    return round(frequency / sps * PHASE_MODULO) % PHASE_MODULO
+
+def phase_to_word(phase: float) -> int: # radians to phase word
+    if np.ndim(phase):
+        return np.rint(np.asarray(phase, dtype=float) / (2 * pi) * PHASE_MODULO).astype(np.int64) % PHASE_MODULO
+
+    return round(phase / (2 * pi) * PHASE_MODULO) % PHASE_MODULO
+
+
+class NumericallyControlledOscillator: # integer phase accumulator indexing a sine table. Wraparound is free in modular arithmetic, so the phase never drifts no matter how long it runs. With channels set, every channel has its own accumulator and output is (channels, samples)
+    def __init__(self, sps: int, frequency: float, table_bits: int = 12, interpolate: bool = True, phase: float = 0.0, dtype: np.dtype = np.float64, channels: int = None): # dtype of the table and output, float32 halves the table and the frames. frequency and phase may be per channel
+        if not 1 <= table_bits < PHASE_BITS:
+            raise ValueError(f"Table bits must be between 1 and {PHASE_BITS - 1}")
+
+        self.sps: int = sps
+        self.table_bits: int = table_bits
+        self.table_size: int = 1 << table_bits
+        self.fraction_bits: int = PHASE_BITS - table_bits # low bits of the phase word, used for interpolating between table entries
+        self.fraction_mask: int = (1 << self.fraction_bits) - 1
+        self.interpolate: bool = interpolate
+
+        # one extra entry so interpolation at the last index never has to wrap
+        self.dtype: np.dtype = np.dtype(dtype)
+        self.set_table(np.sin(2 * pi * np.arange(self.table_size + 1) / self.table_size))
+
+        self.channels: int = None
+        self.phase: int = phase_to_word(phase)
+        self.set_frequency(frequency)
+        self.set_channels(channels if channels is not None else (len(self.frequency) if np.ndim(frequency) else None))
+
+    def set_table(self, table: np.ndarray) -> None: # replaces the sine table, e.g. with a quantized one. The interpolation slopes are always taken from the table actually used
+        self.sine_table: np.ndarray = np.asarray(table).astype(self.dtype)
+        self.table_slopes: np.ndarray = (np.diff(self.sine_table) / (1 << self.fraction_bits)).astype(self.dtype)
+
+    def set_frequency(self, frequency: float) -> None:
+        self.frequency: float = frequency
+        self.phase_increment: int = frequency_to_increment(frequency, self.sps)
+
+    def set_channels(self, channels: int) -> None: # None for a single 1d stream. Every channel starts from the current phase
+        if channels is not None and np.ndim(self.phase_increment) and len(self.phase_increment) != channels:
+            raise ValueError(f"{len(self.phase_increment)} channel frequencies for {channels} channels")
+
+        self.channels = channels
+        if channels is not None:
+            self.phase = np.broadcast_to(np.asarray(self.phase, dtype=np.int64), (channels,)).copy()
+
+    def reset(self, phase: float = 0.0) -> None:
+        self.phase = phase_to_word(phase)
+        if self.channels is not None:
+            self.phase = np.broadcast_to(np.asarray(self.phase, dtype=np.int64), (self.channels,)).copy()
+
+    def advance(self, num_samples: int, frequency_offsets: np.ndarray = None) -> np.ndarray: # phase words for the next num_samples samples, each sample uses the phase before its own increment
+        shape: tuple = (num_samples,) if self.channels is None else (self.channels, num_samples)
+        base_increments: np.ndarray = np.asarray(self.phase_increment, dtype=np.int64)[..., None] # per channel increments broadcast along time
+
+        if frequency_offsets is None:
+            increments: np.ndarray = np.broadcast_to(base_increments, shape).astype(np.uint64)
+        else:
+            offsets: np.ndarray = np.rint(np.asarray(frequency_offsets, dtype=float) * (PHASE_MODULO / self.sps)).astype(np.int64)
+            increments: np.ndarray = (np.broadcast_to(offsets + base_increments, shape) % PHASE_MODULO).astype(np.uint64)
+
+        phases: np.ndarray = np.empty(shape, dtype=np.uint64)
+        if num_samples == 0:
+            return phases
+        
+        phases[..., 0] = 0
+        np.cumsum(increments[..., :-1], axis=-1, out=phases[..., 1:])
+        phases += np.asarray(self.phase, dtype=np.uint64)[..., None]
+        phases &= PHASE_MODULO - 1
+
+        last_phases: np.ndarray = (phases[..., -1] + increments[..., -1]) & (PHASE_MODULO - 1)
+        self.phase = int(last_phases) if self.channels is None else last_phases.astype(np.int64)
+
+        return phases
+
+    def lookup(self, phases: np.ndarray) -> np.ndarray: # sine of phase words
+        indices: np.ndarray = phases >> self.fraction_bits
+        if not self.interpolate:
+            return self.sine_table[indices]
+
+        fractions: np.ndarray = (phases & self.fraction_mask).astype(self.dtype)
+
+        return self.sine_table[indices] + self.table_slopes[indices] * fractions
+
+    def sine(self, num_samples: int, frequency_offsets: np.ndarray = None) -> np.ndarray:
+        return self.lookup(self.advance(num_samples, frequency_offsets))
+
+    def cosine(self, num_samples: int, frequency_offsets: np.ndarray = None) -> np.ndarray:
+        phases: np.ndarray = self.advance(num_samples, frequency_offsets)
+
+        return self.lookup((phases + QUARTER_TURN) & (PHASE_MODULO - 1))
+
+    def complex_exponential(self, num_samples: int, frequency_offsets: np.ndarray = None) -> np.ndarray: # cos + j sin, for iq output and mixing
+        phases: np.ndarray = self.advance(num_samples, frequency_offsets)
+
+        return self.lookup((phases + QUARTER_TURN) & (PHASE_MODULO - 1)) + 1j * self.lookup(phases)
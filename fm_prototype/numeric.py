@@ -0,0 +1,128 @@
+from typing import Callable
+import numpy as np
+from .fft import FFTPlan
+
+
+Q15_SCALE = 1 << 15
+Q15_MIN = -(1 << 15)
+Q15_MAX = (1 << 15) - 1
+
+
+def quantize_q15(values: np.ndarray) -> np.ndarray: # rounds onto the q15 grid and saturates to [-1, 1 - 2^-15], staying in floating point. Real and imaginary parts separately
+    values = np.asarray(values)
+    if np.iscomplexobj(values):
+        return quantize_q15(values.real) + 1j * quantize_q15(values.imag)
+
+    return np.clip(np.rint(values * Q15_SCALE), Q15_MIN, Q15_MAX) / Q15_SCALE
+
+
+class NumericMode: # the number format frames travel in. Float modes just pick a precision, q15 stores real frames as saturating int16
+    def __init__(self, name: str, real_dtype: np.dtype, complex_dtype: np.dtype, fixed_point: bool = False):
+        self.name: str = name
+        self.real_dtype: np.dtype = np.dtype(real_dtype)
+        self.complex_dtype: np.dtype = np.dtype(complex_dtype)
+        self.fixed_point: bool = fixed_point
+
+    def __repr__(self) -> str:
+        return f"NumericMode({self.name})"
+
+    def to_frame(self, values) -> np.ndarray: # float values into this mode. There is no complex int16 in numpy, so complex q15 frames are complex64 already on the q15 grid
+        values = np.asarray(values)
+        if not self.fixed_point:
+            return values.astype(self.complex_dtype if np.iscomplexobj(values) else self.real_dtype, copy=False)
+
+        if np.iscomplexobj(values):
+            return quantize_q15(values).astype(self.complex_dtype)
+        if values.dtype == np.int16: # already q15
+            return values
+
+        return np.clip(np.rint(values * Q15_SCALE), Q15_MIN, Q15_MAX).astype(np.int16)
+
+    def from_frame(self, frame) -> np.ndarray: # back to float64 / complex128 values
+        frame = np.asarray(frame)
+        if frame.dtype == np.int16:
+            return frame / Q15_SCALE
+
+        return frame.astype(complex if np.iscomplexobj(frame) else float, copy=False)
+
+    def quantize(self, values: np.ndarray) -> np.ndarray: # rounding a value through this mode's precision, without changing its representation
+        values = np.asarray(values)
+        if self.fixed_point:
+            return quantize_q15(values)
+
+        return values.astype(self.complex_dtype if np.iscomplexobj(values) else self.real_dtype).astype(values.dtype)
+
+
+FLOAT64: NumericMode = NumericMode("float64", np.float64, np.complex128)
+FLOAT32: NumericMode = NumericMode("float32", np.float32, np.complex64)
+Q15: NumericMode = NumericMode("q15", np.int16, np.complex64, fixed_point=True)
+
+NUMERIC_MODES: dict[str, NumericMode] = {mode.name: mode for mode in (FLOAT64, FLOAT32, Q15)}
+
+def get_numeric_mode(mode) -> NumericMode: # accepts a mode or its name
+    if isinstance(mode, NumericMode):
+        return mode
+    if mode not in NUMERIC_MODES:
+        raise ValueError(f"Unknown numeric mode {mode}, expected one of {', '.join(NUMERIC_MODES)}")
+
+    return NUMERIC_MODES[mode]
+
+
+def fixed_point_fft(plan: FFTPlan, values: np.ndarray, inverse: bool = False) -> np.ndarray: # radix 2 fft the way a q15 dsp library does it. Twiddles and every butterfly output are rounded to q15 and each stage halves, so the result is scaled by 1 / size and can't overflow
+    buffer: np.ndarray = quantize_q15(np.asarray(values, dtype=complex)[..., plan.bit_reversal])
+    stage_twiddles: list[np.ndarray] = plan.inverse_stage_twiddles if inverse else plan.stage_twiddles
+
+    for stage in stage_twiddles:
+        half_length: int = len(stage)
+        blocks: np.ndarray = buffer.reshape(buffer.shape[:-1] + (-1, 2 * half_length))
+        even: np.ndarray = blocks[..., :half_length]
+        odd: np.ndarray = blocks[..., half_length:]
+
+        product: np.ndarray = quantize_q15(odd * quantize_q15(stage))
+        difference: np.ndarray = quantize_q15((even - product) / 2)
+        even[...] = quantize_q15((even + product) / 2)
+        odd[...] = difference
+
+    return buffer
+
+
+def compare_to_float64(step_factory: Callable, frames: list[np.ndarray], mode: NumericMode) -> dict: # runs the same frames through a float64 step and one in the given mode, errors are measured after undoing any output scaling the mode applies
+    mode = get_numeric_mode(mode)
+    reference_step = step_factory()
+    reference_step.set_numeric_mode(FLOAT64)
+    step = step_factory()
+    step.set_numeric_mode(mode)
+
+    reference: np.ndarray = np.concatenate([np.asarray(reference_step.computation(FLOAT64.to_frame(frame))).reshape(-1) for frame in frames])
+    output: np.ndarray = np.concatenate([mode.from_frame(step.computation(mode.to_frame(frame))).reshape(-1) for frame in frames]) / step.output_scale
+
+    error: np.ndarray = output - reference
+    signal_power: float = float(np.mean(np.abs(reference) ** 2))
+    error_power: float = float(np.mean(np.abs(error) ** 2))
+
+    return {"mode": mode.name, "max_abs_error": float(np.max(np.abs(error))), "rms_error": error_power ** 0.5,
+            "snr_db": float(10 * np.log10(signal_power / error_power)) if error_power > 0 else float("inf")}
+
+def error_report(step_factories: dict[str, Callable], frames: list[np.ndarray], modes: list = (FLOAT32, Q15)) -> dict: # step name -> one comparison per mode
+    return {name: [compare_to_float64(factory, frames, mode) for mode in modes] for name, factory in step_factories.items()}
+
+
+if __name__ == "__main__":
+    from .fm_pipeline import DFTStep, IDFTStep, FIRFilterStep, FMModulatorStep
+    from .convolution import windowed_sinc_lowpass
+    from .generate_signal import MultitoneGenerator
+
+    frame_size: int = 1024
+    generator: MultitoneGenerator = MultitoneGenerator(48000, [440, 3100, 9000], [0.3, 0.2, 0.1])
+    frames: list[np.ndarray] = [generator.generate(start, frame_size) for start in range(0, 16 * frame_size, frame_size)]
+
+    report: dict = error_report({
+        "DFTStep": lambda: DFTStep(frame_size),
+        "FIRFilterStep": lambda: FIRFilterStep(windowed_sinc_lowpass(127, 5000, 48000)),
+        "FMModulatorStep": lambda: FMModulatorStep(48000, 10000, 2500),
+    }, frames)
+    report["IDFTStep"] = error_report({"IDFTStep": lambda: IDFTStep(frame_size)}, [np.fft.fft(frame) / frame_size for frame in frames])["IDFTStep"]
+
+    for name, comparisons in report.items():
+        for comparison in comparisons:
+            print(f"{name:<16}{comparison['mode']:<10}max {comparison['max_abs_error']:.3e}  rms {comparison['rms_error']:.3e}  snr {comparison['snr_db']:.1f} dB")
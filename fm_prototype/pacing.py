@@ -0,0 +1,111 @@
+from threading import Lock
+from time import perf_counter, sleep
+from typing import Callable
+
+
+OVERRUN_POLICIES: tuple = ("drop", "skip", "degrade") # late frame is discarded / the input jumps ahead by the lag so the output stays on schedule / steps switch to their cheaper paths until slack recovers
+
+
+class FramePacer: # wall clock schedule for a pipeline. A paced source releases each frame when its last sample would have arrived live, the sink hands every frame on latency seconds after that
+    def __init__(self, latency: float, overrun_policy: str = "drop", pace_source: bool = True, recovery_frames: int = 16):
+        if latency < 0:
+            raise ValueError("Latency must not be negative")
+        if overrun_policy not in OVERRUN_POLICIES:
+            raise ValueError(f"Unknown overrun policy {overrun_policy}, expected one of {', '.join(OVERRUN_POLICIES)}")
+
+        self.latency: float = latency
+        self.overrun_policy: str = overrun_policy
+        self.pace_source: bool = pace_source # off for sources that block on live input by themselves
+        self.recovery_frames: int = recovery_frames # on time frames in a row, with at least half the latency to spare, before degraded steps are restored
+        self.degrade_callback: Callable = None # called with True / False as the degraded state changes
+
+        self.source_clock = None # DSPTimeSync per end, counting samples since start including skipped ones
+        self.sink_clock = None
+        self.start_time: float = None
+        self.schedule_shift: float = 0.0 # seconds the schedule moved forward through skips
+        self.pending_skip: float = 0.0 # seconds of input the source still has to skip
+        self.skip_lock: Lock = Lock() # skips are requested by the sink thread and taken by the source thread
+
+        self.degraded: bool = False
+        self.on_time_streak: int = 0
+
+        self.frames: int = 0
+        self.late_frames: int = 0
+        self.dropped_frames: int = 0
+        self.skipped_samples: int = 0
+        self.degrade_events: int = 0
+        self.slack_total: float = 0.0
+        self.slack_minimum: float = float("inf")
+        self.last_slack: float = 0.0
+
+    def start(self, source_clock, sink_clock) -> None:
+        self.source_clock = source_clock
+        self.sink_clock = sink_clock
+        self.start_time = perf_counter()
+
+    def wait_until(self, deadline: float) -> None:
+        delay: float = deadline - perf_counter()
+        if delay > 0:
+            sleep(delay)
+
+    def release_source_frame(self, num_samples: int) -> None: # source thread, after the source produced num_samples
+        self.source_clock.increment_time(num_samples)
+        if self.pace_source:
+            self.wait_until(self.start_time + self.source_clock.samples_to_seconds(self.source_clock.elapsed_samples()))
+
+    def take_skip(self) -> int: # source thread, input samples to skip before the next frame
+        with self.skip_lock:
+            seconds: float = self.pending_skip
+            self.pending_skip = 0.0
+
+        return self.source_clock.seconds_to_samples(seconds)
+
+    def record_skip(self, num_samples: int) -> None:
+        self.source_clock.increment_time(num_samples)
+        self.skipped_samples += num_samples
+
+    def admit(self, num_samples: int) -> bool: # sink thread, waits out the frame's slack. False means the frame should be dropped
+        self.sink_clock.increment_time(num_samples)
+        deadline: float = self.start_time + self.latency + self.schedule_shift + self.sink_clock.samples_to_seconds(self.sink_clock.elapsed_samples())
+        slack: float = deadline - perf_counter()
+
+        self.frames += 1
+        self.slack_total += slack
+        self.slack_minimum = min(self.slack_minimum, slack)
+        self.last_slack = slack
+
+        if slack >= 0:
+            self.on_time_streak += 1
+            if self.degraded and self.on_time_streak >= self.recovery_frames and slack >= self.latency / 2:
+                self.__set_degraded(False)
+            sleep(slack)
+            return True
+
+        self.late_frames += 1
+        self.on_time_streak = 0
+
+        if self.overrun_policy == "drop":
+            self.dropped_frames += 1
+            return False
+        if self.overrun_policy == "skip": # this frame goes out now and on the shifted schedule, the input catches up by dropping what it would have played late
+            with self.skip_lock:
+                self.schedule_shift -= slack
+                self.pending_skip -= slack
+            return True
+
+        if not self.degraded:
+            self.__set_degraded(True)
+        return True
+
+    def __set_degraded(self, degraded: bool) -> None:
+        self.degraded = degraded
+        self.on_time_streak = 0
+        if degraded:
+            self.degrade_events += 1
+        if self.degrade_callback:
+            self.degrade_callback(degraded)
+
+    def snapshot(self) -> dict:
+        return {"latency_s": self.latency, "overrun_policy": self.overrun_policy, "frames": self.frames, "late_frames": self.late_frames, "dropped_frames": self.dropped_frames,
+                "skipped_samples": self.skipped_samples, "degraded": self.degraded, "degrade_events": self.degrade_events, "last_slack_s": self.last_slack,
+                "mean_slack_s": self.slack_total / self.frames if self.frames else 0.0, "min_slack_s": self.slack_minimum if self.frames else 0.0}
@@ -0,0 +1,234 @@
+import struct
+import subprocess
+import numpy as np
+
+
+SAMPLE_FORMATS: dict[str, np.dtype] = {"s16le": np.dtype("<i2"), "f32le": np.dtype("<f4")}
+LAYOUT_CHANNELS: dict[str, int] = {"mono": 1, "stereo": 2, "iq": 2}
+INT16_SCALE = 1 / 32768
+
+WAVE_FORMAT_PCM = 1
+WAVE_FORMAT_IEEE_FLOAT = 3
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def check_format(sample_format: str, layout: str) -> None:
+    if sample_format not in SAMPLE_FORMATS:
+        raise ValueError(f"Unknown sample format {sample_format}, expected one of {', '.join(SAMPLE_FORMATS)}")
+    if layout not in LAYOUT_CHANNELS:
+        raise ValueError(f"Unknown layout {layout}, expected one of {', '.join(LAYOUT_CHANNELS)}")
+
+def deinterleave(raw: np.ndarray, layout: str, normalize: bool) -> np.ndarray: # interleaved file samples to a pipeline frame. Mono is 1d, stereo is (channels, samples), iq is complex
+    values: np.ndarray = raw.astype(float) * INT16_SCALE if normalize and raw.dtype.kind == "i" else raw.astype(float)
+
+    if layout == "mono":
+        return values
+    if layout == "iq":
+        return values[0::2] + 1j * values[1::2]
+
+    return values.reshape(-1, 2).T
+
+def interleave(frame: np.ndarray, layout: str, dtype: np.dtype, normalize: bool) -> np.ndarray: # inverse of deinterleave, integer formats are scaled and clipped
+    frame = np.asarray(frame)
+
+    if layout == "iq":
+        values: np.ndarray = np.empty(2 * frame.shape[-1])
+        values[0::2] = frame.real
+        values[1::2] = frame.imag
+    elif layout == "stereo":
+        values: np.ndarray = frame.T.reshape(-1)
+    else:
+        values: np.ndarray = np.real(frame)
+
+    if dtype.kind == "i":
+        limits: np.iinfo = np.iinfo(dtype)
+        scaled: np.ndarray = np.rint(values / INT16_SCALE) if normalize else np.rint(values)
+        return np.clip(scaled, limits.min, limits.max).astype(dtype)
+
+    return values.astype(dtype)
+
+
+class PCMFileSource: # memory maps a raw interleaved pcm file and hands out one frame per call, raises EOFError at the end so the pipeline can drain and stop
+    def __init__(self, path: str, frame_size: int, sample_format: str = "s16le", layout: str = "mono", offset: int = 0, length: int = None, normalize: bool = True, loop: bool = False):
+        check_format(sample_format, layout)
+        self.frame_size: int = frame_size
+        self.layout: str = layout
+        self.channels: int = LAYOUT_CHANNELS[layout]
+        self.normalize: bool = normalize
+        self.loop: bool = loop # start over from the beginning instead of ending the stream
+
+        dtype: np.dtype = SAMPLE_FORMATS[sample_format]
+        self.samples: np.ndarray = np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=length) # only the pages actually read get loaded
+        self.num_frames: int = len(self.samples) // self.channels # a trailing partial frame of channels is ignored
+        self.position: int = 0
+
+    def seek(self, frame_index: int) -> None: # position in samples per channel, not pipeline frames
+        if not 0 <= frame_index <= self.num_frames:
+            raise ValueError(f"Position {frame_index} outside the file's {self.num_frames} samples")
+        self.position = frame_index
+
+    def __call__(self) -> np.ndarray:
+        if self.position >= self.num_frames:
+            if not self.loop or self.num_frames == 0:
+                raise EOFError("End of pcm file")
+            self.position = 0
+
+        end: int = min(self.position + self.frame_size, self.num_frames) # the last frame may be short
+        raw: np.ndarray = self.samples[self.position * self.channels:end * self.channels]
+        self.position = end
+
+        return deinterleave(raw, self.layout, self.normalize)
+
+
+def read_wav_header(path: str) -> dict: # walks the riff chunks for fmt and data. Returns the format, channel count, sample rate and where the samples are
+    with open(path, "rb") as file:
+        riff, size, wave = struct.unpack("<4sI4s", file.read(12))
+        if riff != b"RIFF" or wave != b"WAVE":
+            raise ValueError(f"{path} is not a RIFF WAVE file")
+
+        header: dict = {}
+        while True:
+            chunk_header: bytes = file.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError(f"{path} has no data chunk")
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+
+            if chunk_id == b"fmt ":
+                fmt: bytes = file.read(chunk_size)
+                format_tag, channels, sample_rate, byte_rate, block_align, bits_per_sample = struct.unpack("<HHIIHH", fmt[:16])
+                if format_tag == WAVE_FORMAT_EXTENSIBLE: # the real tag is the first two bytes of the sub format guid
+                    format_tag = struct.unpack("<H", fmt[24:26])[0]
+                header.update(format_tag=format_tag, channels=channels, sample_rate=sample_rate, bits_per_sample=bits_per_sample)
+            elif chunk_id == b"data":
+                if "format_tag" not in header:
+                    raise ValueError(f"{path} has a data chunk before its fmt chunk")
+                header.update(data_offset=file.tell(), data_size=chunk_size)
+                return header
+            else:
+                file.seek(chunk_size, 1)
+
+            if chunk_size % 2: # chunks are word aligned
+                file.seek(1, 1)
+
+def wav_sample_format(header: dict) -> str:
+    if header["format_tag"] == WAVE_FORMAT_PCM and header["bits_per_sample"] == 16:
+        return "s16le"
+    if header["format_tag"] == WAVE_FORMAT_IEEE_FLOAT and header["bits_per_sample"] == 32:
+        return "f32le"
+
+    raise ValueError(f"Unsupported WAV encoding, format tag {header['format_tag']} with {header['bits_per_sample']} bits per sample")
+
+
+class WAVFileSource(PCMFileSource): # PCMFileSource over the data chunk of a 16 bit pcm or 32 bit float wav file
+    def __init__(self, path: str, frame_size: int, layout: str = None, normalize: bool = True, loop: bool = False):
+        header: dict = read_wav_header(path)
+        if header["channels"] > 2:
+            raise ValueError(f"Only mono and stereo WAV files are supported, got {header['channels']} channels")
+        layout = layout if layout else ("stereo" if header["channels"] == 2 else "mono")
+        if LAYOUT_CHANNELS[layout] != header["channels"]:
+            raise ValueError(f"Layout {layout} does not match the file's {header['channels']} channels")
+
+        sample_format: str = wav_sample_format(header)
+        length: int = header["data_size"] // SAMPLE_FORMATS[sample_format].itemsize
+        super().__init__(path, frame_size, sample_format, layout, header["data_offset"], length, normalize, loop)
+
+        self.sample_rate: int = header["sample_rate"]
+
+
+class PCMFileSink: # callable sink writing frames as raw interleaved pcm. Frames go out in one write each, no per sample work
+    def __init__(self, path: str, sample_format: str = "s16le", layout: str = "mono", normalize: bool = True):
+        check_format(sample_format, layout)
+        self.dtype: np.dtype = SAMPLE_FORMATS[sample_format]
+        self.layout: str = layout
+        self.normalize: bool = normalize
+        self.samples_written: int = 0
+        self.file = open(path, "wb")
+
+    def __call__(self, frame: np.ndarray) -> None:
+        values: np.ndarray = interleave(np.atleast_1d(frame), self.layout, self.dtype, self.normalize)
+        values.tofile(self.file)
+        self.samples_written += len(values)
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class WAVFileSink(PCMFileSink): # writes a header up front and fills in the chunk sizes on close
+    def __init__(self, path: str, sample_rate: int, sample_format: str = "s16le", layout: str = "mono", normalize: bool = True):
+        if layout == "iq":
+            layout = "stereo" # iq is stored as a stereo file, in phase on the left
+            self.iq: bool = True
+        else:
+            self.iq: bool = False
+
+        super().__init__(path, sample_format, layout, normalize)
+        self.sample_rate: int = sample_rate
+        self.channels: int = LAYOUT_CHANNELS[layout]
+        self.__write_header()
+
+    def __call__(self, frame: np.ndarray) -> None:
+        if self.iq:
+            frame = np.stack((np.real(frame), np.imag(frame)))
+        super().__call__(frame)
+
+    def __write_header(self) -> None:
+        is_float: bool = self.dtype.kind == "f"
+        data_size: int = self.samples_written * self.dtype.itemsize
+        block_align: int = self.channels * self.dtype.itemsize
+
+        fmt: bytes = struct.pack("<HHIIHH", WAVE_FORMAT_IEEE_FLOAT if is_float else WAVE_FORMAT_PCM, self.channels, self.sample_rate, self.sample_rate * block_align, block_align, 8 * self.dtype.itemsize)
+        chunks: bytes = b"WAVE" + b"fmt " + struct.pack("<I", len(fmt)) + fmt
+        if is_float: # non pcm formats carry a fact chunk with the frame count
+            chunks += b"fact" + struct.pack("<II", 4, self.samples_written // self.channels)
+
+        self.file.seek(0)
+        self.file.write(b"RIFF" + struct.pack("<I", len(chunks) + 8 + data_size) + chunks + b"data" + struct.pack("<I", data_size))
+
+    def close(self) -> None:
+        self.__write_header()
+        super().close()
+
+
+class SubprocessPipeSource: # reads raw pcm frames from a child process' stdout, e.g. ffmpeg decoding to s16le. Bulk reads into one preallocated buffer
+    def __init__(self, command: list[str], frame_size: int, sample_format: str = "s16le", layout: str = "mono", normalize: bool = True):
+        check_format(sample_format, layout)
+        self.dtype: np.dtype = SAMPLE_FORMATS[sample_format]
+        self.layout: str = layout
+        self.normalize: bool = normalize
+        self.frame_bytes: int = frame_size * LAYOUT_CHANNELS[layout] * self.dtype.itemsize
+        self.read_buffer: bytearray = bytearray(self.frame_bytes)
+
+        self.process: subprocess.Popen = subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, bufsize=0)
+
+    def __fill(self) -> int: # pipes can return short reads, keep going until the frame is full or the stream ends
+        view: memoryview = memoryview(self.read_buffer)
+        filled: int = 0
+        while filled < self.frame_bytes:
+            count: int = self.process.stdout.readinto(view[filled:])
+            if not count:
+                break
+            filled += count
+
+        return filled
+
+    def __call__(self) -> np.ndarray:
+        filled: int = self.__fill()
+        usable: int = filled - filled % (LAYOUT_CHANNELS[self.layout] * self.dtype.itemsize)
+        if usable == 0:
+            raise EOFError("Subprocess closed its output")
+
+        raw: np.ndarray = np.frombuffer(self.read_buffer, dtype=self.dtype, count=usable // self.dtype.itemsize)
+
+        return deinterleave(raw, self.layout, self.normalize) # deinterleave copies, so the read buffer can be reused right away
+
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.process.terminate()
+        self.process.stdout.close()
+        self.process.wait()
+
+
+def ffmpeg_source(path: str, frame_size: int, sample_rate: int, channels: int = 1, ffmpeg: str = "ffmpeg") -> SubprocessPipeSource: # decodes anything ffmpeg understands (e.g. a transport stream) to s16le at the requested rate
+    command: list[str] = [ffmpeg, "-nostdin", "-loglevel", "error", "-i", path, "-f", "s16le", "-acodec", "pcm_s16le", "-ac", str(channels), "-ar", str(sample_rate), "pipe:1"]
+
+    return SubprocessPipeSource(command, frame_size, "s16le", "stereo" if channels == 2 else "mono")
@@ -0,0 +1,57 @@
+from fractions import Fraction
+import numpy as np
+from .convolution import windowed_sinc_lowpass
+
+
+class PolyphaseResampler: # rational interpolation / decimation. The prototype filter is split into one short filter per phase, and only the outputs that are kept get computed
+    def __init__(self, interpolation: int, decimation: int, taps: np.ndarray = None, taps_per_phase: int = 16, bandwidth: float = 0.9, dtype: np.dtype = None): # dtype is the real working precision, e.g. float32. Defaults to the taps' own
+        if interpolation < 1 or decimation < 1:
+            raise ValueError("Interpolation and decimation factors must be at least 1")
+
+        ratio: Fraction = Fraction(interpolation, decimation)
+        self.interpolation: int = ratio.numerator
+        self.decimation: int = ratio.denominator
+
+        if taps is None: # cutoff is relative to the upsampled rate, gain of interpolation makes up for the inserted zeros
+            cutoff: float = bandwidth * 0.5 / max(self.interpolation, self.decimation)
+            taps = self.interpolation * windowed_sinc_lowpass(taps_per_phase * max(self.interpolation, self.decimation), cutoff, 1.0)
+
+        self.taps: np.ndarray = np.asarray(taps)
+        taps = self.taps.astype(dtype, copy=False) if dtype else self.taps
+        self.taps_per_phase: int = -(-len(taps) // self.interpolation)
+
+        padded_taps: np.ndarray = np.zeros(self.taps_per_phase * self.interpolation, dtype=taps.dtype)
+        padded_taps[:len(taps)] = taps
+        self.phase_filters: np.ndarray = padded_taps.reshape(self.taps_per_phase, self.interpolation).T # phase_filters[p, j] = taps[p + j * interpolation]
+
+        self.history: np.ndarray = np.zeros(self.taps_per_phase - 1, dtype=taps.dtype)
+        self.offset: int = 0 # upsampled position of the next kept output, relative to the start of the next frame
+        self.tap_offsets: np.ndarray = np.arange(self.taps_per_phase)
+
+    def reset(self) -> None:
+        self.history[:] = 0
+        self.offset = 0
+
+    def process(self, values: np.ndarray) -> np.ndarray: # output length varies frame to frame, averaging len(values) * interpolation / decimation. Works along the last axis, channels share the same output positions
+        values = np.asarray(values)
+        if self.history.shape[:-1] != values.shape[:-1]: # a new channel layout starts from silence
+            self.history = np.zeros(values.shape[:-1] + (self.taps_per_phase - 1,), dtype=self.history.dtype)
+
+        extended: np.ndarray = np.concatenate((self.history, values), axis=-1)
+        upsampled_length: int = values.shape[-1] * self.interpolation
+
+        positions: np.ndarray = np.arange(self.offset, upsampled_length, self.decimation)
+        phases: np.ndarray = positions % self.interpolation
+        newest_inputs: np.ndarray = positions // self.interpolation + (self.taps_per_phase - 1)
+
+        # y[m] = sum_j taps[p + j * L] * x[i - j] where position m * M = i * L + p
+        windows: np.ndarray = extended[..., newest_inputs[:, None] - self.tap_offsets]
+        output: np.ndarray = np.einsum("...ij,ij->...i", windows, self.phase_filters[phases])
+
+        if len(positions):
+            self.offset = int(positions[-1]) + self.decimation - upsampled_length
+        else:
+            self.offset -= upsampled_length
+        self.history = extended[..., extended.shape[-1] - (self.taps_per_phase - 1):]
+
+        return output
@@ -0,0 +1,285 @@
+from multiprocessing import Process, Queue
+from multiprocessing.shared_memory import SharedMemory
+from threading import Thread
+from typing import Callable
+from time import sleep, monotonic
+import numpy as np
+from .fm_pipeline import AbstractBuffer, AbstractPipelineStep, AbstractThreadUnit, BufferClosedError, ParallelThreadOrchestrator, RingBuffer, TestThreadUnit, detached_copy, is_empty_frame
+
+
+SHARED_DTYPES: list[np.dtype] = [np.dtype(dtype) for dtype in (np.float64, np.complex128, np.float32, np.complex64, np.int16, np.int32, np.int64)]
+
+HEAD, TAIL, CLOSED = 0, 1, 2
+HEADER_BYTES = 4 * 8
+META_FIELDS = 4 # dtype index, ndim, shape[0], shape[1]
+
+SLOT_ITEM_BYTES = np.dtype(np.complex128).itemsize # widest value a frame can hold
+
+MIN_BACKOFF = 0.00005
+MAX_BACKOFF = 0.002
+
+
+class SharedMemoryRingBuffer(AbstractBuffer): # single producer single consumer across processes. Head, tail and frames all live in one shared memory block, blocking sides poll with a backoff
+    def __init__(self, capacity: int, slot_bytes: int, samples_per_second: int):
+        super().__init__(0, samples_per_second)
+        if capacity < 2:
+            raise ValueError("Shared ring capacity must be at least 2, the consumer holds one slot while it reads")
+
+        self.capacity: int = capacity
+        self.slot_bytes: int = slot_bytes
+        self.owner: bool = True
+        self.memory: SharedMemory = SharedMemory(create=True, size=HEADER_BYTES + capacity * (META_FIELDS * 8 + slot_bytes))
+        self.__map()
+
+        self.header[:] = 0
+
+    def __map(self) -> None:
+        self.header: np.ndarray = np.ndarray((4,), dtype=np.int64, buffer=self.memory.buf)
+        self.meta: np.ndarray = np.ndarray((self.capacity, META_FIELDS), dtype=np.int64, buffer=self.memory.buf, offset=HEADER_BYTES)
+        self.storage_offset: int = HEADER_BYTES + self.capacity * META_FIELDS * 8
+        self.held: bool = False # the consumer's last view still points at the slot under head
+
+    def __getstate__(self) -> dict: # only the name crosses the process boundary, the child attaches to the same block
+        return {"name": self.memory.name, "capacity": self.capacity, "slot_bytes": self.slot_bytes, "samples_per_second": self.samples_per_second}
+
+    def __setstate__(self, state: dict) -> None:
+        self.capacity = state["capacity"]
+        self.slot_bytes = state["slot_bytes"]
+        self.samples_per_second = state["samples_per_second"]
+        self.owner = False
+        self.memory = SharedMemory(name=state["name"]) # child processes share the creator's resource tracker, so attaching doesn't add a second owner
+        self.__map()
+
+    def __slot_view(self, index: int, dtype: np.dtype, shape: tuple) -> np.ndarray:
+        return np.ndarray(shape, dtype=dtype, buffer=self.memory.buf, offset=self.storage_offset + index * self.slot_bytes)
+
+    def release(self) -> None: # hands the slot of the last pulled view back to the producer
+        if self.held:
+            self.header[HEAD] += 1
+            self.held = False
+
+    def occupancy(self) -> int:
+        return int(self.header[TAIL] - self.header[HEAD])
+
+    def is_empty(self) -> bool:
+        return self.occupancy() - self.held <= 0
+
+    def is_full(self) -> bool:
+        return self.occupancy() >= self.capacity
+
+    def pull_operation(self) -> np.ndarray:
+        index: int = int(self.header[HEAD]) % self.capacity
+        dtype_index, ndim, rows, columns = self.meta[index]
+        shape: tuple = (rows, columns)[:ndim]
+
+        view: np.ndarray = self.__slot_view(index, SHARED_DTYPES[dtype_index], shape)
+        view.flags.writeable = False
+        self.held = True
+
+        return view
+
+    def push_operation(self, value: np.ndarray) -> None:
+        index: int = int(self.header[TAIL]) % self.capacity
+        self.__slot_view(index, value.dtype, value.shape)[...] = value
+        self.meta[index] = (SHARED_DTYPES.index(value.dtype), value.ndim) + value.shape + (0,) * (2 - value.ndim)
+
+        self.header[TAIL] += 1 # published only after the frame is written
+
+    def try_push(self, value: np.ndarray) -> bool:
+        if self.header[CLOSED]:
+            raise BufferClosedError("Cannot push to a closed shared ring buffer")
+
+        value = np.asarray(value)
+        if value.dtype not in SHARED_DTYPES or value.ndim > 2:
+            raise ValueError(f"Shared ring buffers carry 1 or 2 dimensional {', '.join(str(dtype) for dtype in SHARED_DTYPES)} frames")
+        if value.nbytes > self.slot_bytes:
+            raise ValueError(f"Frame of {value.nbytes} bytes does not fit a {self.slot_bytes} byte slot")
+        if self.is_full():
+            return False
+
+        self.push_operation(value)
+        return True
+
+    def try_pull(self) -> np.ndarray: # read only view into shared memory, valid until the next pull. None when there is nothing to pull yet
+        self.release()
+
+        if self.is_empty():
+            if self.header[CLOSED]:
+                raise BufferClosedError("Shared ring buffer closed and drained")
+            return None
+
+        return self.pull_operation()
+
+    def push_blocking(self, value: np.ndarray, timeout: float = None) -> bool:
+        deadline: float = None if timeout is None else monotonic() + timeout
+        backoff: float = MIN_BACKOFF
+
+        while not self.try_push(value):
+            if deadline is not None and monotonic() >= deadline:
+                return False
+            sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+        return True
+
+    def pull_blocking(self, timeout: float = None) -> np.ndarray:
+        deadline: float = None if timeout is None else monotonic() + timeout
+        backoff: float = MIN_BACKOFF
+
+        while True:
+            value: np.ndarray = self.try_pull()
+            if value is not None:
+                return value
+            if deadline is not None and monotonic() >= deadline:
+                return None
+            sleep(backoff)
+            backoff = min(backoff * 2, MAX_BACKOFF)
+
+    def pull(self) -> np.ndarray:
+        return self.pull_blocking()
+
+    def push(self, value: np.ndarray) -> None:
+        self.push_blocking(value)
+
+    def close(self) -> None:
+        self.header[CLOSED] = 1
+
+    def destroy(self) -> None: # owner unlinks the block once every process is done with it
+        del self.header, self.meta
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+
+def run_process_group(steps: list[AbstractPipelineStep], inbound: SharedMemoryRingBuffer, outbound: SharedMemoryRingBuffer, errors: Queue) -> None: # module level so it can be pickled for spawned processes. A failing step closes both rings so the neighbours stop, its exception goes back through errors
+    try:
+        while True:
+            value: np.ndarray = inbound.pull()
+            for step in steps:
+                value = step.computation(value)
+                if is_empty_frame(value): # a rate change in the group has no output yet
+                    break
+            else:
+                outbound.push(value)
+    except BufferClosedError: # input drained, or the next group stopped
+        inbound.close()
+        outbound.close()
+    except Exception as error:
+        inbound.close()
+        outbound.close()
+        errors.put(error)
+
+
+class ProcessGroupUnit(AbstractThreadUnit): # a group of neighbouring steps run back to back in one process, no buffers between them
+    def __init__(self, steps: list[AbstractPipelineStep], inbound: SharedMemoryRingBuffer, outbound: SharedMemoryRingBuffer, join_timeout: float):
+        super().__init__([])
+        self.join_timeout: float = join_timeout
+        self.errors: Queue = Queue()
+        self.process: Process = Process(target=run_process_group, args=([detached_copy(step) for step in steps], inbound, outbound, self.errors), daemon=True)
+
+    def run(self):
+        self.process.start()
+
+    def join(self):
+        self.process.join(self.join_timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+        if self.error is None and not self.errors.empty():
+            self.error = self.errors.get()
+
+
+class BridgeThreadUnit(AbstractThreadUnit): # moves frames between the pipeline's in process buffers and the shared memory rings
+    def __init__(self, inbound: AbstractBuffer, outbound: AbstractBuffer, copy_frames: bool, idle_timeout: float):
+        super().__init__([self.transfer])
+        self.inbound: AbstractBuffer = inbound
+        self.outbound: AbstractBuffer = outbound
+        self.copy_frames: bool = copy_frames # frames leaving shared memory must be copied before their slot is reused
+        self.idle_timeout: float = idle_timeout
+        self.thread: Thread = Thread(target=self.run_function_pool)
+
+    def transfer(self) -> None:
+        try:
+            value = self.inbound.pull_blocking(self.idle_timeout)
+        except BufferClosedError:
+            self.outbound.close()
+            raise
+
+        if value is not None:
+            try:
+                self.outbound.push(np.array(value) if self.copy_frames else value)
+            except BufferClosedError: # the far side stopped, stop what feeds this side too
+                self.inbound.close()
+                raise
+
+    def run(self):
+        self.thread.start()
+
+    def join(self):
+        self.thread.join()
+
+
+class ProcessPipelineOrchestrator(ParallelThreadOrchestrator): # steps are split into at most max_threads process groups connected by shared memory rings. Source and sink stay in this process
+    def __init__(self, ring_capacity: int = 8, max_frame_bytes: int = None, idle_timeout: float = 0.05, join_timeout: float = 5.0):
+        super().__init__(idle_timeout=idle_timeout)
+        self.ring_capacity: int = ring_capacity
+        self.max_frame_bytes: int = max_frame_bytes # fixed slot size for every ring. By default each ring is sized for the largest frame its producing group can emit
+        self.join_timeout: float = join_timeout
+        self.shared_buffers: list[SharedMemoryRingBuffer] = []
+
+    def orchestrate_threads(self, source: Callable, sink: Callable, function_pool: list[AbstractPipelineStep]) -> list[AbstractThreadUnit]:
+        for step in function_pool:
+            if len(step.get_entry_buffers()) != 1 or not isinstance(step.exit_buffer, RingBuffer):
+                raise ValueError("ProcessPipelineOrchestrator runs linear pipelines on ring buffers, create the Pipeline with a ring_capacity and no branches")
+
+        pipeline_source: AbstractBuffer = function_pool[0].entry_buffer
+        pipeline_sink: AbstractBuffer = function_pool[-1].exit_buffer
+        if not isinstance(pipeline_source, RingBuffer):
+            raise ValueError("ProcessPipelineOrchestrator needs ring buffers, create the Pipeline with a ring_capacity")
+
+        groups: list[list[AbstractPipelineStep]] = self.group_steps(function_pool)
+        slot_sizes: list[int] = self.slot_sizes(groups, pipeline_source)
+        self.shared_buffers = [SharedMemoryRingBuffer(self.ring_capacity, slot_bytes, pipeline_source.samples_per_second) for slot_bytes in slot_sizes]
+
+        threading_pool: list[AbstractThreadUnit] = [TestThreadUnit([source]), BridgeThreadUnit(pipeline_source, self.shared_buffers[0], False, self.idle_timeout)]
+        for group, inbound, outbound in zip(groups, self.shared_buffers[:-1], self.shared_buffers[1:]):
+            threading_pool.append(ProcessGroupUnit(group, inbound, outbound, self.join_timeout))
+        threading_pool.append(BridgeThreadUnit(self.shared_buffers[-1], pipeline_sink, True, self.idle_timeout))
+        threading_pool.append(TestThreadUnit([sink]))
+
+        return threading_pool
+
+    def slot_sizes(self, groups: list[list[AbstractPipelineStep]], pipeline_source: RingBuffer) -> list[int]: # bytes per slot of the ring in front of each group and after the last one
+        samples, channels = pipeline_source.frame_size // pipeline_source.channels, pipeline_source.channels
+        bounds: list[int] = [samples * channels]
+        for group in groups:
+            for step in group:
+                samples, channels = step.output_bound(samples, channels)
+            bounds.append(samples * channels)
+
+        slot_sizes: list[int] = [bound * SLOT_ITEM_BYTES for bound in bounds]
+        if not self.max_frame_bytes:
+            return slot_sizes
+        
+        for group_index, slot_bytes in enumerate(slot_sizes):
+            if slot_bytes > self.max_frame_bytes:
+                producer: str = "the source" if group_index == 0 else type(groups[group_index - 1][-1]).__name__
+                raise ValueError(f"Frames from {producer} can take {slot_bytes} bytes, more than max_frame_bytes {self.max_frame_bytes}")
+        
+        return [self.max_frame_bytes for x in slot_sizes]
+
+    def abort(self, error: Exception) -> None:
+        for buffer in self.shared_buffers:
+            buffer.close()
+        super().abort(error)
+
+    def end(self) -> None:
+        for buffer in self.shared_buffers:
+            buffer.close()
+
+        try:
+            super().end()
+        finally:
+            for buffer in self.shared_buffers:
+                buffer.destroy()
+            self.shared_buffers = []
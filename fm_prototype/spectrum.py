@@ -0,0 +1,108 @@
+import numpy as np
+from .fft import FFTPlan, get_fft_plan, is_power_of_two
+
+
+COSINE_WINDOWS: dict[str, tuple] = { # w[n] = sum_k (-1)^k a_k cos(2 pi k n / N)
+    "rectangular": (1.0,),
+    "hann": (0.5, 0.5),
+    "hamming": (0.54, 0.46),
+    "blackman": (0.42, 0.5, 0.08),
+    "blackman_harris": (0.35875, 0.48829, 0.14128, 0.01168),
+    "flattop": (0.21557895, 0.41663158, 0.277263158, 0.083578947, 0.006947368),
+}
+
+AVERAGING_MODES: tuple = ("linear", "exponential", "peak")
+
+
+def cosine_window(name: str, size: int) -> np.ndarray: # periodic (dft even) version, what spectral analysis wants
+    if name not in COSINE_WINDOWS:
+        raise ValueError(f"Unknown window {name}, expected one of {', '.join(COSINE_WINDOWS)}")
+
+    phase: np.ndarray = 2 * np.pi * np.arange(size) / size
+    return sum((-1) ** k * coefficient * np.cos(k * phase) for k, coefficient in enumerate(COSINE_WINDOWS[name]))
+
+
+spectrum_windows: dict[tuple, np.ndarray] = {}
+
+def get_window(name: str, size: int) -> np.ndarray:
+    key: tuple = (name, size)
+    if key not in spectrum_windows:
+        spectrum_windows[key] = cosine_window(name, size)
+        spectrum_windows[key].flags.writeable = False # shared between every estimator using it
+
+    return spectrum_windows[key]
+
+
+class WelchEstimator: # overlapped windowed fft segments, their power averaged over average_count segments per estimate. Works along the last axis, (channels, samples) frames give one spectrum per channel
+    def __init__(self, fft_size: int, window: str = "hann", overlap: float = 0.5, average_count: int = 8, averaging: str = "linear", sps: float = 1.0, density: bool = False):
+        if not is_power_of_two(fft_size):
+            raise ValueError("The fft size must be a power of two, the estimator runs on the fft plan")
+        if not 0 <= overlap < 1:
+            raise ValueError("Overlap must be in [0, 1)")
+        if average_count < 1:
+            raise ValueError("Average count must be at least 1")
+        if averaging not in AVERAGING_MODES:
+            raise ValueError(f"Unknown averaging {averaging}, expected one of {', '.join(AVERAGING_MODES)}")
+
+        self.fft_size: int = fft_size
+        self.hop: int = max(int(round(fft_size * (1 - overlap))), 1)
+        self.average_count: int = average_count
+        self.averaging: str = averaging
+        self.smoothing: float = 1 / average_count # exponential averaging weight of the newest segment
+
+        self.window: np.ndarray = get_window(window, fft_size)
+        self.plan: FFTPlan = get_fft_plan(fft_size)
+        # density gives power per hz, otherwise a tone of amplitude a reads a^2 (complex) or a^2 / 4 (real) in its bin
+        self.scale: float = 1 / (sps * np.sum(self.window ** 2)) if density else 1 / np.sum(self.window) ** 2
+
+        self.pending: np.ndarray = None # samples not yet consumed by a segment
+        self.accumulator: np.ndarray = None
+        self.segment_count: int = 0 # segments since the last estimate
+
+    def reset(self) -> None:
+        self.pending = None
+        self.accumulator = None
+        self.segment_count = 0
+
+    def __accumulate(self, power: np.ndarray) -> None: # in place, no allocation per segment
+        if self.accumulator is None:
+            self.accumulator = power.copy()
+        elif self.averaging == "linear":
+            if self.segment_count:
+                np.add(self.accumulator, power, out=self.accumulator)
+            else:
+                self.accumulator[...] = power
+        elif self.averaging == "exponential":
+            self.accumulator *= 1 - self.smoothing
+            self.accumulator += self.smoothing * power
+        else: # peak hold over the whole run, reset to start over
+            np.maximum(self.accumulator, power, out=self.accumulator)
+
+    def process(self, values: np.ndarray) -> np.ndarray: # returns (..., fft_size, estimates), usually with zero or one estimate. Bins are in fft order
+        values = np.asarray(values)
+        if self.pending is None or self.pending.shape[:-1] != values.shape[:-1]: # first frame or the channel layout changed
+            self.pending = np.zeros(values.shape[:-1] + (0,), dtype=values.dtype)
+            self.accumulator = None
+            self.segment_count = 0
+
+        extended: np.ndarray = np.concatenate((self.pending, values), axis=-1)
+        count: int = (extended.shape[-1] - self.fft_size) // self.hop + 1 if extended.shape[-1] >= self.fft_size else 0
+        self.pending = extended[..., count * self.hop:]
+
+        estimates: list[np.ndarray] = []
+        if count:
+            segments: np.ndarray = np.lib.stride_tricks.sliding_window_view(extended, self.fft_size, axis=-1)[..., :count * self.hop:self.hop, :]
+            spectra: np.ndarray = self.plan.forward(segments * self.window)
+            powers: np.ndarray = (spectra.real ** 2 + spectra.imag ** 2) * self.scale
+
+            for index in range(count):
+                self.__accumulate(powers[..., index, :])
+                self.segment_count += 1
+                if self.segment_count == self.average_count:
+                    estimates.append(self.accumulator / self.average_count if self.averaging == "linear" else self.accumulator.copy())
+                    self.segment_count = 0
+
+        if not estimates:
+            return np.zeros(values.shape[:-1] + (self.fft_size, 0))
+
+        return np.stack(estimates, axis=-1)
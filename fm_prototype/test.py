@@ -1,8 +1,10 @@
 def silly(x):
     x.append("a")
 
-v = [1,2,3]
 
-silly(v)
+if __name__ == "__main__":
+    v = [1,2,3]
 
-print(v)
\ No newline at end of file
+    silly(v)
+
+    print(v)
@@ -0,0 +1,92 @@
+import asyncio
+import numpy as np
+import pytest
+from fm_prototype import fm_pipeline
+from fm_prototype.async_pipeline import AsyncPipeline, AsyncFrameQueue
+from fm_prototype.fm_pipeline import AbstractPipelineStep, DSPTimeSync, BufferClosedError
+
+
+class FailingStep(AbstractPipelineStep): # fails on the third frame
+    def __init__(self):
+        super().__init__()
+        self.frames: int = 0
+
+    def computation(self, value: np.ndarray) -> np.ndarray:
+        self.frames += 1
+        if self.frames == 3:
+            raise RuntimeError("step failed")
+
+        return value
+
+
+async def endless_frames():
+    while True:
+        yield np.ones(16)
+
+
+async def finite_frames(count: int):
+    for index in range(count):
+        yield np.full(16, float(index))
+
+
+def run_pipeline(pipeline: AsyncPipeline, timeout: float = 10.0) -> None:
+    async def run() -> None:
+        await asyncio.wait_for(pipeline.run(), timeout)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("offload", [False, True])
+def test_failing_stage_raises_and_stops_the_others(offload):
+    outputs: list = []
+    pipeline: AsyncPipeline = AsyncPipeline(endless_frames(), outputs.append, DSPTimeSync(1000), queue_capacity=2)
+    pipeline.add_element(fm_pipeline.TestPipelineStep())
+    pipeline.add_element(FailingStep(), offload)
+    pipeline.add_element(fm_pipeline.TestPipelineStep())
+
+    with pytest.raises(RuntimeError, match="step failed"):
+        run_pipeline(pipeline)
+
+    assert all(task.done() for task in pipeline.tasks)
+    assert len(outputs) == 2
+
+
+def test_finite_source_reaches_the_sink():
+    outputs: list = []
+    pipeline: AsyncPipeline = AsyncPipeline(finite_frames(10), outputs.append, DSPTimeSync(1000), queue_capacity=2)
+    pipeline.add_element(fm_pipeline.TestPipelineStep())
+    pipeline.add_element(fm_pipeline.TestPipelineStep())
+    run_pipeline(pipeline)
+
+    assert [frame[0] for frame in outputs] == [4.0 * index for index in range(10)]
+    assert pipeline.output_time_sync.elapsed_samples() == 160
+
+
+def test_close_on_a_full_queue_does_not_wait():
+    async def fill_and_close() -> list:
+        queue: AsyncFrameQueue = AsyncFrameQueue(2)
+        await queue.push(np.zeros(1))
+        await queue.push(np.ones(1))
+        await asyncio.wait_for(queue.close(), 1)
+
+        drained: list = [await queue.pull(), await queue.pull()]
+        with pytest.raises(BufferClosedError):
+            await asyncio.wait_for(queue.pull(), 1)
+        return drained
+
+    drained: list = asyncio.run(fill_and_close())
+    assert [frame[0] for frame in drained] == [0.0, 1.0]
+
+
+def test_fusion_is_opt_in_and_keeps_the_output():
+    results: list = []
+    for fuse_steps in (False, True):
+        outputs: list = []
+        pipeline: AsyncPipeline = AsyncPipeline(finite_frames(10), outputs.append, DSPTimeSync(1000), fuse_steps=fuse_steps)
+        pipeline.add_element(fm_pipeline.TestPipelineStep())
+        pipeline.add_element(fm_pipeline.GainStep(3.0))
+        run_pipeline(pipeline)
+        results.append(outputs)
+
+    assert not AsyncPipeline(finite_frames(1), print, DSPTimeSync(1000)).fuse_steps
+    assert np.array_equal(np.concatenate(results[0]), np.concatenate(results[1]))
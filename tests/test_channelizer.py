@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from fm_prototype.channelizer import AnalysisFilterBank, SynthesisFilterBank
+
+
+def direct_channelizer(bank: AnalysisFilterBank, samples: np.ndarray) -> np.ndarray: # y_k[m] = sum_l h[l] x[mD - l] e^(-2j pi k (mD - l) / N), straight from the definition
+    padded: np.ndarray = np.concatenate([np.zeros(bank.filter_length - 1, dtype=complex), samples])
+    outputs: list = []
+    for position in range(0, len(samples), bank.decimation):
+        taps_offsets: np.ndarray = np.arange(bank.filter_length)
+        inputs: np.ndarray = padded[position - taps_offsets + bank.filter_length - 1]
+        exponents: np.ndarray = np.exp(-2j * np.pi * np.outer(np.arange(bank.num_channels), position - taps_offsets) / bank.num_channels)
+        outputs.append(exponents @ (bank.taps * inputs))
+
+    return np.array(outputs).T
+
+
+@pytest.mark.parametrize("decimation", [None, 4]) # critically sampled and 2x oversampled
+def test_streaming_bank_matches_the_definition(decimation):
+    samples: np.ndarray = np.random.default_rng(11).standard_normal(400) + 1j * np.random.default_rng(12).standard_normal(400)
+    bank: AnalysisFilterBank = AnalysisFilterBank(8, decimation)
+
+    frames: list = []
+    boundaries: np.ndarray = np.cumsum([0, 3, 1, 29, 7, 60, 0, 100, 5, 195])
+    for start, end in zip(boundaries[:-1], boundaries[1:]): # irregular frames, some shorter than the decimation
+        frames.append(bank.process(samples[start:end]))
+
+    assert np.allclose(np.concatenate(frames, axis=-1), direct_channelizer(AnalysisFilterBank(8, decimation), samples), atol=1e-9)
+
+
+@pytest.mark.parametrize("channel", [0, 3, 6])
+def test_tone_at_a_channel_centre_lands_in_that_channel(channel):
+    num_channels, sps = 8, 8000
+    times: np.ndarray = np.arange(8192)
+    tone: np.ndarray = np.exp(2j * np.pi * channel * sps / num_channels * times / sps)
+
+    bank: AnalysisFilterBank = AnalysisFilterBank(num_channels)
+    channels: np.ndarray = np.concatenate([bank.process(tone[start:start + 100]) for start in range(0, len(tone), 100)], axis=-1)[:, bank.taps_per_channel:] # past the filter fill
+    power: np.ndarray = np.mean(np.abs(channels) ** 2, axis=-1)
+
+    assert np.argmax(power) == channel
+    assert np.allclose(np.abs(channels[channel]), 1, atol=1e-2) # unity gain at the channel centre
+    assert np.all(np.delete(power, channel) < 1e-3 * power[channel])
+
+
+def test_narrowband_channels_survive_analysis_and_synthesis():
+    num_channels: int = 8
+    times: np.ndarray = np.arange(4096)
+    tone: np.ndarray = np.exp(2j * np.pi * (2 / num_channels + 0.002) * times) # inside channel 2, close to its centre
+
+    analysis: AnalysisFilterBank = AnalysisFilterBank(num_channels, num_channels // 2)
+    synthesis: SynthesisFilterBank = SynthesisFilterBank(num_channels, num_channels // 2)
+    rebuilt: np.ndarray = synthesis.process(analysis.process(tone))
+
+    delay: int = analysis.filter_length # through both banks a signal lags by the prototype length
+    steady: slice = slice(2 * delay, len(tone))
+    assert np.allclose(rebuilt[steady], tone[steady.start - delay:len(tone) - delay], atol=0.05)
+
+
+def test_channel_count_and_decimation_are_checked():
+    with pytest.raises(ValueError):
+        AnalysisFilterBank(6)
+    with pytest.raises(ValueError):
+        AnalysisFilterBank(8, 3)
@@ -0,0 +1,36 @@
+import numpy as np
+import pytest
+from fm_prototype.convolution import OverlapSaveConvolver, windowed_sinc_lowpass
+
+
+@pytest.mark.parametrize("direct_threshold", [None, 0, 1 << 20])
+def test_streaming_matches_full_convolution(direct_threshold):
+    generator: np.random.Generator = np.random.default_rng(0)
+    kernel: np.ndarray = generator.standard_normal(301)
+    values: np.ndarray = generator.standard_normal((2, 6000))
+
+    convolver: OverlapSaveConvolver = OverlapSaveConvolver(kernel, direct_threshold)
+    streamed: np.ndarray = np.concatenate([convolver.process(values[:, start:start + 1500]) for start in range(0, 6000, 1500)], axis=-1)
+    expected: np.ndarray = np.stack([np.convolve(row, kernel)[:6000] for row in values])
+
+    assert np.allclose(streamed, expected)
+
+
+def test_empty_frames_pass_through_without_touching_history():
+    kernel: np.ndarray = windowed_sinc_lowpass(5, 0.2, 1.0)
+    values: np.ndarray = np.arange(8.0)
+
+    reference: OverlapSaveConvolver = OverlapSaveConvolver(kernel)
+    convolver: OverlapSaveConvolver = OverlapSaveConvolver(kernel)
+    convolver.process(values[:4])
+
+    assert convolver.process(np.zeros(0)).shape == (0,)
+    assert convolver.process(np.zeros((2, 0))).shape == (2, 0)
+    assert np.allclose(convolver.process(values[4:]), reference.process(values)[4:])
+
+
+def test_cost_estimate_keeps_mid_length_kernels_direct():
+    assert OverlapSaveConvolver(np.ones(255)).prefers_direct(1024)
+    assert OverlapSaveConvolver(np.ones(1023)).prefers_direct(1024)
+    assert not OverlapSaveConvolver(np.ones(4095)).prefers_direct(16384)
+    assert not OverlapSaveConvolver(np.ones(255), direct_threshold=64).prefers_direct(1024) # a threshold pins the path
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from fm_prototype.fft import FFTPlan, get_fft_plan
+
+
+SIZES: list[int] = [2, 8, 64, 1024]
+
+
+def random_frames(size: int, complex_values: bool = True) -> np.ndarray: # (3, size), the plans transform along the last axis
+    generator: np.random.Generator = np.random.default_rng(size)
+    values: np.ndarray = generator.standard_normal((3, size))
+
+    return values + 1j * generator.standard_normal((3, size)) if complex_values else values
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_forward_and_inverse_match_numpy(size):
+    values: np.ndarray = random_frames(size)
+    plan: FFTPlan = get_fft_plan(size)
+
+    assert np.allclose(plan.forward(values), np.fft.fft(values), atol=1e-9)
+    assert np.allclose(plan.inverse(values), np.fft.ifft(values), atol=1e-9)
+    assert np.allclose(plan.inverse(values, scale=False), np.fft.ifft(values) * size, atol=1e-9)
+
+
+@pytest.mark.parametrize("size", SIZES)
+def test_real_transforms_match_numpy(size):
+    values: np.ndarray = random_frames(size, complex_values=False)
+    plan: FFTPlan = get_fft_plan(size)
+    bins: np.ndarray = plan.rfft(values)
+
+    assert np.allclose(bins, np.fft.rfft(values), atol=1e-9)
+    assert np.allclose(plan.irfft(bins), values, atol=1e-9)
+    assert np.allclose(plan.irfft(np.fft.rfft(values)), np.fft.irfft(np.fft.rfft(values), size), atol=1e-9)
+
+
+def test_single_precision_plan_stays_single_precision():
+    values: np.ndarray = random_frames(256).astype(np.complex64)
+    bins: np.ndarray = get_fft_plan(256, np.complex64).forward(values)
+
+    assert bins.dtype == np.complex64
+    assert np.allclose(bins, np.fft.fft(values), atol=1e-3)
+
+
+def test_plans_are_cached_and_checked():
+    assert get_fft_plan(32) is get_fft_plan(32)
+    assert get_fft_plan(32) is not get_fft_plan(32, np.complex64)
+    with pytest.raises(ValueError):
+        FFTPlan(12)
+    with pytest.raises(ValueError, match="Expected 8 samples"):
+        get_fft_plan(8).forward(np.zeros(4))
@@ -0,0 +1,35 @@
+import numpy as np
+from fm_prototype.fm_pipeline import FMModulatorStep, HilbertStep, FMDemodulatorStep
+
+
+SPS: int = 48000
+
+
+def message(num_samples: int) -> np.ndarray:
+    return 0.8 * np.sin(2 * np.pi * 5 * np.arange(num_samples) / SPS)
+
+
+def test_modulator_hilbert_demodulator_round_trip_recovers_the_message():
+    num_taps: int = 255
+    modulator: FMModulatorStep = FMModulatorStep(SPS, SPS / 4, SPS / 8)
+    hilbert: HilbertStep = HilbertStep(num_taps)
+    demodulator: FMDemodulatorStep = FMDemodulatorStep(SPS, SPS / 4, SPS / 8)
+
+    sent: np.ndarray = message(SPS)
+    received: np.ndarray = np.concatenate([demodulator.computation(hilbert.computation(modulator.computation(sent[start:start + 480]))) for start in range(0, SPS, 480)])
+
+    delay: int = num_taps // 2 + 1 # hilbert group delay, plus the sample the discriminator needs before its first phase step
+    error: np.ndarray = received[delay:] - sent[:len(sent) - delay]
+    assert np.abs(error[2 * num_taps:]).max() < 1e-4
+
+
+def test_frames_give_the_same_output_as_one_block():
+    times: np.ndarray = np.arange(2000)
+    baseband: np.ndarray = np.exp(2j * np.pi * np.cumsum(100 + 50 * np.sin(2 * np.pi * times / 500)) / SPS)
+
+    whole: np.ndarray = FMDemodulatorStep(SPS, 6000, 3000, input_frequency=0).computation(baseband)
+    demodulator: FMDemodulatorStep = FMDemodulatorStep(SPS, 6000, 3000, input_frequency=0)
+    framed: np.ndarray = np.concatenate([demodulator.computation(baseband[start:start + 37]) for start in range(0, len(baseband), 37)])
+
+    assert np.allclose(framed, whole)
+    assert np.allclose(whole[1:], (100 + 50 * np.sin(2 * np.pi * times[1:] / 500)) / 0.5) # frequency offset over the modulation index
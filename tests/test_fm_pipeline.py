@@ -0,0 +1,318 @@
+import threading
+import numpy as np
+import pytest
+from fm_prototype import fm_pipeline
+from fm_prototype.fm_pipeline import Pipeline, DSPTimeSync, FrameBuffer, BufferClosedError, DecimatorStep, ChannelizerStep, FMDemodulatorStep, GainStep, FusedStep, HilbertStep, SlidingDFTStep, DFTStep, IQCombineStep, MixerStep, FIRFilterStep, FMModulatorStep
+from fm_prototype.pcm_io import PCMFileSource, WAVFileSource, WAVFileSink
+from fm_prototype.generate_signal import SignalSource, MultitoneGenerator, ChannelStackGenerator
+from fm_prototype.convolution import windowed_sinc_lowpass
+
+
+def run_to_end(pipeline: Pipeline, orchestrator, timeout: float = 10.0) -> None: # wait() in a thread so a hang fails the test instead of stalling the run
+    pipeline.run(orchestrator)
+    waiter: threading.Thread = threading.Thread(target=pipeline.wait, daemon=True)
+    waiter.start()
+    waiter.join(timeout)
+    hung: bool = waiter.is_alive()
+    pipeline.end()
+    assert not hung, "Pipeline.wait() did not return"
+
+
+@pytest.fixture
+def pcm_file(tmp_path):
+    path = tmp_path / "ramp.raw"
+    samples: np.ndarray = (np.arange(1000) * 7 % 30000).astype(np.int16)
+    samples.tofile(path)
+
+    return str(path), samples / 32768.0
+
+
+def test_frame_buffer_first_pull_waits_for_push():
+    buffer: FrameBuffer = FrameBuffer(4, 1000)
+    pulled: list = []
+    puller: threading.Thread = threading.Thread(target=lambda: pulled.append(buffer.pull()))
+    puller.start()
+
+    buffer.push(np.arange(4.0))
+    puller.join(5)
+    buffer.close()
+
+    assert np.array_equal(pulled[0], np.arange(4.0))
+    with pytest.raises(BufferClosedError):
+        buffer.pull()
+
+
+def test_block_mode_output_length_matches_input(pcm_file):
+    path, expected = pcm_file
+    frames: list = []
+    pipeline: Pipeline = Pipeline(PCMFileSource(path, 100), frames.append, DSPTimeSync(1000), 8, 1, frame_size=100)
+    pipeline.add_element(fm_pipeline.TestPipelineStep())
+    pipeline.add_element(fm_pipeline.TestPipelineStep())
+    run_to_end(pipeline, fm_pipeline.TestThreadOrchestrator())
+
+    assert np.allclose(np.concatenate(frames), 4 * expected) # each test step doubles
+
+
+def test_block_mode_clocks_count_real_samples(pcm_file):
+    path, expected = pcm_file
+    frames: list = []
+    pipeline: Pipeline = Pipeline(PCMFileSource(path, 100), frames.append, DSPTimeSync(1000), 8, 1, frame_size=100)
+    pipeline.add_element(fm_pipeline.TestPipelineStep())
+    pipeline.add_element(DecimatorStep(2))
+    run_to_end(pipeline, fm_pipeline.TestThreadOrchestrator())
+
+    assert pipeline.time_sync.elapsed_samples() == len(expected)
+    assert pipeline.sink_time_sync.elapsed_samples() == sum(len(frame) for frame in frames) == len(expected) // 2
+
+
+def test_wait_returns_on_lock_pair_buffers_in_sample_mode():
+    samples: iter = iter(range(1, 51))
+    outputs: list = []
+
+    def source() -> float:
+        try:
+            return float(next(samples))
+        except StopIteration:
+            raise EOFError
+
+    pipeline: Pipeline = Pipeline(source, outputs.append, DSPTimeSync(1000), 4, 1)
+    pipeline.add_element(fm_pipeline.TestPipelineStep())
+    run_to_end(pipeline, fm_pipeline.TestThreadOrchestrator())
+
+    delivered: list = [value for value in outputs if value] # sample mode is a delay line, zeros lead and the tail stays in the buffers
+    assert delivered == [2.0 * value for value in range(1, len(delivered) + 1)]
+    assert len(delivered) > 0
+
+
+def test_wait_returns_on_lock_pair_buffers_for_a_wav_round_trip(pcm_file, tmp_path):
+    path, expected = pcm_file
+    wav_path: str = str(tmp_path / "ramp.wav")
+    writer: WAVFileSink = WAVFileSink(wav_path, 1000)
+    writer(expected)
+    writer.close()
+
+    copy_path: str = str(tmp_path / "copy.wav")
+    sink: WAVFileSink = WAVFileSink(copy_path, 1000)
+    pipeline: Pipeline = Pipeline(WAVFileSource(wav_path, 128), sink, DSPTimeSync(1000), 8, 1, frame_size=128)
+    pipeline.add_element(fm_pipeline.TestPipelineStep())
+    run_to_end(pipeline, fm_pipeline.TestThreadOrchestrator())
+    sink.close()
+
+    copied: WAVFileSource = WAVFileSource(copy_path, len(expected))
+    assert np.allclose(copied(), 2 * expected, atol=1 / 32768)
+
+
+def test_channelizer_feeds_demodulator_with_frames_shorter_than_its_decimation():
+    tone: np.ndarray = np.exp(2j * np.pi * 100 * np.arange(600) / 8000)
+    frames: iter = iter(np.split(tone, 200)) # 3 samples a frame, the channelizer needs 4 for an output
+    outputs: list = []
+
+    def source() -> np.ndarray:
+        try:
+            return next(frames)
+        except StopIteration:
+            raise EOFError
+
+    pipeline: Pipeline = Pipeline(source, outputs.append, DSPTimeSync(8000), 4, 1, frame_size=3)
+    pipeline.add_element(ChannelizerStep(4))
+    pipeline.add_element(FMDemodulatorStep(2000, 1, 500, input_frequency=0))
+    run_to_end(pipeline, fm_pipeline.TestThreadOrchestrator())
+
+    assert outputs and all(np.shape(frame)[-1] > 0 for frame in outputs)
+    assert sum(np.shape(frame)[-1] for frame in outputs) == len(tone) // 4
+
+
+def run_gain_chain(source, fuse_steps: bool, frame_size: int = 0) -> tuple[Pipeline, list]:
+    outputs: list = []
+    pipeline: Pipeline = Pipeline(source, outputs.append, DSPTimeSync(1000), 4, 1, frame_size=frame_size, fuse_steps=fuse_steps)
+    pipeline.add_element(fm_pipeline.TestPipelineStep())
+    pipeline.add_element(GainStep(3.0))
+    run_to_end(pipeline, fm_pipeline.TestThreadOrchestrator())
+
+    return pipeline, outputs
+
+
+def test_fusion_is_opt_in_and_keeps_block_mode_output(pcm_file):
+    path, expected = pcm_file
+    unfused, unfused_frames = run_gain_chain(PCMFileSource(path, 100), False, 100)
+    fused, fused_frames = run_gain_chain(PCMFileSource(path, 100), True, 100)
+
+    assert not any(isinstance(step, FusedStep) for step in unfused.function_pool)
+    assert any(isinstance(step, FusedStep) for step in fused.function_pool)
+    assert np.array_equal(np.concatenate(fused_frames), np.concatenate(unfused_frames))
+    assert np.allclose(np.concatenate(fused_frames), 6 * expected)
+
+
+def test_fusion_in_sample_mode_drops_a_delay_line():
+    def counting_source() -> callable:
+        samples: iter = iter(range(1, 51))
+        def source() -> float:
+            try:
+                return float(next(samples))
+            except StopIteration:
+                raise EOFError
+        return source
+
+    _, unfused = run_gain_chain(counting_source(), False)
+    _, fused = run_gain_chain(counting_source(), True)
+
+    first_unfused: int = next(index for index, value in enumerate(unfused) if value)
+    first_fused: int = next(index for index, value in enumerate(fused) if value)
+    assert first_fused < first_unfused # same samples, they just reach the sink sooner
+    assert [value for value in fused if value][:10] == [value for value in unfused if value][:10] == [6.0 * value for value in range(1, 11)]
+
+
+@pytest.mark.filterwarnings("error") # a complex to real cast would warn, in the step thread that fails the run
+def test_sample_mode_keeps_complex_samples():
+    tone: iter = iter(np.cos(2 * np.pi * 50 * np.arange(400) / 1000))
+    outputs: list = []
+
+    def source() -> float:
+        try:
+            return float(next(tone))
+        except StopIteration:
+            raise EOFError
+
+    pipeline: Pipeline = Pipeline(source, outputs.append, DSPTimeSync(1000), 4, 1)
+    pipeline.add_element(HilbertStep(31))
+    run_to_end(pipeline, fm_pipeline.TestThreadOrchestrator())
+
+    steady: np.ndarray = np.asarray(outputs[100:300])
+    assert np.iscomplexobj(steady)
+    assert np.allclose(np.abs(steady), 1, atol=0.15) # analytic signal of a unit cosine, the imaginary part carries the quadrature half
+
+
+class FailingStep(fm_pipeline.AbstractPipelineStep): # fails on the third frame
+    def __init__(self):
+        super().__init__()
+        self.frames: int = 0
+
+    def computation(self, value: np.ndarray) -> np.ndarray:
+        self.frames += 1
+        if self.frames == 3:
+            raise RuntimeError("step failed")
+
+        return value
+
+
+@pytest.mark.parametrize("orchestrator, ring_capacity", [(fm_pipeline.TestThreadOrchestrator, 0), (fm_pipeline.ParallelThreadOrchestrator, 4)])
+def test_failing_step_stops_the_pipeline_and_raises_from_wait(orchestrator, ring_capacity):
+    pipeline: Pipeline = Pipeline(lambda: np.ones(16), lambda frame: None, DSPTimeSync(1000), 4, 2, frame_size=16, ring_capacity=ring_capacity)
+    pipeline.add_element(fm_pipeline.TestPipelineStep())
+    pipeline.add_element(FailingStep())
+    pipeline.add_element(fm_pipeline.TestPipelineStep())
+    pipeline.run(orchestrator())
+
+    errors: list = []
+    def wait() -> None:
+        try:
+            pipeline.wait()
+        except RuntimeError as error:
+            errors.append(error)
+
+    waiter: threading.Thread = threading.Thread(target=wait, daemon=True)
+    waiter.start()
+    waiter.join(10)
+    assert not waiter.is_alive(), "Pipeline.wait() did not return"
+    assert str(errors[0]) == "step failed"
+    with pytest.raises(RuntimeError, match="step failed"):
+        pipeline.end()
+
+
+@pytest.mark.parametrize("num_bins, bins", [(16, None), (12, [0, 3, 5])]) # fft plan and dft matrix re-anchors
+@pytest.mark.parametrize("reanchor_interval", [None, 10 ** 6])
+def test_sliding_dft_matches_an_fft_of_the_window(num_bins, bins, reanchor_interval):
+    samples: np.ndarray = np.random.default_rng(3).standard_normal(400) + 1j * np.random.default_rng(4).standard_normal(400)
+    step: SlidingDFTStep = SlidingDFTStep(num_bins, bins, reanchor_interval)
+    selected: np.ndarray = np.arange(num_bins) if bins is None else np.asarray(bins)
+
+    end: int = 0
+    for length in [1, 3, 7, num_bins - 1, num_bins, 2 * num_bins + 1, 5, 0] * 4:
+        spectrum: np.ndarray = step.computation(samples[end:end + length])
+        end += length
+
+        window: np.ndarray = np.concatenate([np.zeros(num_bins), samples[:end]])[-num_bins:]
+        assert np.allclose(spectrum, np.fft.fft(window)[selected], atol=1e-9)
+
+
+def test_sliding_dft_is_rejected_in_sample_mode():
+    pipeline: Pipeline = Pipeline(lambda: 0.0, lambda value: None, DSPTimeSync(1000), 16, 1)
+    with pytest.raises(ValueError, match="block mode"):
+        pipeline.add_element(SlidingDFTStep(16))
+
+
+def test_sample_mode_dft_needs_a_long_enough_history():
+    pipeline: Pipeline = Pipeline(lambda: 0.0, lambda value: None, DSPTimeSync(1000), 4, 1)
+    with pytest.raises(ValueError, match="buffer_length"):
+        pipeline.add_element(DFTStep(8))
+
+
+@pytest.mark.parametrize("orchestrator, ring_capacity", [(fm_pipeline.TestThreadOrchestrator, 0), (fm_pipeline.ParallelThreadOrchestrator, 4)])
+def test_fan_out_merge_and_extra_sink(pcm_file, orchestrator, ring_capacity):
+    path, expected = pcm_file
+    outputs: list = []
+    tapped: list = []
+    pipeline: Pipeline = Pipeline(PCMFileSource(path, 100), outputs.append, DSPTimeSync(1000), 4, 2, frame_size=100, ring_capacity=ring_capacity)
+    in_phase: fm_pipeline.TestPipelineStep = fm_pipeline.TestPipelineStep()
+    pipeline.add_element(in_phase, [Pipeline.SOURCE])
+    quadrature: GainStep = GainStep(3.0)
+    pipeline.add_element(quadrature, [Pipeline.SOURCE])
+    pipeline.add_element(IQCombineStep(), [in_phase, quadrature])
+    pipeline.add_sink(in_phase, tapped.append)
+    run_to_end(pipeline, orchestrator())
+
+    assert np.allclose(np.concatenate(outputs), 2 * expected + 3j * expected)
+    assert np.allclose(np.concatenate(tapped), 2 * expected)
+    assert all(not frame.flags.writeable for frame in tapped) # branches share one read only frame
+
+
+def test_more_than_one_leaf_needs_add_sink():
+    pipeline: Pipeline = Pipeline(lambda: np.zeros(8), lambda frame: None, DSPTimeSync(1000), 4, 1, frame_size=8)
+    first: GainStep = GainStep(2.0)
+    pipeline.add_element(first)
+    pipeline.add_element(GainStep(3.0), [first])
+    pipeline.add_element(MixerStep(), [first, Pipeline.SOURCE])
+    pipeline.add_element(GainStep(4.0), [first])
+
+    with pytest.raises(ValueError, match="add_sink"):
+        pipeline.run(fm_pipeline.TestThreadOrchestrator())
+
+
+def multi_channel_steps(gain, carrier, deviation) -> list:
+    return [GainStep(gain), FIRFilterStep(windowed_sinc_lowpass(31, 2000, 8000)), FMModulatorStep(8000, carrier, deviation), HilbertStep(31), DecimatorStep(2)]
+
+
+def test_every_channel_matches_its_own_single_channel_run():
+    generators: list = [MultitoneGenerator(8000, [300]), MultitoneGenerator(8000, [700, 1100])]
+    gains, carriers, deviations = [0.5, 2.0], [1000.0, 1500.0], [200.0, 500.0]
+
+    outputs: list = []
+    pipeline: Pipeline = Pipeline(SignalSource(ChannelStackGenerator(generators), 64, 64 * 20), outputs.append, DSPTimeSync(8000), 4, 1, frame_size=64, channels=2)
+    for step in multi_channel_steps(gains, carriers, deviations):
+        pipeline.add_element(step)
+    run_to_end(pipeline, fm_pipeline.TestThreadOrchestrator())
+    batched: np.ndarray = np.concatenate(outputs, axis=-1)
+
+    assert batched.shape == (2, 64 * 20 // 2)
+    assert pipeline.sink_time_sync.elapsed_samples() == 64 * 20 // 2 # clocks count samples along time, not across channels
+    for channel, generator in enumerate(generators):
+        steps: list = multi_channel_steps(gains[channel], carriers[channel], deviations[channel])
+        frames: list = []
+        for start in range(0, 64 * 20, 64):
+            value: np.ndarray = generator.generate(start, 64)
+            for step in steps:
+                value = step.computation(value)
+            frames.append(value)
+
+        assert np.allclose(batched[channel], np.concatenate(frames), atol=1e-9)
+
+
+def test_multi_channel_sources_are_shape_checked():
+    pipeline: Pipeline = Pipeline(lambda: np.zeros(64), lambda frame: None, DSPTimeSync(8000), 4, 1, frame_size=64, channels=2)
+    pipeline.add_element(GainStep(1.0))
+    pipeline.run(fm_pipeline.TestThreadOrchestrator())
+
+    with pytest.raises(ValueError, match="shaped"):
+        pipeline.wait()
+    with pytest.raises(ValueError):
+        Pipeline(lambda: 0.0, print, DSPTimeSync(8000), 4, 1, channels=2)
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from fm_prototype.generate_signal import SignalGenerator, MultitoneGenerator, SignalSource
+
+
+def test_signal_generator_is_abstract():
+    with pytest.raises(TypeError):
+        SignalGenerator(1000)
+
+
+def test_frames_are_seekable():
+    generator: MultitoneGenerator = MultitoneGenerator(8000, [440, 1000])
+    whole: np.ndarray = generator.generate(0, 400)
+
+    assert np.allclose(generator.generate(150, 100), whole[150:250])
+
+
+def test_finite_source_ends_with_eof():
+    source: SignalSource = SignalSource(MultitoneGenerator(8000, [440]), 100, 250)
+    lengths: list = [len(source()) for x in range(3)]
+
+    assert sum(lengths) == 250
+    with pytest.raises(EOFError):
+        source()
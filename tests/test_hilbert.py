@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from fm_prototype.fm_pipeline import HilbertStep
+from fm_prototype.hilbert import analytic_fir_taps, hilbert_fir_taps
+
+
+def run_in_frames(step: HilbertStep, samples: np.ndarray, frame_sizes: list[int]) -> np.ndarray:
+    frames: list = []
+    start: int = 0
+    while start < len(samples):
+        for frame_size in frame_sizes:
+            frames.append(step.computation(samples[start:start + frame_size]))
+            start += frame_size
+
+    return np.concatenate(frames)
+
+
+def test_streaming_output_matches_one_convolution():
+    samples: np.ndarray = np.random.default_rng(7).standard_normal(3000)
+    analytic: np.ndarray = run_in_frames(HilbertStep(63), samples, [1, 64, 513, 7])[:len(samples)]
+
+    assert np.allclose(analytic, np.convolve(samples, analytic_fir_taps(63))[:len(samples)], atol=1e-9)
+
+
+def test_tone_becomes_its_delayed_analytic_signal():
+    num_taps: int = 127
+    times: np.ndarray = np.arange(4096)
+    tone: np.ndarray = np.cos(2 * np.pi * 0.05 * times)
+    analytic: np.ndarray = HilbertStep(num_taps).computation(tone)
+
+    delay: int = num_taps // 2
+    steady: slice = slice(num_taps, len(tone))
+    expected: np.ndarray = np.exp(2j * np.pi * 0.05 * (times - delay))
+    assert np.allclose(analytic.real[steady], tone[:len(tone) - delay][num_taps - delay:], atol=1e-12) # the centre tap passes the input through, delayed
+    assert np.allclose(analytic[steady], expected[steady], atol=2e-3)
+
+
+def test_matches_scipy_hilbert_away_from_the_edges():
+    signal = pytest.importorskip("scipy.signal")
+    num_taps: int = 255
+    times: np.ndarray = np.arange(8192)
+    samples: np.ndarray = np.cos(2 * np.pi * 246 / 8192 * times) + 0.5 * np.cos(2 * np.pi * 1720 / 8192 * times + 1) # whole periods, so scipy's circular transform has no edge error
+
+    delay: int = num_taps // 2
+    analytic: np.ndarray = HilbertStep(num_taps).computation(samples)[delay:]
+    reference: np.ndarray = signal.hilbert(samples)[:len(analytic)]
+
+    interior: slice = slice(num_taps, len(analytic) - num_taps)
+    assert np.allclose(analytic[interior], reference[interior], atol=5e-3)
+
+
+def test_taps_are_odd_symmetric_and_checked():
+    taps: np.ndarray = hilbert_fir_taps(31)
+    assert np.allclose(taps, -taps[::-1])
+    assert np.all(taps[1::2] == 0) # even offsets from the centre are zero
+
+    for num_taps in (2, 30):
+        with pytest.raises(ValueError):
+            hilbert_fir_taps(num_taps)
@@ -0,0 +1,29 @@
+from time import sleep
+import numpy as np
+import pytest
+from fm_prototype import fm_pipeline
+from fm_prototype.fm_pipeline import Pipeline, DSPTimeSync, AbstractPipelineStep, GainStep, ParallelThreadOrchestrator
+from fm_prototype.generate_signal import MultitoneGenerator, SignalSource
+
+
+class SlowStep(AbstractPipelineStep):
+    def computation(self, value: np.ndarray) -> np.ndarray:
+        sleep(0.01)
+        return value
+
+
+@pytest.mark.parametrize("orchestrator", [fm_pipeline.TestThreadOrchestrator, ParallelThreadOrchestrator])
+def test_stage_after_a_slow_step_is_charged_blocked_input(orchestrator):
+    outputs: list = []
+    pipeline: Pipeline = Pipeline(SignalSource(MultitoneGenerator(8000, [100]), 80, 80 * 20), outputs.append, DSPTimeSync(8000), 4, 2, frame_size=80, ring_capacity=4, fuse_steps=False)
+    pipeline.add_element(SlowStep())
+    pipeline.add_element(GainStep(2))
+    pipeline.enable_metrics()
+    pipeline.run(orchestrator())
+    pipeline.wait()
+    pipeline.end()
+
+    stages: dict = pipeline.get_metrics()["stages"]
+    assert len(outputs) == 20
+    assert stages["1:GainStep"]["blocked_input_s"] > 0.1 # 20 frames at 10 ms each, nearly all of it waiting on the slow step
+    assert stages["0:SlowStep"]["blocked_input_s"] < stages["1:GainStep"]["blocked_input_s"]
@@ -0,0 +1,55 @@
+import numpy as np
+from fm_prototype.nco import NumericallyControlledOscillator, PHASE_MODULO, frequency_to_increment
+
+
+SPS: int = 48000
+
+
+def exact_sine(words: np.ndarray) -> np.ndarray:
+    return np.sin(2 * np.pi * np.asarray(words, dtype=float) / PHASE_MODULO)
+
+
+def test_phase_does_not_drift_over_long_runs():
+    oscillator: NumericallyControlledOscillator = NumericallyControlledOscillator(SPS, 1234.5678)
+    increment: int = frequency_to_increment(1234.5678, SPS)
+
+    frame_size: int = 48000
+    for x in range(600): # ten minutes of samples
+        oscillator.advance(frame_size)
+
+    num_samples: int = 600 * frame_size
+    assert oscillator.phase == num_samples * increment % PHASE_MODULO # modular arithmetic, no rounding anywhere
+
+    words: np.ndarray = (num_samples + np.arange(64)) * increment % PHASE_MODULO
+    assert np.allclose(oscillator.sine(64), exact_sine(words), atol=1e-6)
+
+
+def test_interpolated_table_error_is_small():
+    oscillator: NumericallyControlledOscillator = NumericallyControlledOscillator(SPS, 997.0)
+    words: np.ndarray = np.arange(20000) * frequency_to_increment(997.0, SPS) % PHASE_MODULO
+
+    assert np.abs(oscillator.sine(20000) - exact_sine(words)).max() < 1e-6
+    oscillator.reset()
+    oscillator.interpolate = False
+    assert np.abs(oscillator.sine(20000) - exact_sine(words)).max() < 2 * np.pi / oscillator.table_size
+
+
+def test_frequency_offsets_integrate_into_the_phase():
+    offsets: np.ndarray = np.random.default_rng(9).uniform(-500, 500, 10000)
+    oscillator: NumericallyControlledOscillator = NumericallyControlledOscillator(SPS, 3000.0)
+    phases: np.ndarray = oscillator.advance(len(offsets), offsets)
+
+    increments: np.ndarray = frequency_to_increment(3000.0, SPS) + np.rint(offsets * (PHASE_MODULO / SPS)).astype(np.int64)
+    expected: np.ndarray = np.concatenate([[0], np.cumsum(increments[:-1])]) % PHASE_MODULO
+    assert np.array_equal(phases.astype(np.int64), expected)
+
+
+def test_quadrature_outputs_and_channels():
+    oscillator: NumericallyControlledOscillator = NumericallyControlledOscillator(SPS, [1000.0, 2000.0])
+    iq: np.ndarray = oscillator.complex_exponential(256)
+    assert iq.shape == (2, 256)
+    assert np.allclose(np.abs(iq), 1, atol=1e-6)
+
+    for channel, frequency in enumerate([1000.0, 2000.0]):
+        single: NumericallyControlledOscillator = NumericallyControlledOscillator(SPS, frequency)
+        assert np.allclose(iq[channel], single.complex_exponential(256))
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+from fm_prototype.fm_pipeline import DecimatorStep, InterpolatorStep, ResamplerStep, HilbertStep, FMModulatorStep, FMDemodulatorStep
+from fm_prototype.numeric import FLOAT64, FLOAT32, Q15, NumericMode
+
+MODES: list[NumericMode] = [FLOAT64, FLOAT32, Q15]
+REAL_DTYPES: dict[str, np.dtype] = {"float64": np.float64, "float32": np.float32, "q15": np.int16}
+COMPLEX_DTYPES: dict[str, np.dtype] = {"float64": np.complex128, "float32": np.complex64, "q15": np.complex64}
+
+
+def run(step, mode: NumericMode, frames: list[np.ndarray]) -> list[np.ndarray]:
+    step.set_numeric_mode(mode)
+    return [step.computation(mode.to_frame(frame)) for frame in frames]
+
+
+@pytest.mark.parametrize("mode", MODES, ids=lambda mode: mode.name)
+@pytest.mark.parametrize("factory", [lambda: DecimatorStep(2), lambda: InterpolatorStep(3), lambda: ResamplerStep(3, 2)], ids=["decimator", "interpolator", "resampler"])
+def test_resamplers_keep_the_mode_and_the_level(factory, mode):
+    outputs: list[np.ndarray] = run(factory(), mode, [np.full(256, 0.5)] * 3)
+
+    assert all(output.dtype == REAL_DTYPES[mode.name] for output in outputs)
+    assert np.allclose(mode.from_frame(outputs[-1]), 0.5, atol=1e-3) # dc passes at unity gain once the filter has settled
+
+
+@pytest.mark.parametrize("mode", MODES, ids=lambda mode: mode.name)
+def test_hilbert_step_keeps_the_mode_and_the_level(mode):
+    tone: np.ndarray = 0.5 * np.cos(2 * np.pi * 0.05 * np.arange(1024))
+    outputs: list[np.ndarray] = run(HilbertStep(), mode, [tone[:512], tone[512:]])
+
+    assert all(output.dtype == COMPLEX_DTYPES[mode.name] for output in outputs)
+    assert np.allclose(np.abs(mode.from_frame(outputs[-1])), 0.5, atol=5e-3) # analytic signal of a tone has constant magnitude
+
+
+@pytest.mark.parametrize("mode", MODES, ids=lambda mode: mode.name)
+def test_fm_demodulator_keeps_the_mode_and_recovers_the_message(mode):
+    sps, modulation_index = 48000, 6000 # frequency offset is modulation_index * message hz
+    message: np.ndarray = 0.5 * np.sin(2 * np.pi * 300 * np.arange(2048) / sps)
+    baseband: np.ndarray = 0.9 * np.exp(2j * np.pi * np.cumsum(modulation_index * message) / sps)
+
+    demodulator: FMDemodulatorStep = FMDemodulatorStep(sps, 1, modulation_index, input_frequency=0)
+    outputs: list[np.ndarray] = run(demodulator, mode, [baseband[:1024], baseband[1024:]])
+
+    assert all(output.dtype == REAL_DTYPES[mode.name] for output in outputs)
+    assert np.allclose(mode.from_frame(outputs[-1]), message[1024:], atol=1e-3)
+
+
+def test_q15_modulator_interpolates_between_its_quantized_table_entries():
+    modulator: FMModulatorStep = FMModulatorStep(8000, 1000, 500, table_bits=4)
+    modulator.set_numeric_mode(Q15)
+    oscillator = modulator.oscillator
+    table: np.ndarray = oscillator.sine_table
+
+    assert np.array_equal(table, Q15.quantize(table))
+    indices: np.ndarray = np.arange(oscillator.table_size, dtype=np.int64)
+    midpoints: np.ndarray = oscillator.lookup((indices << oscillator.fraction_bits) + (1 << (oscillator.fraction_bits - 1)))
+    assert np.allclose(midpoints, (table[:-1] + table[1:]) / 2, rtol=0, atol=1e-12) # halfway between the stored q15 points, not the float ones
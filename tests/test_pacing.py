@@ -0,0 +1,76 @@
+from time import perf_counter
+import pytest
+from fm_prototype.dsp_sync import DSPTimeSync
+from fm_prototype.pacing import FramePacer
+
+
+def test_clock_counts_samples_without_drift():
+    clock: DSPTimeSync = DSPTimeSync(48000, start_time=0.5)
+    assert clock.sample == clock.seconds_to_samples(0.5) == 24000
+
+    for x in range(3600):
+        clock.increment_time(48000)
+
+    assert clock.elapsed_samples() == 48000 * 3600
+    assert clock.time == 3600.5 # no wraparound, no accumulated rounding
+    assert clock.samples_to_seconds(clock.seconds_to_samples(1.25)) == 1.25
+    assert clock.seconds_to_samples(1 / 3) == 16000
+
+
+def started_pacer(overrun_policy: str, latency: float = 0.002, recovery_frames: int = 16) -> FramePacer:
+    pacer: FramePacer = FramePacer(latency, overrun_policy, recovery_frames=recovery_frames)
+    pacer.start(DSPTimeSync(1000000), DSPTimeSync(1000000))
+
+    return pacer
+
+
+def make_late(pacer: FramePacer, seconds: float) -> None:
+    pacer.start_time = perf_counter() - seconds
+
+
+def test_drop_discards_late_frames():
+    pacer: FramePacer = started_pacer("drop")
+    assert pacer.admit(1)
+
+    make_late(pacer, 1.0)
+    assert not pacer.admit(1)
+    assert (pacer.late_frames, pacer.dropped_frames) == (1, 1)
+
+
+def test_skip_moves_the_schedule_and_the_source_ahead_by_the_lag():
+    pacer: FramePacer = started_pacer("skip")
+    make_late(pacer, 0.5)
+
+    assert pacer.admit(1)
+    skip: int = pacer.take_skip()
+    assert 480000 < skip < 500000 # about the 0.5 s lag minus the latency, in source samples
+    assert pacer.take_skip() == 0
+
+    pacer.record_skip(skip)
+    assert pacer.skipped_samples == skip
+    assert pacer.admit(1) # back on the shifted schedule
+    assert pacer.dropped_frames == 0
+
+
+def test_degrade_switches_steps_until_slack_recovers():
+    states: list = []
+    pacer: FramePacer = started_pacer("degrade", recovery_frames=2)
+    pacer.degrade_callback = states.append
+
+    make_late(pacer, 1.0)
+    assert pacer.admit(1)
+    assert pacer.degraded and states == [True]
+
+    for x in range(2):
+        pacer.start_time = perf_counter() # a full latency of slack every frame
+        assert pacer.admit(1)
+
+    assert not pacer.degraded and states == [True, False]
+    assert pacer.degrade_events == 1
+
+
+def test_invalid_settings_raise():
+    with pytest.raises(ValueError):
+        FramePacer(-1)
+    with pytest.raises(ValueError):
+        FramePacer(0.1, "rewind")
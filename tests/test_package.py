@@ -0,0 +1,52 @@
+import subprocess
+import sys
+from importlib import import_module
+from pathlib import Path
+
+import fm_prototype
+
+
+BLOCKED_IMPORT_SCRIPT: str = """
+import sys
+
+class BlockOptional: # makes scipy and matplotlib look uninstalled
+    def find_spec(self, name, path=None, target=None):
+        if name.split(".")[0] in ("scipy", "matplotlib"):
+            raise ModuleNotFoundError(f"No module named {name!r}")
+        return None
+
+sys.meta_path.insert(0, BlockOptional())
+
+import fm_prototype
+assert not [name for name in sys.modules if name.startswith("fm_prototype.")], "importing the package loaded submodules"
+
+from fm_prototype import FFTPlan, DSPTimeSync, Pipeline, HilbertStep, FIRFilterStep, WelchEstimator
+assert "fm_prototype.fft" in sys.modules and "fm_prototype.async_pipeline" not in sys.modules
+
+import numpy as np
+pipeline = Pipeline(lambda: np.zeros(64), lambda frame: None, DSPTimeSync(1000), 8, 1, frame_size=64)
+pipeline.add_element(HilbertStep(31))
+pipeline.add_element(FIRFilterStep(np.ones(4) / 4))
+assert FFTPlan(16).forward(np.ones(16))[0] == 16
+assert WelchEstimator(16, average_count=1).process(np.ones(32)).shape == (16, 3)
+assert not [name for name in sys.modules if name.startswith(("scipy", "matplotlib"))]
+try:
+    import scipy.signal
+except ModuleNotFoundError:
+    print("ok")
+"""
+
+
+def test_package_imports_lazily_without_scipy_or_matplotlib():
+    result: subprocess.CompletedProcess = subprocess.run([sys.executable, "-c", BLOCKED_IMPORT_SCRIPT], cwd=Path(__file__).resolve().parents[1],
+                                                         capture_output=True, text=True, timeout=60)
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "ok"
+
+
+def test_exported_names_resolve_to_their_modules():
+    for name, module in fm_prototype.EXPORTED_FROM.items():
+        assert getattr(fm_prototype, name) is getattr(import_module(f"fm_prototype.{module}"), name)
+
+    assert set(dir(fm_prototype)) >= set(fm_prototype.__all__)
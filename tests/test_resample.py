@@ -0,0 +1,46 @@
+import numpy as np
+import pytest
+from fm_prototype.resample import PolyphaseResampler
+from fm_prototype.fm_pipeline import ResamplerStep, DecimatorStep, InterpolatorStep
+
+
+def run_in_frames(resampler: PolyphaseResampler, samples: np.ndarray, frame_sizes: list[int]) -> np.ndarray:
+    frames: list = []
+    start: int = 0
+    while start < len(samples):
+        for frame_size in frame_sizes:
+            frames.append(resampler.process(samples[start:start + frame_size]))
+            start += frame_size
+
+    return np.concatenate(frames)
+
+
+@pytest.mark.parametrize("interpolation, decimation", [(1, 4), (3, 1), (3, 2), (2, 3), (160, 147)])
+def test_streaming_output_matches_upfirdn(interpolation, decimation):
+    signal = pytest.importorskip("scipy.signal")
+    samples: np.ndarray = np.random.default_rng(interpolation * 100 + decimation).standard_normal(2000)
+    resampler: PolyphaseResampler = PolyphaseResampler(interpolation, decimation)
+
+    streamed: np.ndarray = run_in_frames(resampler, samples, [1, 37, 256, 5, 0])
+    reference: np.ndarray = signal.upfirdn(resampler.taps, samples, interpolation, decimation)
+
+    assert len(streamed) == -(-len(samples) * interpolation // decimation)
+    assert np.allclose(streamed, reference[:len(streamed)], atol=1e-12)
+
+
+def test_ratio_is_reduced_and_channels_are_independent():
+    resampler: PolyphaseResampler = PolyphaseResampler(4, 6)
+    assert (resampler.interpolation, resampler.decimation) == (2, 3)
+
+    samples: np.ndarray = np.random.default_rng(1).standard_normal((2, 600))
+    both: np.ndarray = resampler.process(samples)
+    for channel in range(2):
+        assert np.allclose(both[channel], PolyphaseResampler(2, 3).process(samples[channel]))
+
+
+def test_steps_wrap_the_resampler():
+    assert (DecimatorStep(4).interpolation, DecimatorStep(4).decimation) == (1, 4)
+    assert (InterpolatorStep(3).interpolation, InterpolatorStep(3).decimation) == (3, 1)
+    assert (ResamplerStep(6, 4).interpolation, ResamplerStep(6, 4).decimation) == (3, 2)
+    with pytest.raises(ValueError):
+        PolyphaseResampler(0, 2)
@@ -0,0 +1,65 @@
+import threading
+import numpy as np
+import pytest
+from fm_prototype.fm_pipeline import RingBuffer, BufferClosedError
+
+
+def test_try_push_and_pull_keep_order():
+    ring: RingBuffer = RingBuffer(3, 4, 1000)
+    for index in range(3):
+        assert ring.try_push(np.full(4, index))
+    assert not ring.try_push(np.zeros(4))
+
+    assert [ring.try_pull()[0] for x in range(3)] == [0, 1, 2]
+    assert ring.try_pull() is None
+
+
+def test_watermarks_hold_producer_until_drained_to_low():
+    ring: RingBuffer = RingBuffer(8, 4, 1000, high_watermark=6, low_watermark=2)
+    pushed: int = 0
+    while ring.try_push(pushed):
+        pushed += 1
+    assert pushed == 6
+
+    for x in range(3):
+        ring.try_pull()
+        assert not ring.try_push(-1) # still above the low watermark
+    ring.try_pull()
+    assert ring.try_push(-1)
+
+
+def test_default_watermarks_only_block_when_full():
+    ring: RingBuffer = RingBuffer(2, 4, 1000)
+    ring.try_push(0)
+    ring.try_push(1)
+    assert not ring.try_push(2)
+    ring.try_pull()
+    assert ring.try_push(2)
+
+
+def test_invalid_watermarks_raise():
+    with pytest.raises(ValueError):
+        RingBuffer(4, 4, 1000, high_watermark=5)
+    with pytest.raises(ValueError):
+        RingBuffer(4, 4, 1000, high_watermark=2, low_watermark=2)
+
+
+def test_blocked_producer_wakes_at_low_watermark():
+    ring: RingBuffer = RingBuffer(4, 4, 1000, high_watermark=4, low_watermark=1)
+    for index in range(4):
+        ring.push(index)
+    producer: threading.Thread = threading.Thread(target=ring.push, args=(4,))
+    producer.start()
+
+    pulled: list = [ring.pull() for x in range(2)]
+    producer.join(0.1)
+    assert producer.is_alive() # occupancy 2 is above the low watermark
+    pulled.append(ring.pull())
+    producer.join(5)
+    assert not producer.is_alive()
+
+    ring.close()
+    pulled.extend(ring.pull() for x in range(2))
+    assert pulled == [0, 1, 2, 3, 4]
+    with pytest.raises(BufferClosedError):
+        ring.pull()
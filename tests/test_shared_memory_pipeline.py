@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+from fm_prototype import fm_pipeline
+from fm_prototype.fm_pipeline import Pipeline, DSPTimeSync, InterpolatorStep, SpectrumStep, AbstractPipelineStep
+from fm_prototype.generate_signal import SignalSource, MultitoneGenerator
+from fm_prototype.shared_memory_pipeline import ProcessPipelineOrchestrator
+
+
+FRAME_SIZE: int = 64
+FRAMES: int = 50
+
+
+class FailingStep(AbstractPipelineStep): # fails on the third frame
+    def __init__(self):
+        super().__init__()
+        self.frames: int = 0
+
+    def computation(self, value: np.ndarray) -> np.ndarray:
+        self.frames += 1
+        if self.frames == 3:
+            raise RuntimeError("step failed")
+
+        return value
+
+
+def build(outputs: list, *steps: AbstractPipelineStep) -> Pipeline:
+    pipeline: Pipeline = Pipeline(SignalSource(MultitoneGenerator(8000, [100]), FRAME_SIZE, FRAME_SIZE * FRAMES), outputs.append, DSPTimeSync(8000), 4, 2, frame_size=FRAME_SIZE, ring_capacity=4)
+    for step in steps:
+        pipeline.add_element(step)
+
+    return pipeline
+
+
+def test_rings_are_sized_for_frames_larger_than_the_input():
+    outputs: list = []
+    pipeline: Pipeline = build(outputs, fm_pipeline.TestPipelineStep(), InterpolatorStep(4))
+    pipeline.run(ProcessPipelineOrchestrator())
+    pipeline.wait()
+    pipeline.end()
+
+    assert sum(len(frame) for frame in outputs) == 4 * FRAME_SIZE * FRAMES
+
+
+def test_rings_carry_two_dimensional_spectra():
+    outputs: list = []
+    pipeline: Pipeline = build(outputs, fm_pipeline.TestPipelineStep(), SpectrumStep(2 * FRAME_SIZE, average_count=1))
+    pipeline.run(ProcessPipelineOrchestrator())
+    pipeline.wait()
+    pipeline.end()
+
+    assert outputs and all(frame.shape[0] == 2 * FRAME_SIZE for frame in outputs)
+
+
+def test_fixed_slots_too_small_for_a_step_fail_at_run():
+    pipeline: Pipeline = build([], InterpolatorStep(4))
+    with pytest.raises(ValueError, match="InterpolatorStep"):
+        pipeline.run(ProcessPipelineOrchestrator(max_frame_bytes=FRAME_SIZE * 16))
+
+
+def test_failing_step_in_a_process_raises_from_wait():
+    pipeline: Pipeline = build([], fm_pipeline.TestPipelineStep(), FailingStep())
+    pipeline.run(ProcessPipelineOrchestrator(join_timeout=10))
+
+    with pytest.raises(RuntimeError, match="step failed"):
+        pipeline.wait()
+    with pytest.raises(RuntimeError, match="step failed"):
+        pipeline.end()
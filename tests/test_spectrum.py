@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from fm_prototype.spectrum import WelchEstimator, get_window
+from fm_prototype.fm_pipeline import SpectrumStep
+
+
+FFT_SIZE: int = 256
+SEGMENTS: int = 8
+
+
+def noisy_tone(num_samples: int, complex_values: bool) -> np.ndarray:
+    times: np.ndarray = np.arange(num_samples)
+    noise: np.ndarray = 0.1 * np.random.default_rng(5).standard_normal(num_samples)
+    tone: np.ndarray = np.exp(2j * np.pi * 0.1 * times) if complex_values else np.cos(2 * np.pi * 0.1 * times)
+
+    return tone + noise
+
+
+@pytest.mark.parametrize("complex_values", [False, True])
+@pytest.mark.parametrize("density", [False, True])
+def test_linear_average_matches_scipy_welch(complex_values, density):
+    signal = pytest.importorskip("scipy.signal")
+    hop: int = FFT_SIZE // 2
+    samples: np.ndarray = noisy_tone(FFT_SIZE + (SEGMENTS - 1) * hop, complex_values)
+
+    estimator: WelchEstimator = WelchEstimator(FFT_SIZE, "hann", 0.5, SEGMENTS, sps=8000, density=density)
+    frames: list = [estimator.process(samples[start:start + 100]) for start in range(0, len(samples), 100)] # streamed in frames unrelated to the hop
+    estimates: np.ndarray = np.concatenate(frames, axis=-1)
+
+    _, reference = signal.welch(samples, 8000, window="hann", nperseg=FFT_SIZE, noverlap=FFT_SIZE - hop, detrend=False, return_onesided=False,
+                                 scaling="density" if density else "spectrum")
+    assert estimates.shape == (FFT_SIZE, 1)
+    assert np.allclose(estimates[:, 0], reference, rtol=1e-9, atol=1e-15)
+
+
+def test_spectrum_step_emits_one_spectrum_per_average():
+    step: SpectrumStep = SpectrumStep(64, average_count=4)
+    samples: np.ndarray = noisy_tone(64 * 40, True)
+    spectra: np.ndarray = np.concatenate([step.computation(samples[start:start + 64]) for start in range(0, len(samples), 64)], axis=-1)
+
+    assert spectra.shape == (64, ((len(samples) - 64) // 32 + 1) // 4)
+    assert np.all(np.argmax(spectra, axis=0) == round(0.1 * 64)) # the tone's bin
+
+
+def test_peak_hold_and_exponential_averaging():
+    samples: np.ndarray = noisy_tone(64 + 39 * 32, True) # forty segments
+    per_segment: np.ndarray = WelchEstimator(64, average_count=1).process(samples)
+    held: np.ndarray = WelchEstimator(64, average_count=1, averaging="peak").process(samples)
+    smoothed: np.ndarray = WelchEstimator(64, average_count=4, averaging="exponential").process(samples)
+
+    expected: np.ndarray = per_segment[:, 0].copy()
+    for index in range(1, per_segment.shape[-1]):
+        expected = 0.75 * expected + 0.25 * per_segment[:, index]
+    assert np.allclose(held, np.maximum.accumulate(per_segment, axis=-1))
+    assert smoothed.shape[-1] == per_segment.shape[-1] // 4
+    assert np.allclose(smoothed[:, -1], expected)
+
+
+def test_windows_are_periodic_and_shared():
+    window: np.ndarray = get_window("hann", 16)
+    assert window is get_window("hann", 16)
+    assert not window.flags.writeable
+    assert np.allclose(window, np.hanning(17)[:16])
+    with pytest.raises(ValueError):
+        get_window("kaiser", 16)